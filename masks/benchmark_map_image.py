@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Compares the lookup table map_image with the original per-pixel loop on a
+mask file, checking that both give identical output.  Without a mask file,
+uses a random 288x288 mask with 8 values like an IntPhys mask.
+
+Usage:
+   python3 benchmark_map_image.py --mask /path/to/train/2/masks/masks_001.png
+
+"""
+import argparse
+import random
+import timeit
+
+import numpy
+from PIL import Image
+
+from masks import map_image
+
+
+def map_image_loop(orig_image, mask_map):
+    """The original map_image: set each pixel from the mask_map"""
+    orig_image_pixels = orig_image.load()
+
+    new_image = orig_image
+    new_image_pixels = new_image.load()
+    for i in range(orig_image.size[0]):
+        for j in range(orig_image.size[1]):
+            new_image_pixels[i, j] = mask_map[orig_image_pixels[i, j]]
+    return new_image
+
+
+def load_mask(mask_path):
+    if mask_path is not None:
+        return Image.open(mask_path).copy()
+    rng = numpy.random.default_rng(0)
+    values = rng.choice(256, size=8, replace=False).astype(numpy.uint8)
+    return Image.fromarray(values[rng.integers(len(values), size=(288, 288))], mode='L')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mask", default=None, help="Mask file to use (default: a random 288x288 mask)")
+    parser.add_argument("--repeat", type=int, default=5, help="How many times to time each function")
+    opt = parser.parse_args()
+
+    mask = load_mask(opt.mask)
+    # Map every value in the mask to a shuffled value, like the masks of a later frame
+    values = numpy.unique(numpy.asarray(mask)).tolist()
+    shuffled = list(values)
+    random.Random(0).shuffle(shuffled)
+    mask_map = dict(zip(values, shuffled))
+
+    expected = numpy.asarray(map_image_loop(mask.copy(), mask_map))
+    actual = numpy.asarray(map_image(mask.copy(), mask_map))
+    if not numpy.array_equal(expected, actual):
+        raise AssertionError("The lookup table output is different from the loop output")
+
+    print("Mask: {}x{}, mode {}, {} values".format(mask.size[0], mask.size[1], mask.mode, len(values)))
+    for name, function in [("loop", map_image_loop), ("lookup table", map_image)]:
+        seconds = min(timeit.repeat(lambda: function(mask.copy(), mask_map), number=1, repeat=opt.repeat))
+        print("{:>12}: {:8.3f} ms per mask".format(name, seconds * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2019 Next Century Corporation
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Reads and writes mask archives: a single .npz file per scene holding all of
+its normalized masks as one uint8 array [frames, height, width] ("masks"),
+plus the scene's status header (with the mask values) as JSON ("header").
+
+An uncompressed archive can be memory-mapped, so reading one frame only
+reads that frame from disk.  A compressed archive is smaller, but has to be
+decompressed completely when it is loaded.
+
+This file can also convert the existing newmasks/ directories of a train/
+directory (made by masks.py) into archives.
+
+Usage:
+   python3 maskarchive.py --dir /path/to/train/ [--compress] [--workers N]
+
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import zipfile
+from pathlib import Path
+
+import numpy
+from PIL import Image
+
+ARCHIVE_FILE_NAME = "newmasks.npz"
+
+
+def save_mask_archive(path, masks, header, compress=False):
+    """Save the masks (a uint8 array [frames, height, width]) and the header
+    (a JSON-serializable dict) to the archive at the given path.  The archive
+    is written to a temporary file first, so it is never left half written.
+    """
+    masks = numpy.ascontiguousarray(masks, dtype=numpy.uint8)
+    header_bytes = numpy.frombuffer(json.dumps(header).encode("utf-8"), dtype=numpy.uint8)
+    temp_path = str(path) + ".tmp"
+    with open(temp_path, "wb") as file:
+        (numpy.savez_compressed if compress else numpy.savez)(file, masks=masks, header=header_bytes)
+    os.replace(temp_path, path)
+
+
+def load_mask_archive(path, mmap=True):
+    """Load the masks and the header from the archive at the given path.  If
+    mmap is True and the archive is uncompressed, the masks are a read-only
+    memory-mapped array, so only the frames that are used are read.
+    """
+    with zipfile.ZipFile(path) as archive:
+        header = json.loads(numpy.load(archive.open("header.npy")).tobytes().decode("utf-8"))
+        info = archive.getinfo("masks.npy")
+        if not mmap or info.compress_type != zipfile.ZIP_STORED:
+            return numpy.load(archive.open("masks.npy")), header
+
+    with open(path, "rb") as file:
+        # The local file header is 30 bytes plus the file name and extra field
+        file.seek(info.header_offset + 26)
+        name_length, extra_length = numpy.frombuffer(file.read(4), dtype="<u2").tolist()
+        file.seek(info.header_offset + 30 + name_length + extra_length)
+        version = numpy.lib.format.read_magic(file)
+        if version == (1, 0):
+            shape, fortran_order, dtype = numpy.lib.format.read_array_header_1_0(file)
+        else:
+            shape, fortran_order, dtype = numpy.lib.format.read_array_header_2_0(file)
+        offset = file.tell()
+    masks = numpy.memmap(path, dtype=dtype, mode="r", offset=offset, shape=shape,
+                         order="F" if fortran_order else "C")
+    return masks, header
+
+
+def convert_scene(scene_dir, compress=False):
+    """Convert the newmasks/ PNGs and the newstatus.json header of a scene
+    directory into an archive.  Returns the scene directory and None, or an
+    error message.
+    """
+    try:
+        scene_path = Path(scene_dir)
+        mask_files = sorted(f for f in os.listdir(scene_path / "newmasks") if f.endswith(".png"))
+        if len(mask_files) == 0:
+            raise FileNotFoundError("No masks in {}".format(scene_path / "newmasks"))
+        with open(scene_path / "newstatus.json") as file:
+            header = json.load(file)["header"]
+
+        masks = None
+        for index, file_name in enumerate(mask_files):
+            frame = numpy.asarray(Image.open(scene_path / "newmasks" / file_name))
+            if masks is None:
+                masks = numpy.empty((len(mask_files),) + frame.shape, dtype=numpy.uint8)
+            masks[index] = frame
+        save_mask_archive(scene_path / ARCHIVE_FILE_NAME, masks, header, compress)
+        return scene_dir, None
+    except Exception as e:
+        return scene_dir, "{}: {}".format(type(e).__name__, e)
+
+
+def convert_scene_task(task):
+    return convert_scene(*task)
+
+
+def convert_all(top_level_dir, compress=False, workers=1):
+    """Convert every scene directory under the top level directory"""
+    dir_path = Path(top_level_dir)
+    dirs = sorted((dir_path / f) for f in os.listdir(dir_path) if os.path.isdir(dir_path / f / "newmasks"))
+    print("Converting {} directories with {} worker(s).  ".format(len(dirs), workers))
+
+    tasks = [(directory, compress) for directory in dirs]
+    errors = {}
+    pool = multiprocessing.Pool(workers) if workers > 1 else None
+    try:
+        results = pool.imap_unordered(convert_scene_task, tasks) if pool else map(convert_scene_task, tasks)
+        for count, (directory, error) in enumerate(results, 1):
+            if error is not None:
+                errors[directory] = error
+            print("[{}/{}] {} {}".format(count, len(dirs), "Failed" if error else "Converted", directory))
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+
+    print("Converted {} directories, {} failed.".format(len(dirs) - len(errors), len(errors)))
+    for directory in sorted(errors):
+        print("Failed {}: {}".format(directory, errors[directory]))
+    return errors
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", default=".", help="Directory that has the data in it.")
+    parser.add_argument("--compress", action="store_true",
+                        help="Compress the archives (smaller, but they cannot be memory-mapped).")
+    parser.add_argument("--workers", type=int, default=1, help="How many scene directories to convert at once.")
+    opt = parser.parse_args()
+
+    convert_all(opt.dir, opt.compress, opt.workers)
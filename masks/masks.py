@@ -27,32 +27,93 @@ Usage:
 """
 import argparse
 import json
+import multiprocessing
 import os
 import shutil
+import numpy
 from PIL import Image
 from pathlib import Path
 
 import option
+from maskarchive import ARCHIVE_FILE_NAME, load_mask_archive, save_mask_archive
+
+# Change this to process every scene again after changing how masks are made
+MANIFEST_VERSION = 1
+
+# Write the new masks as PNGs in newmasks/, as one stacked archive (newmasks.npz), or both
+PNG_OUTPUT = "png"
+ARCHIVE_OUTPUT = "npz"
+BOTH_OUTPUT = "both"
+OUTPUT_LIST = [PNG_OUTPUT, ARCHIVE_OUTPUT, BOTH_OUTPUT]
 
 
 def map_image(orig_image, mask_map):
-    """Map the image pixels for a single image, returning a new image"""
-    orig_image_pixels = orig_image.load()
+    """Map the image pixels for a single image, returning a new image.
+
+    The whole image is remapped at once with a lookup table indexed by the
+    pixel values.  Like setting each pixel from the mask_map, this changes
+    (and returns) the given image, and raises a KeyError for a pixel value
+    that is not in the mask_map.
+    """
+    orig_pixels = numpy.asarray(orig_image)
+    if orig_pixels.ndim != 2:
+        raise ValueError("Cannot map an image with mode {}".format(orig_image.mode))
+
+    if orig_pixels.dtype == numpy.uint8:
+        # A table of all 256 possible values, and which of them are mapped
+        lookup = numpy.zeros(256, dtype=numpy.int64)
+        mapped = numpy.zeros(256, dtype=bool)
+        for key, value in mask_map.items():
+            if isinstance(key, int) and 0 <= key < 256:
+                lookup[key] = value
+                mapped[key] = True
+        present = numpy.bincount(orig_pixels.ravel(), minlength=256) > 0
+        missing = numpy.flatnonzero(present & ~mapped)
+        if len(missing) > 0:
+            raise KeyError(int(missing[0]))
+        new_pixels = lookup[orig_pixels]
+    else:
+        # Wider pixel values: look up each distinct value once
+        values, inverse = numpy.unique(orig_pixels, return_inverse=True)
+        new_pixels = numpy.array([mask_map[value] for value in values.tolist()], dtype=numpy.int64)[inverse]
+        new_pixels = new_pixels.reshape(orig_pixels.shape)
 
     new_image = orig_image
-    new_image_pixels = new_image.load()
-    for i in range(orig_image.size[0]):
-        for j in range(orig_image.size[1]):
-            new_image_pixels[i, j] = mask_map[orig_image_pixels[i, j]]
+    new_image.frombytes(new_pixels.astype(orig_pixels.dtype).tobytes())
     return new_image
 
 
+def process_scene(directory, force=False, output=PNG_OUTPUT, compress=False):
+    """Process the masks in a single scene directory.  Returns the directory,
+    None or an error message if the scene could not be processed (so one bad
+    directory does not stop the others), and how many files were written.
+    """
+    try:
+        scene = SceneProcessor(directory, force, output, compress)
+        scene.process_mask_files()
+        scene.save_new_status()
+        scene.save_archive()
+        scene.save_manifest()
+        return directory, None, scene.written_count
+    except Exception as e:
+        return directory, "{}: {}".format(type(e).__name__, e), 0
+
+
+def file_signature(path):
+    """Return the modification time and size of a file, or None if it does not exist"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
 class TopLevelProcessor:
     """Handle the top level directory, which should contain a lot of subdirectories,
     each of which has a status.json and a masks directory.
     """
 
-    def __init__(self, top_level_dir):
+    def __init__(self, top_level_dir, workers=1, force=False, output=PNG_OUTPUT, compress=False):
         dir_path = Path(top_level_dir)
         if not os.path.exists(dir_path):
             print("Top level dir does not exist.  Cannot process {} ".format(dir_path))
@@ -61,32 +122,76 @@ class TopLevelProcessor:
         # Get all the subdirectories under there
         dirs = [(dir_path / f) for f in os.listdir(dir_path) if os.path.isdir(dir_path / f)]
         dirs.sort()
-        print("Processing {} directories.  ".format(len(dirs)))
-
-        for directory in dirs:
-            scene = SceneProcessor(directory)
-            print("Processing masks in {}".format(directory))
-            scene.process_mask_files()
-            scene.save_new_status()
+        print("Processing {} directories with {} worker(s).  ".format(len(dirs), workers))
+
+        self.errors = {}
+        self.unchanged_count = 0
+        tasks = [(directory, force, output, compress) for directory in dirs]
+        if workers > 1:
+            # Each scene writes only to its own directory, so the output does not depend on the order they finish in
+            with multiprocessing.Pool(workers) as pool:
+                self.report_results(pool.imap_unordered(process_scene_task, tasks), len(dirs))
+        else:
+            self.report_results(map(process_scene_task, tasks), len(dirs))
+
+        print("Processed {} directories ({} unchanged), {} failed.".format(len(dirs) - len(self.errors),
+                                                                         self.unchanged_count, len(self.errors)))
+        for directory in sorted(self.errors):
+            print("Failed {}: {}".format(directory, self.errors[directory]))
+
+    def report_results(self, results, total):
+        for count, (directory, error, written_count) in enumerate(results, 1):
+            if error is not None:
+                self.errors[directory] = error
+                result = "Failed"
+            elif written_count == 0:
+                self.unchanged_count += 1
+                result = "Unchanged"
+            else:
+                result = "Processed ({} files written)".format(written_count)
+            print("[{}/{}] {} masks in {}".format(count, total, result, directory))
+
+
+def process_scene_task(task):
+    return process_scene(*task)
 
 
 class SceneProcessor:
     """Handle the masks in a single scene"""
 
-    def __init__(self, single_dir):
-        """Initialize the class with directory that contains /masks, /frames/, /depth, and status.json"""
+    def __init__(self, single_dir, force=False, output=PNG_OUTPUT, compress=False):
+        """Initialize the class with directory that contains /masks, /frames/, /depth, and status.json
+
+        Unless force is True, only the output files whose inputs (or mask
+        mappings) changed since the last run, according to the scene's
+        manifest (newmanifest.json), are written again.  The output is
+        PNG_OUTPUT, ARCHIVE_OUTPUT (optionally compressed), or BOTH_OUTPUT.
+        """
         self.dir_path = Path(single_dir)
         self.masks_dir = self.dir_path / "masks"
         if not os.path.exists(self.masks_dir):
-            print("Path does not exist.  Cannot process masks in {}".format(self.masks_dir))
-            return
+            raise FileNotFoundError("Path does not exist.  Cannot process masks in {}".format(self.masks_dir))
 
         # Create place where we will put the new masks
+        self.write_png = output in [PNG_OUTPUT, BOTH_OUTPUT]
         self.new_masks_dir = self.dir_path / "newmasks"
-        if not os.path.exists(self.new_masks_dir):
+        if self.write_png and not os.path.exists(self.new_masks_dir):
             os.mkdir(self.new_masks_dir)
 
+        # The manifest records the signature (modification time and size) of
+        # each input and output file, and the mask mapping of each frame
+        self.manifest_file = self.dir_path / "newmanifest.json"
+        self.old_manifest = {}
+        if not force and os.path.exists(self.manifest_file):
+            with open(self.manifest_file) as file:
+                self.old_manifest = json.load(file)
+        if self.old_manifest.get("version") != MANIFEST_VERSION:
+            self.old_manifest = {}
+        self.manifest = {"version": MANIFEST_VERSION, "frames": {}}
+        self.written_count = 0
+
         status_file = self.dir_path / "status.json"
+        self.manifest["status"] = file_signature(status_file)
         with open(status_file) as file:
             self.status_json = json.load(file)
             # print("status.json header: ", self.status_json["header"])
@@ -101,13 +206,97 @@ class SceneProcessor:
         if not len(self.mask_files) == 100:
             print("Wrong number of mask files! In {}: {}".format(self.masks_dir, len(self.mask_files)))
 
+        # The stacked masks for the archive, which may reuse the unchanged
+        # frames of the previous archive
+        self.write_archive = output in [ARCHIVE_OUTPUT, BOTH_OUTPUT]
+        self.compress = compress
+        self.archive_file = self.dir_path / ARCHIVE_FILE_NAME
+        self.archive_masks = None
+        self.archive_changed = False
+        self.old_archive_masks = None
+        self.old_archive_valid = (self.write_archive and "archive" in self.old_manifest and
+                                  self.old_manifest["archive"] == file_signature(self.archive_file) and
+                                  self.old_manifest.get("archive_files") == [f.name for f in self.mask_files])
+
     def save_new_status(self):
         new_status = self.status_json
         new_status["header"]["masks"] = self.first_mask
 
         new_status_file = self.dir_path / "newstatus.json"
+        old_signature = self.old_manifest.get("newstatus")
+        if (old_signature is not None and self.old_manifest.get("status") == self.manifest["status"] and
+                file_signature(new_status_file) == old_signature):
+            self.manifest["newstatus"] = old_signature
+            return
+
         with open(new_status_file, 'w') as outfile:
             json.dump(new_status, outfile, indent=4)
+        self.manifest["newstatus"] = file_signature(new_status_file)
+        self.written_count += 1
+
+    def save_archive(self):
+        """Save the stacked masks and the new status header as one archive,
+        unless no frame changed.
+        """
+        if not self.write_archive or self.archive_masks is None:
+            return
+        if self.archive_changed or not self.old_archive_valid:
+            header = dict(self.status_json["header"], masks=self.first_mask)
+            save_mask_archive(self.archive_file, self.archive_masks, header, self.compress)
+            self.written_count += 1
+        self.manifest["archive"] = file_signature(self.archive_file)
+        self.manifest["archive_files"] = [f.name for f in self.mask_files]
+
+    def save_manifest(self):
+        """Save the manifest, unless nothing changed.  It is saved last, so
+        the files of an interrupted run are processed again.
+        """
+        if self.manifest == self.old_manifest:
+            return
+        temp_file = self.dir_path / "newmanifest.json.tmp"
+        with open(temp_file, 'w') as outfile:
+            json.dump(self.manifest, outfile)
+        os.replace(temp_file, self.manifest_file)
+
+    def is_unchanged(self, file_name, mask_map):
+        """Return whether the output file was already made from the same input
+        file with the same mask mapping, and was not changed since.  If so,
+        keep its manifest entry.
+        """
+        old_entry = self.old_manifest.get("frames", {}).get(file_name)
+        entry = {
+            "input": file_signature(self.masks_dir / file_name),
+            "map": sorted([key, value] for key, value in mask_map.items()) if mask_map is not None else None
+        }
+        output = file_signature(self.new_masks_dir / file_name) if self.write_png else None
+        if (old_entry is not None and old_entry["input"] == entry["input"] and old_entry["map"] == entry["map"] and
+                old_entry["output"] == output and (self.old_archive_valid or not self.write_archive)):
+            self.manifest["frames"][file_name] = old_entry
+            return True
+        self.pending_entry = entry
+        return False
+
+    def record_output(self, file_name):
+        self.pending_entry["output"] = file_signature(self.new_masks_dir / file_name) if self.write_png else None
+        self.manifest["frames"][file_name] = self.pending_entry
+        if self.write_png:
+            self.written_count += 1
+
+    def store_archive_frame(self, index, pixels=None):
+        """Put the new mask of the given frame in the stacked masks, or copy
+        it from the previous archive if no pixels are given.
+        """
+        if not self.write_archive:
+            return
+        if pixels is None:
+            if self.old_archive_masks is None:
+                self.old_archive_masks = load_mask_archive(self.archive_file)[0]
+            pixels = self.old_archive_masks[index]
+        else:
+            self.archive_changed = True
+        if self.archive_masks is None:
+            self.archive_masks = numpy.zeros((len(self.mask_files),) + pixels.shape, dtype=numpy.uint8)
+        self.archive_masks[index] = pixels
 
     def process_mask_files(self):
 
@@ -115,7 +304,15 @@ class SceneProcessor:
         mask_values = self.first_mask
 
         # Copy over the first mask image.
-        shutil.copy(self.mask_files[0], self.new_masks_dir)
+        first_file_name = self.mask_files[0].name
+        if self.is_unchanged(first_file_name, None):
+            self.store_archive_frame(0)
+        else:
+            if self.write_png:
+                shutil.copy(self.mask_files[0], self.new_masks_dir)
+            if self.write_archive:
+                self.store_archive_frame(0, numpy.asarray(Image.open(self.mask_files[0])))
+            self.record_output(first_file_name)
 
         # Go through the rest of the frames.
         for index in range(1, len(self.mask_files)):
@@ -150,10 +347,17 @@ class SceneProcessor:
         if not os.path.exists(full_path):
             print("File {} does not exist".format(image_file_name))
             return
+        if self.is_unchanged(image_file_name, mask_map):
+            self.store_archive_frame(index)
+            return
         orig_image = Image.open(full_path)
 
         mapped_image = map_image(orig_image, mask_map)
-        mapped_image.save(self.new_masks_dir / image_file_name)
+        if self.write_png:
+            mapped_image.save(self.new_masks_dir / image_file_name)
+        if self.write_archive:
+            self.store_archive_frame(index, numpy.asarray(mapped_image))
+        self.record_output(image_file_name)
 
 
 if __name__ == "__main__":
@@ -161,4 +365,4 @@ if __name__ == "__main__":
 
     print("Directory to use: ", opt.dir)
 
-    handler = TopLevelProcessor(opt.dir)
+    handler = TopLevelProcessor(opt.dir, opt.workers, opt.force, opt.output, opt.compress)
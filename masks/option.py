@@ -24,6 +24,14 @@ def make(parser):
     """
 
     parser.add_argument("--dir", default=".", help="Directory that has the data in it.")
+    parser.add_argument("--force", action="store_true",
+                        help="Process every mask again, even if its inputs did not change since the last run.")
+    parser.add_argument("--output", choices=["png", "npz", "both"], default="png",
+                        help="Write the new masks as PNGs in newmasks/, as one stacked archive per scene " +
+                        "(newmasks.npz), or both.")
+    parser.add_argument("--compress", action="store_true",
+                        help="Compress the stacked archives (smaller, but they cannot be memory-mapped).")
+    parser.add_argument("--workers", type=int, default=1, help="How many scene directories to process at once.")
 
     opt = parser.parse_args()
 
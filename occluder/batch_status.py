@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2019 Next Century Corporation
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+"""
+Command line and batch mode shared by the occluder viewers (occ_view.py for
+O1/O2, occ_O3.py for O3): writes the status_NNNN.json files of many tests
+on a process pool.  A test that fails is reported at the end without
+stopping the others, and tests whose status file already exists are
+skipped (unless --force), so an interrupted batch can simply be rerun.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+from pathlib import Path
+
+NUM_TESTS = 1080
+
+
+def status_file_name(test_num):
+    return "status_" + str(test_num).zfill(4) + ".json"
+
+
+def write_status(status_path, status_json):
+    """Write the status file through a temporary file, so it is never left half written"""
+    status_path = Path(status_path)
+    temp_path = status_path.with_name(status_path.name + ".tmp")
+    with temp_path.open("w") as outfile:
+        json.dump(status_json, outfile, indent=4)
+    os.replace(temp_path, status_path)
+    return status_path
+
+
+def write_test_status(task):
+    """Write the status of one test.  Returns the test number and None, or an error message"""
+    viewer_class, data_dir, status_dir, region_index, test_num = task
+    try:
+        viewer = viewer_class(data_dir, status_dir, region_index)
+        viewer.set_test_num(test_num)
+        if viewer.write_out_status() is None:
+            return test_num, "No status written"
+        return test_num, None
+    except Exception as e:
+        return test_num, "{}: {}".format(type(e).__name__, e)
+
+
+def run_batch(viewer_class, data_dir, status_dir, test_nums, workers=1, force=False, region_index=None):
+    """Write the status files of the tests with the given viewer class, using workers processes,
+    reading the objects from the region index file (see regionindex.py) if one is given"""
+    status_dir = Path(status_dir)
+    status_dir.mkdir(parents=True, exist_ok=True)
+    todo = [test_num for test_num in test_nums if force or not (status_dir / status_file_name(test_num)).exists()]
+    print("Writing status for {} tests ({} already done) with {} worker(s)".format(
+        len(todo), len(test_nums) - len(todo), workers))
+
+    tasks = [(viewer_class, data_dir, status_dir, region_index, test_num) for test_num in todo]
+    errors = {}
+    pool = multiprocessing.Pool(workers) if workers > 1 else None
+    try:
+        results = pool.imap_unordered(write_test_status, tasks) if pool else map(write_test_status, tasks)
+        for count, (test_num, error) in enumerate(results, 1):
+            if error is not None:
+                errors[test_num] = error
+            print("[{}/{}] {} test {}".format(count, len(todo), "Failed" if error else "Wrote", test_num))
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+
+    print("Wrote {} tests, {} failed.".format(len(todo) - len(errors), len(errors)))
+    for test_num in sorted(errors):
+        print("Failed test {}: {}".format(test_num, errors[test_num]))
+    return errors
+
+
+def parse_tests(value):
+    """Parse a test number or range of test numbers, like 7 or 1-1080"""
+    first, _, last = value.partition("-")
+    return list(range(int(first), int(last or first) + 1))
+
+
+def make_parser(description, default_data_dir, default_purpose):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--purpose", choices=["images", "view", "status"], default=default_purpose,
+                        help="Write labelled images, view the tests, or write status files.")
+    parser.add_argument("--data-dir", default=default_data_dir, help="Block directory, like .../test/O1")
+    parser.add_argument("--status-dir", default="status", help="Directory to write the status files in.")
+    parser.add_argument("--tests", type=parse_tests, default=list(range(1, NUM_TESTS + 1)),
+                        help="Test number or range of tests to process, like 1-1080.")
+    parser.add_argument("--workers", type=int, default=1, help="How many tests to process at once.")
+    parser.add_argument("--region-index", default=None,
+                        help="Region index of the block (made by regionindex.py) to read the objects from.")
+    parser.add_argument("--force", action="store_true", help="Write status files that already exist again.")
+    return parser
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Compares the single pass get_frame_objects with the original one pass per
+color (np.where(arr == color)) on a mask file, checking that both give
+identical FrameObjects.  Without a mask file, uses a random 288x288 mask
+with rectangles of 8 colors like an IntPhys mask.
+
+Usage:
+   python3 benchmark_maskinfo.py --mask /path/to/test/O1/0001/1/masks/masks_050.png
+
+"""
+import argparse
+import timeit
+
+import numpy as np
+from PIL import Image
+
+from frameobject import FrameObject
+from maskinfo import get_frame_objects
+
+
+def get_frame_objects_loop(arr):
+    """The original get_objects_for_frame: one np.where per color"""
+    objects = {}
+    for color in np.unique(arr):
+        obje = np.where(arr == color)
+        obj = FrameObject(color)
+        obj.set_vals(obje)
+        objects[color] = obj
+    return objects
+
+
+def load_mask(mask_path):
+    if mask_path is not None:
+        return np.array(Image.open(mask_path))
+    rng = np.random.default_rng(0)
+    arr = np.zeros((288, 288), dtype=np.uint8)
+    for color in rng.choice(np.arange(1, 256), size=7, replace=False):
+        x, y = rng.integers(0, 250, size=2)
+        w, h = rng.integers(5, 120, size=2)
+        arr[y:y + h, x:x + w] = color
+    return arr
+
+
+def check_same(expected, actual):
+    if list(expected.keys()) != list(actual.keys()):
+        raise AssertionError("Different colors: {} {}".format(list(expected.keys()), list(actual.keys())))
+    for color, obj in expected.items():
+        other = actual[color]
+        for name in ["color", "pixel_count", "minx", "maxx", "miny", "maxy", "aspect_ratio"]:
+            if getattr(obj, name) != getattr(other, name):
+                raise AssertionError("Different {} for color {}: {} {}".format(
+                    name, color, getattr(obj, name), getattr(other, name)))
+        for name in ["centroidx", "centroidy"]:
+            if not np.isclose(getattr(obj, name), getattr(other, name)):
+                raise AssertionError("Different {} for color {}".format(name, color))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mask", default=None, help="Mask file to use (default: a random 288x288 mask)")
+    parser.add_argument("--repeat", type=int, default=20, help="How many times to time each function")
+    opt = parser.parse_args()
+
+    arr = load_mask(opt.mask)
+    check_same(get_frame_objects_loop(arr), get_frame_objects(arr))
+
+    print("Mask: {}x{}, {} colors".format(arr.shape[1], arr.shape[0], len(np.unique(arr))))
+    for name, function in [("per color", get_frame_objects_loop), ("single pass", get_frame_objects)]:
+        seconds = min(timeit.repeat(lambda: function(arr), number=1, repeat=opt.repeat))
+        print("{:>12}: {:8.3f} ms per mask".format(name, seconds * 1000))
+
+
+if __name__ == "__main__":
+    main()
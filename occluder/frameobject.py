@@ -1,5 +1,9 @@
 class FrameObject:
-    """A particular object (ball, occluder, ground, etc.) in a frame """
+    """A particular object (ball, occluder, ground, etc.) in a frame.  Uses slots, since there
+    can be many of them; FrameRegions (frameregions.py) holds many more in arrays."""
+
+    __slots__ = ["color", "pixel_count", "minx", "maxx", "miny", "maxy", "label", "midx", "midy", "dy",
+                 "centroidx", "centroidy"]
 
     def __init__(self, color):
         self.color = color;
@@ -12,6 +16,8 @@ class FrameObject:
         self.midx = 0
         self.midy = 0
         self.dy = 0
+        self.centroidx = 0
+        self.centroidy = 0
 
     def set_vals(self, list_of_vals):
         self.pixel_count = len(list_of_vals[1])
@@ -19,7 +25,17 @@ class FrameObject:
         self.maxx = list_of_vals[1].max()
         self.miny = list_of_vals[0].min()
         self.maxy = list_of_vals[0].max()
-        self.calcAR()
+        self.centroidx = list_of_vals[1].mean()
+        self.centroidy = list_of_vals[0].mean()
+
+    def set_region(self, pixel_count, minx, maxx, miny, maxy, centroidx, centroidy):
+        self.pixel_count = pixel_count
+        self.minx = minx
+        self.maxx = maxx
+        self.miny = miny
+        self.maxy = maxy
+        self.centroidx = centroidx
+        self.centroidy = centroidy
 
     def add_pixel(self, x, y):
         self.pixel_count = self.pixel_count + 1
@@ -31,14 +47,17 @@ class FrameObject:
             self.miny = y
         if y > self.maxy:
             self.maxy = y
-        self.calcAR()
 
-    def calcAR(self):
+    @property
+    def aspect_ratio(self):
+        """Computed when used, so add_pixel does not compute it for every pixel"""
         diffy = abs(self.maxy - self.miny)
         if diffy > 0:
-            self.aspect_ratio = abs(self.maxx - self.minx) / diffy
-        else:
-            self.aspect_ratio = 1
+            return abs(self.maxx - self.minx) / diffy
+        return 1
+
+    def calcAR(self):
+        return self.aspect_ratio
 
     def __str__(self):
         return "(" + str(self.color) + " [ " + str(self.minx) + ", " + str(self.maxx) + ", " + str(
@@ -51,6 +70,6 @@ class FrameObject:
     @staticmethod
     def are_objects_same(obj1, obj2):
         """Determine if two objects are the same """
-        if obj1.minx == obj2.minx and obj1.maxx == obj1.maxx and obj1.miny == obj2.miny and obj1.maxy == obj2.maxy:
+        if obj1.minx == obj2.minx and obj1.maxx == obj2.maxx and obj1.miny == obj2.miny and obj1.maxy == obj2.maxy:
             return True
         return False
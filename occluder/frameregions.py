@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2019 Next Century Corporation
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+import numpy as np
+
+from frameobject import FrameObject
+
+# One region is 32 bytes, instead of about 330 for a FrameObject (with its numpy values)
+REGION_DTYPE = np.dtype([("color", np.int32), ("pixel_count", np.int32), ("minx", np.int16), ("maxx", np.int16),
+                         ("miny", np.int16), ("maxy", np.int16), ("centroidx", np.float64),
+                         ("centroidy", np.float64)])
+
+
+class FrameRegions:
+    """
+    Many regions (the values of FrameObjects) in one structured numpy array, so millions
+    of them fit in memory.  The fields are columns (regions.minx is an array), the
+    FrameObject methods work on all the regions at once, and regions[i] (or to_objects)
+    gives FrameObjects back.
+    """
+
+    def __init__(self, array=None):
+        self.array = array if array is not None else np.zeros(0, dtype=REGION_DTYPE)
+
+    @staticmethod
+    def from_columns(color, pixel_count, minx, maxx, miny, maxy, centroidx=0, centroidy=0):
+        """Make the regions from one array (or list) per field"""
+        array = np.zeros(len(color), dtype=REGION_DTYPE)
+        for name, values in [("color", color), ("pixel_count", pixel_count), ("minx", minx), ("maxx", maxx),
+                             ("miny", miny), ("maxy", maxy), ("centroidx", centroidx), ("centroidy", centroidy)]:
+            array[name] = values
+        return FrameRegions(array)
+
+    @staticmethod
+    def from_objects(objects):
+        """Make the regions from a dict of color to FrameObject, or a list of FrameObjects"""
+        if isinstance(objects, dict):
+            objects = objects.values()
+        array = np.array([(obj.color, obj.pixel_count, obj.minx, obj.maxx, obj.miny, obj.maxy, obj.centroidx,
+                           obj.centroidy) for obj in objects], dtype=REGION_DTYPE)
+        return FrameRegions(array)
+
+    @staticmethod
+    def from_region_index(index, start=0, end=None):
+        """Make the regions from rows of a RegionIndex (by default all of them)"""
+        rows = slice(start, end)
+        return FrameRegions.from_columns(index.color[rows], index.pixel_count[rows], index.minx[rows],
+                                         index.maxx[rows], index.miny[rows], index.maxy[rows],
+                                         index.centroidx[rows], index.centroidy[rows])
+
+    @staticmethod
+    def concatenate(regions_list):
+        return FrameRegions(np.concatenate([regions.array for regions in regions_list]))
+
+    def __len__(self):
+        return len(self.array)
+
+    def __getattr__(self, name):
+        # The fields are columns
+        if name != "array" and name in REGION_DTYPE.names:
+            return self.array[name]
+        raise AttributeError(name)
+
+    def __getitem__(self, item):
+        """A FrameObject for an int, or FrameRegions for a slice, index array or mask"""
+        if isinstance(item, (int, np.integer)):
+            row = self.array[item]
+            obj = FrameObject(row["color"])
+            obj.set_region(int(row["pixel_count"]), np.intp(row["minx"]), np.intp(row["maxx"]), np.intp(row["miny"]),
+                           np.intp(row["maxy"]), row["centroidx"], row["centroidy"])
+            return obj
+        return FrameRegions(self.array[item])
+
+    def __iter__(self):
+        for i in range(len(self.array)):
+            yield self[i]
+
+    def to_objects(self):
+        """Get a dict of color to FrameObject, like MaskInfo.objects"""
+        return {obj.color: obj for obj in self}
+
+    @property
+    def aspect_ratio(self):
+        dx = np.abs(self.array["maxx"].astype(np.int64) - self.array["minx"])
+        dy = np.abs(self.array["maxy"].astype(np.int64) - self.array["miny"])
+        return np.where(dy > 0, dx / np.maximum(dy, 1), 1.0)
+
+    def get_mid(self):
+        """The middles of the boxes, as an [n, 2] array of (x, y)"""
+        midx = (self.array["maxx"].astype(np.float64) + self.array["minx"]) / 2.
+        midy = (self.array["maxy"].astype(np.float64) + self.array["miny"]) / 2.
+        return np.stack([midx, midy], axis=1)
+
+    def get_boxes(self):
+        """The boxes, as an [n, 4] array of (minx, maxx, miny, maxy)"""
+        return np.stack([self.array[name].astype(np.int64) for name in ["minx", "maxx", "miny", "maxy"]], axis=1)
+
+    @staticmethod
+    def are_objects_same(regions1, regions2):
+        """Whether each region of regions1 is the same as (has the same box as) each region of
+        regions2, as an [len(regions1), len(regions2)] boolean array"""
+        return (regions1.get_boxes()[:, None, :] == regions2.get_boxes()[None, :, :]).all(axis=2)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2019 Next Century Corporation
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+# Enough for about 3000 decoded 288x288 masks
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Rough size of one cached FrameObject: the slotted object, the numpy scalars of its
+# region and its entry in the dict of objects (measured with tracemalloc at 360-380 bytes)
+OBJECT_BYTES = 400
+
+
+def mask_cache_key(path, frame_num):
+    """The key of a frame: (block, test, scene, frame) from the scene path
+    (for example .../test/O3/0001/1) and the frame number"""
+    path = Path(path)
+    return path.parent.parent.name, path.parent.name, path.name, frame_num
+
+
+class MaskCache:
+    """
+    Least recently used cache of decoded mask arrays and the objects found in
+    them, keyed by (block, test, scene, frame).  Holds at most max_bytes of
+    arrays and objects.  The arrays are read-only, and the object dicts must
+    not be changed by callers (MaskInfo copies them).  It can be used from
+    several threads (like the viewers' prefetch threads).
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.num_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key):
+        """Get the (mask array, objects) of the key, or None if it is not cached"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0], entry[1]
+
+    def put(self, key, arr, objects):
+        """Cache the mask array and the objects of the key, then drop the least
+        recently used entries until the cache fits in max_bytes"""
+        arr.setflags(write=False)
+        size = arr.nbytes + OBJECT_BYTES * len(objects)
+        with self.lock:
+            if key in self.entries:
+                self.num_bytes -= self.entries.pop(key)[2]
+            if size > self.max_bytes:
+                return
+            self.entries[key] = (arr, objects, size)
+            self.num_bytes += size
+            while self.num_bytes > self.max_bytes:
+                self.num_bytes -= self.entries.popitem(last=False)[1][2]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.num_bytes = 0
+
+    def __str__(self):
+        return "MaskCache: {} frames, {:.1f} MB, {} hits, {} misses".format(
+            len(self.entries), self.num_bytes / (1024 * 1024), self.hits, self.misses)
+
+
+# The cache shared by every MaskInfo that is not given its own
+shared_cache = MaskCache()
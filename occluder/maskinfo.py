@@ -18,6 +18,60 @@ import numpy as np
 from PIL import Image
 import copy
 from frameobject import FrameObject
+from frameregions import FrameRegions
+from maskcache import mask_cache_key, shared_cache
+from occluderrules import classify_O3, classify_occluders, objects_to_arrays
+
+
+def get_frame_objects(arr):
+    """Get a FrameObject for each color in the mask array (rows are y, columns
+    are x), keyed by color in increasing order.  Instead of one pass over the
+    pixels per color, counts the pixels of each color in each row and in each
+    column (one bincount each) and gets every color's pixel count, bounding
+    box and centroid from those two tables.
+    """
+    height, width = arr.shape
+    if arr.dtype == np.uint8:
+        colors = None
+        labels = arr
+        num_labels = 256
+    else:
+        colors, labels = np.unique(arr, return_inverse=True)
+        labels = labels.reshape(arr.shape)
+        num_labels = len(colors)
+
+    # row_counts[y, label] is the number of pixels of the label in row y
+    row_index = np.arange(height, dtype=np.intp)[:, None] * num_labels
+    row_counts = np.bincount((row_index + labels).ravel(), minlength=height * num_labels).reshape(height, num_labels)
+    col_index = np.arange(width, dtype=np.intp)[None, :] * num_labels
+    col_counts = np.bincount((col_index + labels).ravel(), minlength=width * num_labels).reshape(width, num_labels)
+
+    counts = row_counts.sum(axis=0)
+    present = np.flatnonzero(counts)
+    row_counts = row_counts[:, present]
+    col_counts = col_counts[:, present]
+    counts = counts[present]
+
+    rows_used = row_counts > 0
+    cols_used = col_counts > 0
+    miny = rows_used.argmax(axis=0)
+    maxy = height - 1 - rows_used[::-1].argmax(axis=0)
+    minx = cols_used.argmax(axis=0)
+    maxx = width - 1 - cols_used[::-1].argmax(axis=0)
+    centroidx = (np.arange(width) @ col_counts) / counts
+    centroidy = (np.arange(height) @ row_counts) / counts
+
+    if colors is None:
+        colors = present.astype(arr.dtype)
+    else:
+        colors = colors[present]
+
+    objects = {}
+    for i, color in enumerate(colors):
+        obj = FrameObject(color)
+        obj.set_region(int(counts[i]), minx[i], maxx[i], miny[i], maxy[i], centroidx[i], centroidy[i])
+        objects[color] = obj
+    return objects
 
 
 class MaskInfo:
@@ -25,13 +79,20 @@ class MaskInfo:
     Mask information for a single mask.  One of 100 in a scene; one scene of 4 in a test
     """
 
-    def __init__(self, path, frame_num):
-        """The path must be the path including block and scene.   """
+    def __init__(self, path, frame_num=None, cache=None, index=None):
+        """The path must be the path including block and scene.  Decoded frames come from
+        the cache (by default the cache shared by all MaskInfos), so no frame is decoded twice.
+        If a RegionIndex of the block is given, the objects of the frames in it are read from
+        it without decoding the masks.  """
         self.path = path
+        self.index = index
         self.objects = {}
         self.occluders = {}
+        self.orig_num_objects = 0
+        self.cache = cache if cache is not None else shared_cache
         self.frame_num = frame_num
-        self.get_objects_for_frame(frame_num)
+        if frame_num is not None:
+            self.get_objects_for_frame(frame_num)
 
     def get_num_occluders(self):
         return len(self.occluders)
@@ -49,123 +110,51 @@ class MaskInfo:
 
     def get_objects_for_frame(self, frame_num):
         self.frame_num = frame_num
-        frame_num_with_leading_zeros = str(frame_num).zfill(3)
-        mask_filename = self.path / "masks" / ("masks_" + frame_num_with_leading_zeros + ".png")
-
-        mask_image = Image.open(mask_filename)
-
-        self.objects = {}
-        arr = np.array(mask_image)
-        colors = np.unique(arr)
-        # print("Number of colors: {}".format(str(len(colors))))
-        for color in colors:
-            obje = np.where(arr == color)
-            obj = FrameObject(color)
-            obj.set_vals(obje)
-            self.objects[color] = obj
+        if self.index is not None:
+            objects = self.index.get_objects_for_path(self.path, frame_num)
+            if objects is not None:
+                self.mask_array = None
+                self.objects = objects
+                self.orig_num_objects = len(self.objects)
+                return self.objects
+
+        key = mask_cache_key(self.path, frame_num)
+        cached = self.cache.get(key)
+        if cached is None:
+            frame_num_with_leading_zeros = str(frame_num).zfill(3)
+            mask_filename = self.path / "masks" / ("masks_" + frame_num_with_leading_zeros + ".png")
+
+            mask_image = Image.open(mask_filename)
+
+            arr = np.array(mask_image)
+            cached = arr, get_frame_objects(arr)
+            self.cache.put(key, *cached)
+
+        # The cached objects are shared, and the clean up methods change them
+        self.mask_array = cached[0]
+        self.objects = {color: copy.copy(obj) for color, obj in cached[1].items()}
 
         self.orig_num_objects = len(self.objects)
+        return self.objects
 
     def get_num_obj(self):
         return len(self.objects)
 
     def clean_up_occluders(self):
-        to_be_removed = []
-        sky_found = False
-        ground_found = False
-
-        self.occluders = copy.deepcopy(self.objects)
-
-        for key, val in self.occluders.items():
-
-            # sky is usually the top region
-            if val.minx == 0 and val.miny == 0 and val.maxx == 287 and val.maxy > 100:
-                sky_found = True
-                to_be_removed.append(key)
-                continue
-
-            # ground might be entire bottom
-            if val.minx == 0 and val.miny == 152 and val.maxx == 287 and val.maxy == 287:
-                ground_found = True
-                to_be_removed.append(key)
-                continue
-
-            # Ground might start at bottom
-            if val.minx == 0 and val.maxx == 287 and val.miny == 152 and val.maxy > 200:
-                ground_found = True
-                to_be_removed.append(key)
-                continue
-
-            # too small, must be non-occluder object
-            if val.pixel_count < 501:
-                to_be_removed.append(key)
-                continue
-
-            # aspect ratio wrong for medium sized
-            if 500 < val.pixel_count < 1680:
-                if 0.5 < val.aspect_ratio < 1.8:
-                    to_be_removed.append(key)
-                    continue
-
-            # if big and not ground or sky, must be occluder
-            if sky_found and ground_found and val.pixel_count > 10000:
-                continue
-
-            # If wide and flat, then must be occluder
-            if val.aspect_ratio > 3:
-                continue
-
-            # If not too big, then occluder
-            if val.pixel_count > 1400:
-                continue
-
-            # bad ground or sky?
-            # print("Got to here {}. Not sure what to do with color: {}. assuming not occluder".format(self.frame_num, val))
-            to_be_removed.append(key)
-
-        for x in to_be_removed:
-            self.occluders.pop(x)
-
-        # If there are two left, and one is much bigger, then it is the ground
-        keys = list(self.occluders.keys())
-        if len(keys) == 2:
-            size_1 = self.occluders.get(keys[0]).pixel_count
-            size_2 = self.occluders.get(keys[1]).pixel_count
-            if size_1 > size_2 and size_1 > 20000:
-                self.occluders.pop(keys[0])
-            elif size_2 > size_1 and size_2 > 20000:
-                self.occluders.pop(keys[1])
-
-        keys = list(self.occluders.keys())
-        for key in keys:
-            self.objects.pop(key)
-
+        """Move the occluders from the objects to the occluders (see occluderrules.classify_occluders)"""
+        pixel_count, minx, maxx, miny, maxy = objects_to_arrays(self.objects)
+        is_occluder = classify_occluders(np.zeros(len(self.objects)), pixel_count, minx, maxx, miny, maxy)
+        self.split_occluders(is_occluder)
 
     def clean_up_O3(self):
-        self.occluders = copy.deepcopy(self.objects)
-        to_be_removed = []
-        for key, val in self.occluders.items():
-
-            if val.pixel_count > 1300 and val.aspect_ratio > 3:
-                continue
-
-            if val.pixel_count < 1500:
-                to_be_removed.append(key)
-                continue
-
-            if val.pixel_count > 20000:
-                to_be_removed.append(key)
-                continue
-
-        for x in to_be_removed:
-            self.occluders.pop(x)
-
-        keys = list(self.occluders.keys())
-        for key in keys:
-            self.objects.pop(key)
-
+        """Move the occluders from the objects to the occluders (see occluderrules.classify_O3)"""
+        self.split_occluders(classify_O3(*objects_to_arrays(self.objects)))
         return self.occluders
 
+    def split_occluders(self, is_occluder):
+        keys = list(self.objects.keys())
+        self.occluders = {key: self.objects.pop(key) for key, occluder in zip(keys, is_occluder) if occluder}
+
     @staticmethod
     def are_masks_same(mask1, mask2):
         """ Determine if two masks are same"""
@@ -174,13 +163,7 @@ class MaskInfo:
         if not mask1.orig_num_objects == mask2.orig_num_objects:
             return False
 
-        for obj1 in mask1.get_obj().values():
-            found = False
-            for obj2 in mask2.get_obj().values():
-                if FrameObject.are_objects_same(obj1, obj2):
-                    found = True
-                    break
-            if not found:
-                return False
-
-        return True
+        # Every object of mask1 must have the same box as some object of mask2
+        same = FrameRegions.are_objects_same(FrameRegions.from_objects(mask1.get_obj()),
+                                             FrameRegions.from_objects(mask2.get_obj()))
+        return bool(same.any(axis=1).all())
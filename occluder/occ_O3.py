@@ -4,9 +4,9 @@
 # This one is for O3, which is a little different from O1 and O2.  The logic for O1/O2 didn't quite
 # work for O3.
 
-import json
 import time
 
+import numpy as np
 from PIL import Image, ImageDraw
 from pathlib import Path
 import matplotlib.pyplot as plt
@@ -15,7 +15,11 @@ from matplotlib.widgets import Slider
 import sys
 
 from frameobject import FrameObject
+from batch_status import make_parser, run_batch, status_file_name, write_status
 from maskinfo import MaskInfo
+from prefetch import FramePrefetcher
+from regionindex import open_region_index
+from tracker import ObjectTracker, match_objects
 
 purpose = 'images'  # 'view   # 'status'
 
@@ -28,9 +32,11 @@ white = (255, 255, 255)
 
 class OccluderViewer:
 
-    def __init__(self):
+    def __init__(self, data_dir=datadir, status_dir="status", region_index=None):
         self.test_num = 1
-        self.dataDir = Path(datadir)
+        self.dataDir = Path(data_dir)
+        self.statusDir = Path(status_dir)
+        self.regionIndex = open_region_index(region_index) if region_index else None
         self.masks = []
 
     def set_test_num(self, test_num):
@@ -41,7 +47,7 @@ class OccluderViewer:
     def process_mask(self, mask_path, frame_num):
         self.masks.clear()
         for scene in range(4):
-            self.masks.append(MaskInfo(mask_path / str(scene + 1), frame_num))
+            self.masks.append(MaskInfo(mask_path / str(scene + 1), frame_num, index=self.regionIndex))
 
     def update_slider(self, val):
         # Change the frame
@@ -49,27 +55,29 @@ class OccluderViewer:
         # self.process_mask(self.dataDir / self.test_num_string, frame_num)
 
         # match occluders
-        mask = MaskInfo(self.dataDir / self.test_num_string / str(1))
+        mask = MaskInfo(self.dataDir / self.test_num_string / str(1), index=self.regionIndex)
         all_obj = mask.get_objects_for_frame(frame_num)
         new_obj = self.get_matched_obj(self.obj, all_obj)
 
-        # Draw the images
-        for scene_num in range(0, 4):
-            img_src = self.get_overlaid_image(frame_num, scene_num)
-            self.axs[scene_num].imshow(img_src)
+        # Show the images, made ahead of time on the prefetch threads, and start on the next ones
+        self.show_images(self.prefetcher.get(self.test_num, frame_num))
+        self.prefetcher.prefetch(self.test_num, frame_num)
 
         self.obj = new_obj
 
         self.fig.canvas.draw_idle()
 
     def get_overlaid_image(self, frame_num, scene_num):
+        return self.draw_overlay(self.test_num_string, frame_num, scene_num, self.masks[scene_num])
+
+    def draw_overlay(self, test_num_string, frame_num, scene_num, mask):
         frame_num_string = str(frame_num).zfill(3)
-        image_name = self.dataDir / self.test_num_string / str(scene_num + 1) / "scene" / (
+        image_name = self.dataDir / test_num_string / str(scene_num + 1) / "scene" / (
                 "scene_" + frame_num_string + ".png")
 
         img_src = Image.open(image_name)
         draw = ImageDraw.Draw(img_src)
-        for obj in self.masks[scene_num].get_obj().values():
+        for obj in mask.get_obj().values():
             draw_color = white
             if obj.label is 'sky':
                 draw_color = red
@@ -79,6 +87,20 @@ class OccluderViewer:
 
         return img_src
 
+    def render_frame(self, test_num, frame_num):
+        """The 4 scene images of a frame with the objects of frame 50 outlined, as arrays ready to show.
+        Does not use the viewer's state, so the prefetcher can run it on its threads."""
+        test_num_string = str(test_num).zfill(4)
+        images = []
+        for scene_num in range(0, 4):
+            mask = MaskInfo(self.dataDir / test_num_string / str(scene_num + 1), 50, index=self.regionIndex)
+            images.append(np.asarray(self.draw_overlay(test_num_string, frame_num, scene_num, mask)))
+        return images
+
+    def show_images(self, images):
+        for scene_num in range(0, 4):
+            self.axesImages[scene_num].set_data(images[scene_num])
+
     def write_to_occ_or_not(self):
         # which scene and frame
         scene_num = 1
@@ -90,9 +112,9 @@ class OccluderViewer:
                 "scene_" + frame_num_string + ".png")
         img_src = Image.open(image_name)
 
-        mask = MaskInfo(self.dataDir / self.test_num_string / str(scene_num))
+        mask = MaskInfo(self.dataDir / self.test_num_string / str(scene_num), index=self.regionIndex)
         mask.get_objects_for_frame(frame_num)
-        obj = mask.clean_up_O3_50()
+        obj = mask.clean_up_O3()
         if len(obj) == 0:
             img_src.save("./has_no_occluder/test_" + self.test_num_string + ".png")
             print("Test {} has no occ".format(self.test_num_string))
@@ -101,33 +123,9 @@ class OccluderViewer:
             print("Test {} has occ {}".format(self.test_num_string, len(obj)))
 
     def get_matched_obj(self, old, new):
-        ret_obj = {}
-        for old_key, old_val in old.items():
-            old_mid = old_val.get_mid()
-            # print("   Old mid {} {}".format(old_mid[0], old_mid[1]))
-
-            # find closest
-            smallest_dist = 1000000
-            closest_object = None
-            for new_key, new_val in new.items():
-                dx_left = old_val.minx - new_val.minx
-                dx_right = old_val.maxx - new_val.maxx
-                dy_left = old_val.miny - new_val.miny
-                dy_right = old_val.maxy - new_val.maxy
-
-                dist = dx_left * dx_left + dx_right * dx_right + dy_left * dy_left + dy_right * dy_right
-
-                # print("  dist {} ".format(dist))
-
-                if dist < smallest_dist:  # and diff_size < 0.5:
-                    smallest_dist = dist
-                    closest_object = new_key
-
-            ret_obj[closest_object] = new[closest_object]
-            ret_mid = ret_obj[closest_object].get_mid()
-            # print("   New mid {} {}".format(ret_mid[0], ret_mid[1]))
-
-        return ret_obj
+        """Match each old object to a different new object, with the smallest total box distance"""
+        matches = match_objects(old, new)
+        return {new_key: new[new_key] for new_key in matches.values()}
 
     def write_out_status_for_scene(self, scene_num):
         # Create the json object
@@ -139,9 +137,9 @@ class OccluderViewer:
 
         # Get number of occluders in frame 50
         frame_num = 50
-        mask = MaskInfo(self.dataDir / self.test_num_string / str(scene_num))
+        mask = MaskInfo(self.dataDir / self.test_num_string / str(scene_num), index=self.regionIndex)
         mask.get_objects_for_frame(frame_num)
-        obj_50 = mask.clean_up_O3_50()
+        obj_50 = mask.clean_up_O3()
 
         # If no occluders in frame 50, write out and return
         if len(obj_50) == 0:
@@ -153,104 +151,47 @@ class OccluderViewer:
                 frame_info["masks"] = mask_info
                 frames.append(frame_info)
             status_json["frames"] = frames
-            status_path = Path(("status/status_" + str(self.test_num).zfill(4) + ".json"))
-            with status_path.open("w") as outfile:
-                json.dump(status_json, outfile, indent=4)
+            status_path = write_status(self.statusDir / status_file_name(self.test_num), status_json)
             print("Wrote no occluders for {}".format(self.test_num_string))
-            return
+            return status_path
 
-        # Dictionary to hold the frame information, since not sequential
-        frame_dict = {}
-
-        # Get the info for frame 50
         print("found {} occluders in test {}".format(len(obj_50), self.test_num_string))
 
-        frame_info = {}
-        frame_info["frame"] = frame_num
-        mask_info = {}
-        listofTuples = sorted(obj_50.items(), key=lambda x: x[1].minx)
-        occluder_counter = 1
-        for elem in listofTuples:
-            occluder_name = "occluder" + str(occluder_counter)
-            mask_info[occluder_name] = elem[0]
-            occluder_counter = occluder_counter + 1
-        frame_info["masks"] = mask_info
-        frame_dict[50] = frame_info
-
-        # go forward in time
-        last_obj = obj_50
-        for frame_num in range(51, 101):
-            frame_info = {}
-            frame_info["frame"] = frame_num
-            mask_info = {}
-
-            mask = MaskInfo(self.dataDir / self.test_num_string / str(scene_num))
-            current_obj = mask.get_objects_for_frame(frame_num)
-            match_obj = self.get_matched_obj(last_obj, current_obj)
+        # Track the occluders of frame 50 forward and backward in time
+        frame_objects = [dict(mask.get_objects_for_frame(frame_num)) for frame_num in range(1, 101)]
+        tracks = ObjectTracker().track(frame_objects, start=49, targets=obj_50)
 
-            if len(match_obj) != len(last_obj):
+        frames = []
+        for frame_num in range(1, 101):
+            frame_tracks = tracks[frame_num - 1]
+            if len(frame_tracks) != len(obj_50):
                 print("Problem in test {} scene {} frame {}. Wrong num ".format(self.test_num, scene_num, frame_num))
-                print("expected {} but got {}".format(str(len(last_obj)), str(len(match_obj))))
+                print("expected {} but got {}".format(str(len(obj_50)), str(len(frame_tracks))))
                 return
 
-            occluder_counter = 1
-            # this will sort the occluders by the left-most pixel
-            listofTuples = sorted(match_obj.items(), key=lambda x: x[1].minx)
-            for elem in listofTuples:
-                # print(elem[0], " ::", elem[1])
-                occluder_name = "occluder" + str(occluder_counter)
-                mask_info[occluder_name] = elem[0]
-                occluder_counter = occluder_counter + 1
-            frame_info["masks"] = mask_info
-            frame_dict[frame_num] = frame_info
-
-            last_obj = match_obj
-
-        # go backward in time
-        last_obj = obj_50
-        for frame_num in range(49, 0, -1):
             frame_info = {}
             frame_info["frame"] = frame_num
             mask_info = {}
-
-            mask = MaskInfo(self.dataDir / self.test_num_string / str(scene_num))
-            current_obj = mask.get_objects_for_frame(frame_num)
-            match_obj = self.get_matched_obj(last_obj, current_obj)
-
-            if len(match_obj) != len(last_obj):
-                print("Problem in test {} scene {} frame {}. Wrong num ".format(self.test_num, scene_num, frame_num))
-                print("expected {} but got {}".format(str(len(last_obj)), str(len(match_obj))))
-                return
-
             occluder_counter = 1
             # this will sort the occluders by the left-most pixel
-            listofTuples = sorted(match_obj.items(), key=lambda x: x[1].minx)
-            for elem in listofTuples:
-                # print(elem[0], " ::", elem[1])
+            colors = sorted(frame_tracks.values(), key=lambda color: frame_objects[frame_num - 1][color].minx)
+            for color in colors:
                 occluder_name = "occluder" + str(occluder_counter)
-                mask_info[occluder_name] = elem[0]
+                mask_info[occluder_name] = int(color)
                 occluder_counter = occluder_counter + 1
             frame_info["masks"] = mask_info
-            frame_dict[frame_num] = frame_info
-
-            last_obj = match_obj
-
-        # convert from frame_dict to frames
-        frames = []
-        for frame_num in range(1, 101):
-            frames.append(frame_dict[frame_num])
+            frames.append(frame_info)
         status_json["frames"] = frames
 
         # This one includes the scene num
         #         status_path = Path(("status/status_" + str(self.test_num) + "_" + str(scene_num) + ".json"))
-        status_path = Path(("status/status_" + str(self.test_num).zfill(4) + ".json"))
-        with status_path.open("w") as outfile:
-            json.dump(status_json, outfile, indent=4)
+        status_path = write_status(self.statusDir / status_file_name(self.test_num), status_json)
 
         print("wrote out data for test {}".format(self.test_num))
+        return status_path
 
     def write_out_status(self):
-        self.write_out_status_for_scene(1)
+        return self.write_out_status_for_scene(1)
         # for ii in range(0, 4):
         #     self.write_out_status_for_scene(ii + 1)
 
@@ -258,9 +199,9 @@ class OccluderViewer:
         # Get number of occluders in frame 50
         frame_num = 50
         scene_num = 1
-        mask = MaskInfo(self.dataDir / self.test_num_string / str(scene_num))
+        mask = MaskInfo(self.dataDir / self.test_num_string / str(scene_num), index=self.regionIndex)
         mask.get_objects_for_frame(frame_num)
-        self.obj = mask.clean_up_O3_50()
+        self.obj = mask.clean_up_O3()
 
     def update_keypress(self, event):
 
@@ -294,11 +235,14 @@ class OccluderViewer:
         self.test_num = test_num
         self.test_num_string = str(test_num).zfill(4)
         self.fig, self.axs = plt.subplots(1, 4)
+        self.axesImages = []
+        self.prefetcher = FramePrefetcher(self.render_frame)
+        self.prefetcher.prefetch(self.test_num, 50)
 
         for ii in range(0, 4):
             image_name = self.dataDir / self.test_num_string / str(ii + 1) / "scene" / "scene_001.png"
             img_src = mpimg.imread(str(image_name))
-            self.axs[ii].imshow(img_src)
+            self.axesImages.append(self.axs[ii].imshow(img_src))
             self.axs[ii].axis("off")
 
         axcolor = 'lightgoldenrodyellow'
@@ -314,8 +258,8 @@ class OccluderViewer:
 
     def divide(self):
         for test in range(1, 1081):
-            dc.set_test_num(test)
-            dc.write_to_occ_or_not()
+            self.set_test_num(test)
+            self.write_to_occ_or_not()
 
     def make_image(self):
         """Write out an image with occluders labeled"""
@@ -326,15 +270,15 @@ class OccluderViewer:
 
 
 if __name__ == "__main__":
-    dc = OccluderViewer()
+    opt = make_parser("Label the occluders of a block of tests", datadir, purpose).parse_args()
 
-    if purpose == 'images':
-        for test in range(1, 1081):
-            dc.set_test_num(test)
-            dc.make_image()
-    elif purpose == 'view':
-        dc.set_up_view(1)
+    if opt.purpose == 'status':
+        run_batch(OccluderViewer, opt.data_dir, opt.status_dir, opt.tests, opt.workers, opt.force, opt.region_index)
     else:
-        for test in range(1, 1081):
-            dc.set_test_num(test)
-            dc.write_out_status()
+        dc = OccluderViewer(opt.data_dir, opt.status_dir, opt.region_index)
+        if opt.purpose == 'images':
+            for test in opt.tests:
+                dc.set_test_num(test)
+                dc.make_image()
+        else:
+            dc.set_up_view(opt.tests[0])
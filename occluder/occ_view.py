@@ -2,7 +2,7 @@
 #  Training for occluders
 #
 
-import json
+import numpy as np
 from PIL import Image, ImageDraw
 from pathlib import Path
 import matplotlib.pyplot as plt
@@ -10,7 +10,10 @@ import matplotlib.image as mpimg
 from matplotlib.widgets import Slider
 import sys
 
+from batch_status import make_parser, run_batch, status_file_name, write_status
 from maskinfo import MaskInfo
+from prefetch import FramePrefetcher
+from regionindex import open_region_index
 
 purpose = 'images'  # 'view   # 'status'
 
@@ -23,9 +26,11 @@ white = (255, 255, 255)
 
 class OccluderViewer:
 
-    def __init__(self, data_dir):
+    def __init__(self, data_dir, status_dir="status", region_index=None):
         self.test_num = 1
         self.dataDir = Path(data_dir)
+        self.statusDir = Path(status_dir)
+        self.regionIndex = open_region_index(region_index) if region_index else None
         self.masks = []
 
     def set_test_num(self, test_num):
@@ -38,10 +43,9 @@ class OccluderViewer:
         frame_num = int(self.frame_slider.val)
         self.process_mask(self.dataDir / self.test_num_string, frame_num)
 
-        # Draw the images
-        for scene_num in range(0, 4):
-            img_src = self.get_overlaid_image(frame_num, scene_num)
-            self.axs[scene_num].imshow(img_src)
+        # Show the images, made ahead of time on the prefetch threads, and start on the next ones
+        self.show_images(self.prefetcher.get(self.test_num, frame_num))
+        self.prefetcher.prefetch(self.test_num, frame_num)
 
         self.fig.canvas.draw_idle()
 
@@ -50,13 +54,16 @@ class OccluderViewer:
         return len(self.masks[scene_num].get_obj())
 
     def get_overlaid_image(self, frame_num, scene_num):
+        return self.draw_overlay(self.test_num_string, frame_num, scene_num, self.masks[scene_num])
+
+    def draw_overlay(self, test_num_string, frame_num, scene_num, mask):
         frame_num_string = str(frame_num).zfill(3)
-        image_name = self.dataDir / self.test_num_string / str(scene_num + 1) / "scene" / (
+        image_name = self.dataDir / test_num_string / str(scene_num + 1) / "scene" / (
                 "scene_" + frame_num_string + ".png")
 
         img_src = Image.open(image_name)
         draw = ImageDraw.Draw(img_src)
-        for obj in self.masks[scene_num].get_obj().values():
+        for obj in mask.get_obj().values():
             draw_color = white
             if obj.label is 'sky':
                 draw_color = red
@@ -66,10 +73,24 @@ class OccluderViewer:
 
         return img_src
 
+    def render_frame(self, test_num, frame_num):
+        """The 4 scene images of a frame with its objects outlined, as arrays ready to show.
+        Does not use the viewer's state, so the prefetcher can run it on its threads."""
+        test_num_string = str(test_num).zfill(4)
+        images = []
+        for scene_num in range(0, 4):
+            mask = MaskInfo(self.dataDir / test_num_string / str(scene_num + 1), frame_num, index=self.regionIndex)
+            images.append(np.asarray(self.draw_overlay(test_num_string, frame_num, scene_num, mask)))
+        return images
+
+    def show_images(self, images):
+        for scene_num in range(0, 4):
+            self.axesImages[scene_num].set_data(images[scene_num])
+
     def process_mask(self, mask_path, frame_num):
         self.masks.clear()
         for scene in range(4):
-            self.masks.append(MaskInfo(mask_path / str(scene + 1), frame_num))
+            self.masks.append(MaskInfo(mask_path / str(scene + 1), frame_num, index=self.regionIndex))
 
     def write_out_status_for_scene(self, scene_num):
 
@@ -88,7 +109,7 @@ class OccluderViewer:
             frame_info["frame"] = frame_num
             mask_info = {}
 
-            mask = MaskInfo(self.dataDir / self.test_num_string / str(scene_num), frame_num)
+            mask = MaskInfo(self.dataDir / self.test_num_string / str(scene_num), frame_num, index=self.regionIndex)
             obj = mask.get_obj()
             if num == -1:
                 num = len(obj)
@@ -103,7 +124,7 @@ class OccluderViewer:
             for elem in listofTuples:
                 # print(elem[0], " ::", elem[1])
                 occluder_name = "occluder" + str(occluder_counter)
-                mask_info[occluder_name] = elem[0]
+                mask_info[occluder_name] = int(elem[0])
                 occluder_counter = occluder_counter + 1
             frame_info["masks"] = mask_info
             frames.append(frame_info)
@@ -111,14 +132,13 @@ class OccluderViewer:
 
         # This one includes the scene num
         #         status_path = Path(("status/status_" + str(self.test_num) + "_" + str(scene_num) + ".json"))
-        status_path = Path(("status/status_" + str(self.test_num).zfill(4) + ".json"))
-        with status_path.open("w") as outfile:
-            json.dump(status_json, outfile, indent=4)
+        status_path = write_status(self.statusDir / status_file_name(self.test_num), status_json)
 
         print("wrote out data for test {}".format(self.test_num))
+        return status_path
 
     def write_out_status(self):
-        self.write_out_status_for_scene(1)
+        return self.write_out_status_for_scene(1)
         # for ii in range(0, 4):
         #     self.write_out_status_for_scene(ii + 1)
 
@@ -150,11 +170,14 @@ class OccluderViewer:
 
         self.set_test_num(test_num)
         self.fig, self.axs = plt.subplots(1, 4)
+        self.axesImages = []
+        self.prefetcher = FramePrefetcher(self.render_frame)
+        self.prefetcher.prefetch(self.test_num, 50)
 
         for ii in range(0, 4):
             image_name = self.dataDir / self.test_num_string / str(ii + 1) / "scene" / "scene_001.png"
             img_src = mpimg.imread(str(image_name))
-            self.axs[ii].imshow(img_src)
+            self.axesImages.append(self.axs[ii].imshow(img_src))
             self.axs[ii].axis("off")
 
         axcolor = 'lightgoldenrodyellow'
@@ -176,15 +199,15 @@ class OccluderViewer:
 
 
 if __name__ == "__main__":
-    dc = OccluderViewer(datadir)
-
-    if purpose == 'images':
-        for test in range(1, 1081):
-            dc.set_test_num(test)
-            dc.make_image()
-    elif purpose == 'view':
-        dc.set_up_view(1)
+    opt = make_parser("Label the occluders of a block of tests", datadir, purpose).parse_args()
+
+    if opt.purpose == 'status':
+        run_batch(OccluderViewer, opt.data_dir, opt.status_dir, opt.tests, opt.workers, opt.force, opt.region_index)
     else:
-        for test in range(1, 1081):
-            dc.set_test_num(test)
-            dc.write_out_status()
+        dc = OccluderViewer(opt.data_dir, opt.status_dir, opt.region_index)
+        if opt.purpose == 'images':
+            for test in opt.tests:
+                dc.set_test_num(test)
+                dc.make_image()
+        else:
+            dc.set_up_view(opt.tests[0])
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2019 Next Century Corporation
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+"""
+The occluder rules of MaskInfo as predicates over arrays of regions, so the
+regions of many frames (up to a whole block, from a RegionIndex) are
+classified at once.  Each function takes one value per region in arrays
+and returns a boolean array that is True for the occluders.  For the
+O1/O2 rules, the regions of a frame must be next to each other, in
+increasing color order (as MaskInfo and RegionIndex keep them), because
+the rules depend on the regions before them in the frame.
+"""
+import numpy as np
+
+# Last pixel of the 288x288 masks, and the row where the ground starts
+MAX_PIXEL = 287
+GROUND_TOP = 152
+
+
+def aspect_ratios(minx, maxx, miny, maxy):
+    """The aspect ratios of the boxes, as FrameObject.calcAR computes them"""
+    dx = np.abs(np.asarray(maxx, dtype=np.int64) - minx)
+    dy = np.abs(np.asarray(maxy, dtype=np.int64) - miny)
+    return np.where(dy > 0, dx / np.maximum(dy, 1), 1.0)
+
+
+def objects_to_arrays(objects):
+    """Get the pixel_count, minx, maxx, miny, maxy arrays of a dict of FrameObjects"""
+    values = np.array([[obj.pixel_count, obj.minx, obj.maxx, obj.miny, obj.maxy] for obj in objects.values()],
+                      dtype=np.int64).reshape(len(objects), 5)
+    return values.T
+
+
+def classify_occluders(frame_ids, pixel_count, minx, maxx, miny, maxy):
+    """The O1/O2 rules of MaskInfo.clean_up_occluders: sky and ground are not occluders,
+    nor are small regions or medium ones that are about as wide as tall.  Big regions are
+    occluders once the sky and the ground were found earlier in the frame, as are wide and
+    flat or large enough regions.  Then if two occluders are left in a frame and one is much
+    bigger, it is the ground."""
+    frame_ids = np.asarray(frame_ids)
+    pixel_count = np.asarray(pixel_count)
+    minx, maxx, miny, maxy = (np.asarray(values) for values in (minx, maxx, miny, maxy))
+    num = len(pixel_count)
+    if num == 0:
+        return np.zeros(0, dtype=bool)
+    aspect_ratio = aspect_ratios(minx, maxx, miny, maxy)
+
+    full_width = (minx == 0) & (maxx == MAX_PIXEL)
+    sky = full_width & (miny == 0) & (maxy > 100)
+    ground = full_width & (miny == GROUND_TOP) & (maxy > 200)
+    not_occluder = (sky | ground | (pixel_count < 501) |
+                    ((pixel_count > 500) & (pixel_count < 1680) & (aspect_ratio > 0.5) & (aspect_ratio < 1.8)))
+
+    # Whether the sky and the ground were found at or before each region in its frame
+    frame_start = np.ones(num, dtype=bool)
+    frame_start[1:] = frame_ids[1:] != frame_ids[:-1]
+    start_index = np.flatnonzero(frame_start)
+    frame_of_row = np.cumsum(frame_start) - 1
+    sky_count = np.cumsum(sky)
+    ground_count = np.cumsum(ground)
+    sky_found = sky_count - (sky_count - sky)[start_index][frame_of_row] > 0
+    ground_found = ground_count - (ground_count - ground)[start_index][frame_of_row] > 0
+
+    occluder = ~not_occluder & ((sky_found & ground_found & (pixel_count > 10000)) | (aspect_ratio > 3) |
+                                (pixel_count > 1400))
+
+    # If there are two left in a frame and one is much bigger, then it is the ground
+    occluders_in_frame = np.add.reduceat(occluder.astype(np.int64), start_index)
+    rows = np.flatnonzero(occluder)
+    two_left = occluders_in_frame[frame_of_row[rows]] == 2
+    pairs = rows[two_left].reshape(-1, 2)
+    size_1 = pixel_count[pairs[:, 0]]
+    size_2 = pixel_count[pairs[:, 1]]
+    occluder[pairs[:, 0][(size_1 > size_2) & (size_1 > 20000)]] = False
+    occluder[pairs[:, 1][(size_2 > size_1) & (size_2 > 20000)]] = False
+    return occluder
+
+
+def classify_O3(pixel_count, minx, maxx, miny, maxy):
+    """The O3 rules of MaskInfo.clean_up_O3: wide and flat regions of more than 1300
+    pixels are occluders, as are regions of 1500 to 20000 pixels"""
+    pixel_count = np.asarray(pixel_count)
+    aspect_ratio = aspect_ratios(minx, maxx, miny, maxy)
+    return ((pixel_count > 1300) & (aspect_ratio > 3)) | ((pixel_count >= 1500) & (pixel_count <= 20000))
+
+
+def classify_region_index(index, o3=False):
+    """Classify every region of a RegionIndex (a whole block) in one call.  Returns a
+    boolean array in the order of the index rows."""
+    if o3:
+        return classify_O3(index.pixel_count, index.minx, index.maxx, index.miny, index.maxy)
+    return classify_occluders(index.key, index.pixel_count, index.minx, index.maxx, index.miny, index.maxy)
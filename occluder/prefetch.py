@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2019 Next Century Corporation
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+NUM_FRAMES = 100
+
+# The frame shown when the viewer changes to another test
+TEST_START_FRAME = 50
+
+
+class FramePrefetcher:
+    """
+    Renders the frames around the one being viewed on worker threads and keeps the
+    results in a bounded least recently used cache, so moving the slider or changing
+    the test only shows images that are already made.  render(test_num, frame_num)
+    makes whatever the viewer shows for a frame; it must be safe to call from threads.
+    """
+
+    def __init__(self, render, max_frames=64, workers=2, frame_radius=3):
+        self.render = render
+        self.max_frames = max_frames
+        self.frame_radius = frame_radius
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.lock = threading.Lock()
+        self.done = OrderedDict()
+        self.pending = {}
+
+    def get(self, test_num, frame_num):
+        """Get the rendered frame, waiting for it (or rendering it now) if it is not ready"""
+        key = (test_num, frame_num)
+        with self.lock:
+            if key in self.done:
+                self.done.move_to_end(key)
+                return self.done[key]
+            future = self.pending.get(key)
+        if future is None or future.cancelled():
+            return self.__store(key, self.render(test_num, frame_num))
+        return future.result()
+
+    def prefetch(self, test_num, frame_num):
+        """Start rendering the frames within frame_radius of the frame, and the start frames
+        of the next and previous tests.  Pending frames that are no longer near are dropped."""
+        wanted = [(test_num, frame) for offset in range(1, self.frame_radius + 1)
+                  for frame in (frame_num + offset, frame_num - offset) if 1 <= frame <= NUM_FRAMES]
+        wanted += [(test_num + 1, TEST_START_FRAME)]
+        if test_num > 1:
+            wanted += [(test_num - 1, TEST_START_FRAME)]
+        wanted = wanted[:self.max_frames]
+
+        with self.lock:
+            for key in list(self.pending):
+                if key not in wanted and self.pending[key].cancel():
+                    del self.pending[key]
+            for key in wanted:
+                if key not in self.done and key not in self.pending:
+                    self.pending[key] = self.executor.submit(self.__render, key)
+
+    def __render(self, key):
+        try:
+            return self.__store(key, self.render(*key))
+        finally:
+            with self.lock:
+                self.pending.pop(key, None)
+
+    def __store(self, key, result):
+        with self.lock:
+            self.done[key] = result
+            self.done.move_to_end(key)
+            while len(self.done) > self.max_frames:
+                self.done.popitem(last=False)
+        return result
+
+    def clear(self):
+        with self.lock:
+            for future in self.pending.values():
+                future.cancel()
+            self.pending.clear()
+            self.done.clear()
+
+    def close(self):
+        self.clear()
+        self.executor.shutdown(wait=False)
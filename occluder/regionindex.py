@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2019 Next Century Corporation
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+"""
+Region index of a block of tests: the pixel count, bounding box and
+centroid of every color of every mask (test, scene, frame), found once by
+decoding the masks in parallel and stored as columns in one .npz file
+(regions.npz in the block directory by default).  The rows are sorted by
+(test, scene, frame), so the objects of a frame are found with a binary
+search instead of decoding its mask.
+
+Usage:
+   python3 regionindex.py --data-dir /path/to/test/O1 [--workers N] [--output regions.npz]
+
+"""
+import argparse
+import json
+import multiprocessing
+import os
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from frameobject import FrameObject
+from frameregions import FrameRegions
+from maskinfo import get_frame_objects
+
+INDEX_FILE_NAME = "regions.npz"
+NUM_SCENES = 4
+NUM_FRAMES = 100
+
+COLUMNS = ["key", "color", "pixel_count", "minx", "maxx", "miny", "maxy", "centroidx", "centroidy"]
+COLUMN_TYPES = {"key": np.int64, "pixel_count": np.int32, "minx": np.int16, "maxx": np.int16, "miny": np.int16,
+                "maxy": np.int16, "centroidx": np.float64, "centroidy": np.float64}
+
+
+def frame_key(test_num, scene_num, frame_num):
+    """The sort key of a frame: frames are sorted by test, then scene, then frame"""
+    return (int(test_num) * 8 + int(scene_num)) * 128 + int(frame_num)
+
+
+def index_test(task):
+    """Find the regions of every frame of one test.  Returns the test number, the
+    columns (None if no mask was found) and a list of error messages."""
+    data_dir, test_num = task
+    rows = {name: [] for name in COLUMNS}
+    errors = []
+    for scene_num in range(1, NUM_SCENES + 1):
+        masks_dir = Path(data_dir) / str(test_num).zfill(4) / str(scene_num) / "masks"
+        for frame_num in range(1, NUM_FRAMES + 1):
+            mask_filename = masks_dir / ("masks_" + str(frame_num).zfill(3) + ".png")
+            try:
+                objects = get_frame_objects(np.array(Image.open(mask_filename)))
+            except Exception as e:
+                errors.append("{}: {}".format(type(e).__name__, e))
+                continue
+            key = frame_key(test_num, scene_num, frame_num)
+            for color, obj in objects.items():
+                rows["key"].append(key)
+                rows["color"].append(color)
+                for name in COLUMNS[2:]:
+                    rows[name].append(getattr(obj, name))
+
+    if len(rows["key"]) == 0:
+        return test_num, None, errors
+    columns = {name: np.array(values, dtype=COLUMN_TYPES.get(name)) for name, values in rows.items()}
+    return test_num, columns, errors
+
+
+def build_region_index(data_dir, output=None, test_nums=None, workers=1):
+    """Index the tests (default every test directory) of the block directory in
+    parallel and save the index.  Returns the path of the index and the errors by test."""
+    data_dir = Path(data_dir)
+    output = Path(output) if output is not None else data_dir / INDEX_FILE_NAME
+    if test_nums is None:
+        test_nums = sorted(int(name) for name in os.listdir(data_dir) if name.isdigit())
+    print("Indexing {} tests in {} with {} worker(s)".format(len(test_nums), data_dir, workers))
+
+    tasks = [(data_dir, test_num) for test_num in test_nums]
+    parts = []
+    errors = {}
+    pool = multiprocessing.Pool(workers) if workers > 1 else None
+    try:
+        # imap keeps the tests in order, so the rows stay sorted by key
+        results = pool.imap(index_test, tasks) if pool else map(index_test, tasks)
+        for count, (test_num, columns, test_errors) in enumerate(results, 1):
+            if columns is not None:
+                parts.append(columns)
+            if test_errors:
+                errors[test_num] = test_errors
+            if count % 100 == 0 or count == len(tasks):
+                print("[{}/{}] indexed".format(count, len(tasks)))
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+
+    columns = {name: np.concatenate([part[name] for part in parts]) if parts else np.zeros(0, COLUMN_TYPES.get(name))
+               for name in COLUMNS}
+    header = {"block": data_dir.name, "tests": len(test_nums)}
+    columns["header"] = np.frombuffer(json.dumps(header).encode("utf-8"), dtype=np.uint8)
+    temp_path = output.with_name(output.name + ".tmp")
+    with temp_path.open("wb") as file:
+        np.savez(file, **columns)
+    os.replace(temp_path, output)
+
+    print("Wrote {} regions to {}, {} tests with errors.".format(len(columns["key"]), output, len(errors)))
+    for test_num in sorted(errors):
+        print("Test {}: {} missing frames, first: {}".format(test_num, len(errors[test_num]), errors[test_num][0]))
+    return output, errors
+
+
+class RegionIndex:
+    """Index of the regions of every frame of a block (see build_region_index)"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with np.load(self.path) as data:
+            self.header = json.loads(data["header"].tobytes().decode("utf-8"))
+            for name in COLUMNS:
+                setattr(self, name, data[name])
+        self.block = self.header["block"]
+
+    def __len__(self):
+        return len(self.key)
+
+    def __get_range(self, test_num, scene_num, frame_num):
+        key = frame_key(test_num, scene_num, frame_num)
+        return np.searchsorted(self.key, key, side="left"), np.searchsorted(self.key, key, side="right")
+
+    def has_frame(self, test_num, scene_num, frame_num):
+        start, end = self.__get_range(test_num, scene_num, frame_num)
+        return end > start
+
+    def get_objects(self, test_num, scene_num, frame_num):
+        """Get the dict of color to FrameObject of a frame, the same as decoding its
+        mask with get_frame_objects, or None if the frame is not in the index"""
+        start, end = self.__get_range(test_num, scene_num, frame_num)
+        if start == end:
+            return None
+        minx = self.minx[start:end].astype(np.intp)
+        maxx = self.maxx[start:end].astype(np.intp)
+        miny = self.miny[start:end].astype(np.intp)
+        maxy = self.maxy[start:end].astype(np.intp)
+        objects = {}
+        for i, color in enumerate(self.color[start:end]):
+            obj = FrameObject(color)
+            obj.set_region(int(self.pixel_count[start + i]), minx[i], maxx[i], miny[i], maxy[i],
+                           self.centroidx[start + i], self.centroidy[start + i])
+            objects[color] = obj
+        return objects
+
+    def get_regions(self, test_num=None, scene_num=None, frame_num=None):
+        """Get the regions of a frame (or of the whole block, if no frame is given) as FrameRegions"""
+        if test_num is None:
+            return FrameRegions.from_region_index(self)
+        start, end = self.__get_range(test_num, scene_num, frame_num)
+        return FrameRegions.from_region_index(self, start, end)
+
+    def get_objects_for_path(self, path, frame_num):
+        """Get the objects of a frame of the scene directory (like .../O1/0001/1), or
+        None if the scene is not of this block or the frame is not in the index"""
+        path = Path(path)
+        if path.parent.parent.name != self.block or not path.parent.name.isdigit() or not path.name.isdigit():
+            return None
+        return self.get_objects(int(path.parent.name), int(path.name), frame_num)
+
+
+# The indexes opened by open_region_index, so each process reads an index once
+_open_indexes = {}
+
+
+def open_region_index(path):
+    path = str(path)
+    if path not in _open_indexes:
+        _open_indexes[path] = RegionIndex(path)
+    return _open_indexes[path]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", required=True, help="Block directory, like .../test/O1")
+    parser.add_argument("--output", default=None, help="Index file to write (default regions.npz in the data dir)")
+    parser.add_argument("--workers", type=int, default=1, help="How many tests to index at once.")
+    opt = parser.parse_args()
+
+    build_region_index(opt.data_dir, opt.output, workers=opt.workers)
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2019 Next Century Corporation
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+"""
+Tracks objects (usually occluders) through the frames of a scene by
+matching their bounding boxes from frame to frame.  The distance between
+two boxes is the sum of the squared differences of minx, maxx, miny and
+maxy (as in the original greedy matching), and each frame is matched with
+an optimal assignment, so two tracks never get the same object.
+"""
+import numpy as np
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:
+    linear_sum_assignment = None
+
+
+def get_boxes(objects):
+    """Get the colors and the [n, 4] array of (minx, maxx, miny, maxy) of a dict of FrameObjects"""
+    colors = list(objects.keys())
+    boxes = np.array([[obj.minx, obj.maxx, obj.miny, obj.maxy] for obj in objects.values()],
+                     dtype=np.float64).reshape(len(colors), 4)
+    return colors, boxes
+
+
+def box_distances(old_boxes, new_boxes):
+    """Get the matrix of the distances from each old box (rows) to each new box (columns)"""
+    diff = old_boxes[:, None, :] - new_boxes[None, :, :]
+    return (diff * diff).sum(axis=2)
+
+
+def min_cost_assignment(cost):
+    """Get the (rows, columns) of the assignment with the smallest total cost, like
+    scipy.optimize.linear_sum_assignment.  Every row is assigned if there are no more
+    rows than columns, otherwise every column is."""
+    if linear_sum_assignment is not None:
+        return linear_sum_assignment(cost)
+
+    cost = np.asarray(cost, dtype=np.float64)
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    num_rows, num_cols = cost.shape
+
+    # Hungarian algorithm with potentials; row 0 and column 0 are dummies
+    u = np.zeros(num_rows + 1)
+    v = np.zeros(num_cols + 1)
+    col_row = np.zeros(num_cols + 1, dtype=np.intp)
+    way = np.zeros(num_cols + 1, dtype=np.intp)
+    for row in range(1, num_rows + 1):
+        col_row[0] = row
+        col = 0
+        min_slack = np.full(num_cols + 1, np.inf)
+        used = np.zeros(num_cols + 1, dtype=bool)
+        while col_row[col] != 0:
+            used[col] = True
+            current_row = col_row[col]
+            slack = cost[current_row - 1] - u[current_row] - v[1:]
+            free = ~used[1:]
+            better = free & (slack < min_slack[1:])
+            min_slack[1:][better] = slack[better]
+            way[1:][better] = col
+            candidates = np.where(free, min_slack[1:], np.inf)
+            next_col = int(candidates.argmin()) + 1
+            delta = candidates[next_col - 1]
+            u[col_row[used]] += delta
+            v[used] -= delta
+            min_slack[1:][free] -= delta
+            col = next_col
+        while col != 0:
+            prev_col = way[col]
+            col_row[col] = col_row[prev_col]
+            col = prev_col
+
+    cols = np.flatnonzero(col_row[1:]) + 1
+    rows = col_row[cols] - 1
+    cols = cols - 1
+    if transposed:
+        rows, cols = cols, rows
+    order = np.argsort(rows)
+    return rows[order], cols[order]
+
+
+def match_objects(old, new, max_distance=None):
+    """Match the objects of the old frame to those of the new frame (both dicts of
+    color to FrameObject) with the smallest total box distance.  Returns a dict of
+    old color to new color; matches farther than max_distance are left out."""
+    old_colors, old_boxes = get_boxes(old)
+    new_colors, new_boxes = get_boxes(new)
+    if len(old_colors) == 0 or len(new_colors) == 0:
+        return {}
+    distances = box_distances(old_boxes, new_boxes)
+    rows, cols = min_cost_assignment(distances)
+    return {old_colors[row]: new_colors[col] for row, col in zip(rows, cols)
+            if max_distance is None or distances[row, col] <= max_distance}
+
+
+class ObjectTracker:
+    """
+    Tracks objects through a whole sequence of frames.  Tracks start at the start
+    frame (numbered from 1 by left-most pixel) and are followed forward and backward
+    from it.  A track that is not matched in a frame keeps its last box, so it can be
+    matched again later.
+    """
+
+    def __init__(self, max_distance=None, new_tracks=False):
+        """Matches farther than max_distance are rejected.  If new_tracks is True,
+        objects that do not match any track start new tracks."""
+        self.max_distance = max_distance
+        self.new_tracks = new_tracks
+
+    def track(self, frames, start=0, targets=None):
+        """Track the objects of a list of frames (dicts of color to FrameObject).  Only
+        the targets (a dict of color to FrameObject, default all the objects) of the
+        start frame are tracked.  Returns a list with a dict of track ID to color for
+        each frame."""
+        if targets is None:
+            targets = frames[start]
+        start_tracks = {}
+        for track_id, (color, obj) in enumerate(sorted(targets.items(), key=lambda item: item[1].minx), 1):
+            start_tracks[track_id] = (color, obj)
+
+        result = [None] * len(frames)
+        result[start] = {track_id: color for track_id, (color, obj) in start_tracks.items()}
+        next_id = [len(start_tracks) + 1]
+        self.__follow(frames, range(start + 1, len(frames)), start_tracks, result, next_id)
+        self.__follow(frames, range(start - 1, -1, -1), start_tracks, result, next_id)
+        return result
+
+    def __follow(self, frames, frame_order, start_tracks, result, next_id):
+        # The last box of each track, keyed by track ID
+        last = {track_id: obj for track_id, (color, obj) in start_tracks.items()}
+        for index in frame_order:
+            objects = frames[index]
+            matches = match_objects(last, objects, self.max_distance)
+            ids = {}
+            for track_id, color in matches.items():
+                ids[track_id] = color
+                last[track_id] = objects[color]
+            if self.new_tracks:
+                matched = set(matches.values())
+                for color, obj in sorted(objects.items(), key=lambda item: item[1].minx):
+                    if color not in matched:
+                        ids[next_id[0]] = color
+                        last[next_id[0]] = obj
+                        next_id[0] += 1
+            result[index] = ids
@@ -5,10 +5,42 @@ from machine_common_sense.mcs_action_keys import MCS_Action_Keys
 from machine_common_sense.mcs_controller import MCS_Controller
 from machine_common_sense.mcs_controller_ai2thor import MCS_Controller_AI2THOR
 from machine_common_sense.mcs_goal import MCS_Goal
+from machine_common_sense.mcs_logging import MCS_Logging
 from machine_common_sense.mcs_material import MCS_Material
+from machine_common_sense.mcs_metrics import MCS_Metrics
 from machine_common_sense.mcs_object import MCS_Object
 from machine_common_sense.mcs_pose import MCS_Pose
 from machine_common_sense.mcs_return_status import MCS_Return_Status
+from machine_common_sense.mcs_scene_corpus import MCS_Scene_Corpus, MCS_Scene_Corpus_Writer
+from machine_common_sense.mcs_scene_fingerprint import MCS_Scene_Fingerprint, MCS_Scene_Fingerprint_Index
 from machine_common_sense.mcs_step_output import MCS_Step_Output
 from machine_common_sense.mcs_util import MCS_Util
 from machine_common_sense.run_mcs_human_input import main
+
+import importlib
+import sys
+import types
+
+# The modules above never import AI2-THOR, numpy, or Pillow until they are needed, so tools that only need lightweight
+# classes (like MCS_Action, MCS_Util, or MCS.load_config_json_file) start quickly.  The classes that always need numpy
+# are only imported when first used, by this module's class (a module-level __getattr__ needs Python 3.7).
+_LAZY_NAME_TO_MODULE = {
+    'MCS_Action_Constraints': 'machine_common_sense.mcs_action_constraints',
+    'MCS_Spatial_Index': 'machine_common_sense.mcs_spatial_index',
+    'MCS_Step_History': 'machine_common_sense.mcs_step_history'
+}
+
+class _MCS_Package(types.ModuleType):
+
+    def __dir__(self):
+        return sorted(set(super().__dir__()) | set(_LAZY_NAME_TO_MODULE.keys()))
+
+    def __getattr__(self, name):
+        if name not in _LAZY_NAME_TO_MODULE:
+            raise AttributeError("module '" + self.__name__ + "' has no attribute '" + name + "'")
+        value = getattr(importlib.import_module(_LAZY_NAME_TO_MODULE[name]), name)
+        # Cache the value so this function is not called again for the same name.
+        setattr(self, name, value)
+        return value
+
+sys.modules[__name__].__class__ = _MCS_Package
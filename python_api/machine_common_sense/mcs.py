@@ -1,12 +1,14 @@
 import json
-
-from machine_common_sense.mcs_controller_ai2thor import MCS_Controller_AI2THOR
+import os
 
 class MCS:
     """
     Defines utility functions for machine learning modules to create MCS controllers and handle config data files.
     """
 
+    # The packed scene corpora opened by load_config_from_corpus, by directory, so each index is only read once.
+    __corpus_dict = {}
+
     """
     Creates and returns a new MCS_Controller object.
 
@@ -15,15 +17,22 @@ class MCS:
     unity_app_file_path : str
         The file path to your MCS Unity application.
     debug : boolean, optional
+    history : MCS_Step_History, optional
+        A step history that the controller will fill with the output from each step and clear at the start of each
+        scene (default None).
+    metrics : MCS_Metrics, optional
+        A metrics registry that the controller will update on each step (default None).
 
     Returns
     -------
     MCS_Controller
     """
     @staticmethod
-    def create_controller(unity_app_file_path, debug=False):
+    def create_controller(unity_app_file_path, debug=False, history=None, metrics=None):
         # TODO: Toggle between AI2-THOR and other controllers like ThreeDWorld?
-        return MCS_Controller_AI2THOR(unity_app_file_path, debug)
+        # Imported here since AI2-THOR is slow to import and not needed to load config files.
+        from machine_common_sense.mcs_controller_ai2thor import MCS_Controller_AI2THOR
+        return MCS_Controller_AI2THOR(unity_app_file_path, debug, history, metrics)
 
     """
     Loads the given JSON config file and returns its data.
@@ -32,6 +41,9 @@ class MCS:
     ----------
     config_json_file_path : str
         The file path to your MCS JSON scene configuration file.
+    fingerprint_index : MCS_Scene_Fingerprint_Index, optional
+        If given, returns an error status for a scene with the same fingerprint as a scene already in the index (a
+        duplicate), and adds every other scene to the index (default None).
 
     Returns
     -------
@@ -41,13 +53,60 @@ class MCS:
         The error status (if any).
     """
     @staticmethod
-    def load_config_json_file(config_json_file_path):
+    def load_config_json_file(config_json_file_path, fingerprint_index=None):
         try:
             with open(config_json_file_path, encoding='utf-8-sig') as config_json_file_object:
                 try:
-                    return json.load(config_json_file_object), None
+                    config_data = json.load(config_json_file_object)
                 except ValueError:
                     return {}, "The given file '" + config_json_file_path + "' does not contain valid JSON."
         except IOError:
             return {}, "The given file '" + config_json_file_path + "' cannot be found."
+        return MCS.__check_duplicate(config_data, config_json_file_path, fingerprint_index)
+
+    """
+    Loads the scene with the given name from the packed scene corpus (see MCS_Scene_Corpus) in the given directory and
+    returns its data.  Only the scene itself is read from its shard.  The corpus index is read on the first call and
+    kept for later calls until its file changes.
+
+    Parameters
+    ----------
+    corpus_directory : str
+        The directory of the packed scene corpus.
+    name : str
+        The scene's name in the corpus (like "scene-0001.json").
+    fingerprint_index : MCS_Scene_Fingerprint_Index, optional
+        If given, returns an error status for a scene with the same fingerprint as a scene already in the index (a
+        duplicate), and adds every other scene to the index (default None).
+
+    Returns
+    -------
+    dict
+        The MCS scene configuration data.
+    None or string
+        The error status (if any).
+    """
+    @staticmethod
+    def load_config_from_corpus(corpus_directory, name, fingerprint_index=None):
+        from machine_common_sense.mcs_scene_corpus import MCS_Scene_Corpus
+        corpus = MCS.__corpus_dict.get(corpus_directory)
+        if corpus is None:
+            corpus = MCS.__corpus_dict[corpus_directory] = MCS_Scene_Corpus(corpus_directory)
+        try:
+            config_data = corpus.load(name)
+        except IOError:
+            return {}, "The given corpus '" + corpus_directory + "' cannot be found."
+        except KeyError:
+            return {}, "The given corpus '" + corpus_directory + "' does not contain the scene '" + name + "'."
+        except ValueError:
+            return {}, "The scene '" + name + "' in the given corpus '" + corpus_directory + \
+                    "' does not contain valid JSON."
+        return MCS.__check_duplicate(config_data, os.path.join(corpus_directory, name), fingerprint_index)
 
+    @staticmethod
+    def __check_duplicate(config_data, name, fingerprint_index):
+        if fingerprint_index is not None:
+            duplicate_name = fingerprint_index.add(config_data, name)
+            if duplicate_name is not None:
+                return {}, "The scene '" + name + "' is a duplicate of the scene '" + duplicate_name + "'."
+        return config_data, None
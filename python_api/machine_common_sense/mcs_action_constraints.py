@@ -0,0 +1,114 @@
+import numpy
+
+from machine_common_sense.mcs_action import MCS_Action
+from machine_common_sense.mcs_util import MCS_Util
+
+class MCS_Action_Constraints:
+    """
+    The actions available at each step of a scene, compiled once from a goal's action_list (like
+    [['MoveAhead', 'RotateLook,rotation=180'], []]) so checking an action never needs to parse any action strings.
+
+    An action string without parameters allows its action with any parameters.  An action string with parameters only
+    allows its action with exactly those parameters (numbers are compared as floats).  Each step past the end of the
+    action_list, or with an empty list or a list of only invalid action strings, allows all actions.
+
+    Attributes
+    ----------
+    ACTION_LIST : list of MCS_Action
+        The order of the actions in each action mask.
+    """
+
+    ACTION_LIST = list(MCS_Action)
+
+    __ACTION_TO_INDEX = dict((action.value, index) for index, action in enumerate(ACTION_LIST))
+
+    def __init__(self, action_list=None):
+        self.__all_allowed_mask = numpy.ones(len(self.ACTION_LIST), dtype=bool)
+        self.__all_allowed_mask.setflags(write=False)
+        # For each step: a set of actions allowed with any parameters, a set of hashable (action, parameters)
+        # constraints, and the action mask; or None if all actions are allowed.
+        self.__step_list = [self.__compile_step(step_action_list) for step_action_list in (action_list or [])]
+
+    """
+    Returns whether the given action with the given parameters is allowed at the given step.
+
+    Parameters
+    ----------
+    step_number : integer
+        The step, like in the MCS_Step_Output returned before taking the action.
+    action : string
+        The action string, without any parameters (like "RotateLook").
+    params : dict, optional
+        The parameters of the action (like {"rotation": 180}).
+
+    Returns
+    -------
+    boolean
+    """
+    def is_allowed(self, step_number, action, params=None):
+        step = self.__get_step(step_number)
+        if step is None:
+            return action in self.__ACTION_TO_INDEX
+        any_params_set, constraint_set, mask = step
+        if action in any_params_set:
+            return True
+        return (action, self.__to_hashable_params(params)) in constraint_set
+
+    """
+    Returns the action mask of the given step: a read-only boolean array, in the order of ACTION_LIST, that is True for
+    each action that is allowed with at least one set of parameters.  Use it to mask a policy's output without parsing
+    any action strings.
+
+    Parameters
+    ----------
+    step_number : integer
+        The step, like in the MCS_Step_Output returned before taking the action.
+
+    Returns
+    -------
+    numpy.ndarray
+    """
+    def get_action_mask(self, step_number):
+        step = self.__get_step(step_number)
+        return self.__all_allowed_mask if step is None else step[2]
+
+    def __compile_step(self, step_action_list):
+        if len(step_action_list) == 0:
+            return None
+
+        any_params_set = set()
+        constraint_set = set()
+        mask = numpy.zeros(len(self.ACTION_LIST), dtype=bool)
+        for action_string in step_action_list:
+            action, params = MCS_Util.input_to_action_and_params(action_string)
+            # Ignore invalid action strings, like the step function does.
+            if action is None or params is None:
+                continue
+            if len(params) == 0:
+                any_params_set.add(action)
+            else:
+                constraint_set.add((action, self.__to_hashable_params(params)))
+            mask[self.__ACTION_TO_INDEX[action]] = True
+
+        # If none of the action strings are valid, allow all actions rather than replacing every action with Pass.
+        if not mask.any():
+            return None
+
+        mask.setflags(write=False)
+        return frozenset(any_params_set), frozenset(constraint_set), mask
+
+    def __get_step(self, step_number):
+        return self.__step_list[step_number] if 0 <= step_number < len(self.__step_list) else None
+
+    def __to_hashable_params(self, params):
+        if not params:
+            return frozenset()
+        return frozenset((key, self.__to_hashable_value(value)) for key, value in params.items())
+
+    def __to_hashable_value(self, value):
+        if isinstance(value, (int, float, str)) and not isinstance(value, bool):
+            try:
+                return float(value)
+            except ValueError:
+                return value.strip()
+        return value
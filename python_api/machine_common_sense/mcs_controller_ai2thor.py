@@ -1,19 +1,22 @@
 import glob
 import json
+import logging
 import os
-from PIL import Image
-
-import ai2thor.controller
+import time
 
 from machine_common_sense.mcs_action import MCS_Action
 from machine_common_sense.mcs_controller import MCS_Controller
 from machine_common_sense.mcs_goal import MCS_Goal
+from machine_common_sense.mcs_logging import MCS_Lazy_Message, MCS_Logging
 from machine_common_sense.mcs_object import MCS_Object
 from machine_common_sense.mcs_pose import MCS_Pose
 from machine_common_sense.mcs_return_status import MCS_Return_Status
 from machine_common_sense.mcs_step_output import MCS_Step_Output
 from machine_common_sense.mcs_util import MCS_Util
 
+logger = MCS_Logging.get_logger(MCS_Logging.CONTROLLER)
+step_logger = MCS_Logging.get_logger(MCS_Logging.STEP)
+
 class MCS_Controller_AI2THOR(MCS_Controller):
     """
     MCS Controller class implementation for the AI2-THOR library.
@@ -73,9 +76,12 @@ class MCS_Controller_AI2THOR(MCS_Controller):
     OBJECT_MOVE_ACTIONS = ["CloseObject", "OpenObject"]
     MOVE_ACTIONS = ["MoveAhead", "MoveLeft", "MoveRight", "MoveBack"]
 
-    def __init__(self, unity_app_file_path, debug=False):
+    def __init__(self, unity_app_file_path, debug=False, history=None, metrics=None):
         super().__init__()
 
+        # Imported here since AI2-THOR is slow to import and not needed until a controller is created.
+        import ai2thor.controller
+
         self.__controller = ai2thor.controller.Controller(
             quality='Medium',
             fullscreen=False,
@@ -93,17 +99,37 @@ class MCS_Controller_AI2THOR(MCS_Controller):
             }
         )
 
-        self.on_init(debug)
+        # The AI2-THOR controller launches the MCS Unity application once, here, and this class never relaunches it.
+        if metrics is not None:
+            metrics.counter('mcs_controllers_started_total', 'Number of MCS controllers created (each one ' + \
+                    'launching the MCS Unity application).').inc()
 
-    def on_init(self, debug=False):
+        self.on_init(debug, history, metrics)
+
+    def on_init(self, debug=False, history=None, metrics=None):
         self.__debug_to_file = True if (debug is True or debug is 'file') else False
         self.__debug_to_terminal = True if (debug is True or debug is 'terminal') else False
 
+        # Keep the step output going to the terminal unless the user already set up logging themselves.
+        if self.__debug_to_terminal and not MCS_Logging.is_initialized():
+            MCS_Logging.init(level=logging.DEBUG)
+
+        # Imported here since numpy is slow to import and not needed until a controller is created.
+        from machine_common_sense.mcs_action_constraints import MCS_Action_Constraints
+        from machine_common_sense.mcs_spatial_index import MCS_Spatial_Index
+
+        self.__action_constraints = MCS_Action_Constraints()
         self.__current_scene = None
         self.__head_tilt = 0
         self.__output_folder = None # Save output image files to debug
         self.__step_number = 0
         self.__goal = None
+        self.__history = history
+        self.__metrics = metrics
+        self.__object_list = []
+        self.__position = None
+        self.__spatial_index = MCS_Spatial_Index()
+        self.__spatial_index_object_list = None
 
     # Override
     def end_scene(self, classification, confidence):
@@ -118,6 +144,14 @@ class MCS_Controller_AI2THOR(MCS_Controller):
         self.__current_scene = config_data
         self.__step_number = 0
         self.__goal = self.retrieve_goal(self.__current_scene)
+        from machine_common_sense.mcs_action_constraints import MCS_Action_Constraints
+        self.__action_constraints = MCS_Action_Constraints(self.__goal.action_list)
+
+        if self.__history is not None:
+            self.__history.clear()
+
+        if self.__metrics is not None:
+            self.__metrics.counter('mcs_scenes_total', 'Number of scenes started.').inc()
 
         if self.__debug_to_file and config_data['name'] is not None:
             os.makedirs('./' + config_data['name'], exist_ok=True)
@@ -231,30 +265,124 @@ class MCS_Controller_AI2THOR(MCS_Controller):
         super().step(action, **kwargs)
 
         if self.__goal.last_step is not None and self.__goal.last_step < self.__step_number:
-            print("MCS Warning: You have passed the last step of this scene. Skipping your action." + \
-                    "Please call controller.end_scene() now.")
+            logger.warning("You have passed the last step of this scene. Skipping your action. " + \
+                    "Please call controller.end_scene() now.", extra={'fields': {'step': self.__step_number}})
             return None
 
         if ',' in action:
             action, kwargs = MCS_Util.input_to_action_and_params(action)
 
         if not action in self.ACTION_LIST:
-            print("MCS Warning: The given action '" + action + "' is not valid. Exchanging it with the 'Pass' action.")
+            logger.warning("The given action '%s' is not valid. Exchanging it with the 'Pass' action.", action, \
+                    extra={'fields': {'step': self.__step_number}})
             action = "Pass"
 
+        elif not self.__action_constraints.is_allowed(self.__step_number, action, kwargs):
+            logger.warning("The given action '%s' is not allowed by the goal's action_list on this step. " + \
+                    "Exchanging it with the 'Pass' action.", action, extra={'fields': {'step': self.__step_number}})
+            action = "Pass"
+            kwargs = {}
+
         self.__step_number += 1
 
         if self.__debug_to_terminal:
-            print("===============================================================================")
-            print("STEP: " + str(self.__step_number))
-            print("ACTION: " + action)
+            step_logger.debug("ACTION: %s", action, extra={'fields': {'step': self.__step_number}})
 
         params = self.validate_and_convert_params(action, **kwargs)
 
         # Only call mcs_action_to_ai2thor_action AFTER calling validate_and_convert_params
+        mcs_action = action
         action = self.mcs_action_to_ai2thor_action(action)
 
-        return self.wrap_output(self.__controller.step(self.wrap_step(action=action, **params)))
+        if self.__metrics is None:
+            return self.wrap_output(self.__controller.step(self.wrap_step(action=action, **params)))
+
+        start_time = time.perf_counter()
+        scene_event = self.__controller.step(self.wrap_step(action=action, **params))
+        self.__metrics.histogram('mcs_step_latency_seconds', 'Time taken by the MCS Unity application to run ' + \
+                'each action.').observe(time.perf_counter() - start_time, action=mcs_action)
+        self.__metrics.counter('mcs_steps_total', 'Number of steps run.').inc(action=mcs_action)
+        return self.wrap_output(scene_event)
+
+    """
+    Returns the actions allowed on the current step, compiled from the goal's action_list at the start of the scene.
+
+    Returns
+    -------
+    MCS_Action_Constraints
+    """
+    def get_action_constraints(self):
+        return self.__action_constraints
+
+    """
+    Returns a read-only boolean array, in the order of MCS_Action, that is True for each action allowed on the current
+    step (with at least one set of parameters).
+
+    Returns
+    -------
+    numpy.ndarray
+    """
+    def get_action_mask(self):
+        return self.__action_constraints.get_action_mask(self.__step_number)
+
+    """
+    Returns the step history managed by this controller, or None if it was created without one.
+
+    Returns
+    -------
+    MCS_Step_History or None
+    """
+    def get_history(self):
+        return self.__history
+
+    """
+    Returns the objects whose footprints are within your reach (MAX_REACH_DISTANCE along the X/Z plane), nearest first.
+
+    Parameters
+    ----------
+    filter_function : function, optional
+        A function that is given an MCS_Object and returns whether it may be returned.
+
+    Returns
+    -------
+    list of (MCS_Object, float) tuples
+        Each object with the distance from your position to its footprint.
+    """
+    def get_objects_in_reach(self, filter_function=None):
+        if self.__position is None:
+            return []
+        return self.get_spatial_index().query_radius(self.__position, self.MAX_REACH_DISTANCE, filter_function)
+
+    """
+    Returns the spatial index over the objects from the latest step, updating it first if needed.
+
+    Returns
+    -------
+    MCS_Spatial_Index
+    """
+    def get_spatial_index(self):
+        # Only update the index when it is used, and only once per step.
+        if self.__spatial_index_object_list is not self.__object_list:
+            self.__spatial_index.update(self.__object_list)
+            self.__spatial_index_object_list = self.__object_list
+        return self.__spatial_index
+
+    """
+    Returns whether the given action with the given parameters is allowed on the current step.
+
+    Parameters
+    ----------
+    action : string
+        The action string, without any parameters (like "RotateLook").
+    **kwargs
+        The parameters of the action (like rotation=180).
+
+    Returns
+    -------
+    boolean
+    """
+    def is_action_allowed(self, action, **kwargs):
+        return self.__action_constraints.is_allowed(self.__step_number, action, kwargs)
 
     def mcs_action_to_ai2thor_action(self, action):
         if action == MCS_Action.CLOSE_OBJECT.value:
@@ -328,6 +456,9 @@ class MCS_Controller_AI2THOR(MCS_Controller):
         # TODO MCS-18 Return pose from Unity in step output object
         return MCS_Pose.STAND.name
 
+    def retrieve_position(self, scene_event):
+        return scene_event.metadata['agent'].get('position', None)
+
     def retrieve_return_status(self, scene_event):
         # TODO MCS-47 Need to implement all proper step statuses on the Unity side
         return_status = MCS_Return_Status.UNDEFINED.name
@@ -336,11 +467,13 @@ class MCS_Controller_AI2THOR(MCS_Controller):
             if scene_event.metadata['lastActionStatus']:
                 return_status = MCS_Return_Status[scene_event.metadata['lastActionStatus']].name
         except KeyError:
-            print("Return status " + scene_event.metadata['lastActionStatus'] + " is not currently supported.")
+            logger.warning("Return status %s is not currently supported.", scene_event.metadata['lastActionStatus'])
         finally:
             return return_status
 
     def save_images(self, scene_event):
+        from PIL import Image
+
         # TODO MCS-51 May have multiple images
         scene_image = Image.fromarray(scene_event.frame)
         # Divide the depth mask by 30 so it doesn't appear all white (some odd side effect of the depth grayscaling).
@@ -380,12 +513,20 @@ class MCS_Controller_AI2THOR(MCS_Controller):
         )
 
         self.__head_tilt = step_output.head_tilt
+        self.__object_list = step_output.object_list
+        self.__position = self.retrieve_position(scene_event)
 
-        if self.__debug_to_terminal:
-            print("RETURN STATUS: " + step_output.return_status)
-            print("OBJECTS (" + str(len(step_output.object_list)) + " TOTAL):")
-            for line in MCS_Util.generate_pretty_object_output(step_output.object_list):
-                print("    " + line)
+        if self.__history is not None:
+            self.__history.append(step_output)
+
+        if self.__metrics is not None:
+            self.update_metrics(step_output)
+
+        if self.__debug_to_terminal and step_logger.isEnabledFor(logging.DEBUG):
+            # The object table is only built if the record passes the filters, on the logging thread.
+            step_logger.debug("RETURN STATUS: %s\nOBJECTS (%d TOTAL):\n%s", step_output.return_status, \
+                    len(step_output.object_list), MCS_Lazy_Message(self.__pretty_object_output, \
+                    step_output.object_list), extra={'fields': {'step': self.__step_number}})
 
         if self.__debug_to_file and self.__output_folder is not None:
             with open(self.__output_folder + 'mcs_output_' + str(self.__step_number) + '.json', 'w') as json_file:
@@ -393,6 +534,17 @@ class MCS_Controller_AI2THOR(MCS_Controller):
 
         return step_output
 
+    def __pretty_object_output(self, object_list):
+        return "\n".join("    " + line for line in MCS_Util.generate_pretty_object_output(object_list))
+
+    def update_metrics(self, step_output):
+        self.__metrics.counter('mcs_return_status_total', 'Number of steps with each return status.').inc( \
+                status=step_output.return_status)
+        memory = MCS_Util.retrieve_memory_usage()
+        if memory is not None:
+            self.__metrics.gauge('mcs_memory_rss_bytes', 'Resident memory used by this process.').set(memory)
+        self.__metrics.maybe_write_snapshot()
+
     def wrap_step(self, **kwargs):
         # Create the step data dict for the AI2-THOR step function.
         step_data = dict(
@@ -0,0 +1,230 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+
+class MCS_Logging:
+    """
+    Defines the logging categories of the MCS Python Library and the functions to set up their handlers.
+
+    Every message is sent to a logger named after its category, with any structured data in a "fields" dict (passed
+    with the "extra" argument).  By default the library adds no handlers, so warnings go to the standard Python
+    "last resort" handler (stderr) and everything else is dropped.  Call MCS_Logging.init to log through a queue instead:
+    the calling thread only filters each record and puts it on the queue, while a background thread formats and writes
+    it, so logging never slows down the controller's step function.  While the queue is in use, the MCS records do not
+    also propagate to the handlers of the root logger (which would format them on the calling thread again), and the
+    queue is flushed when the program exits.
+    """
+
+    ROOT = 'machine_common_sense'
+    CONTROLLER = 'machine_common_sense.controller'
+    STEP = 'machine_common_sense.step'
+    UTIL = 'machine_common_sense.util'
+
+    FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+
+    __listener = None
+    __queue_handler = None
+    __propagate = True
+    __atexit_registered = False
+
+    """
+    Returns the logger for the given category.
+
+    Parameters
+    ----------
+    category : string
+        One of the MCS_Logging category names (like MCS_Logging.CONTROLLER).
+
+    Returns
+    -------
+    logging.Logger
+    """
+    @staticmethod
+    def get_logger(category):
+        return logging.getLogger(category)
+
+    """
+    Sets up the MCS loggers to write through a background queue listener.  Replaces any handlers from a previous call.
+
+    Parameters
+    ----------
+    level : integer, optional
+        The minimum level of logged messages (default logging.INFO).
+    handler_list : list of logging.Handler objects, optional
+        The handlers run on the background thread (default a handler writing to stdout).
+    rate_limit_dict : dict, optional
+        The maximum number of messages per second for each category (default no limits).
+    sample_rate_dict : dict, optional
+        The fraction (between 0 and 1) of messages kept for each category (default all messages).
+
+    Returns
+    -------
+    logging.handlers.QueueListener
+    """
+    @staticmethod
+    def init(level=logging.INFO, handler_list=None, rate_limit_dict=None, sample_rate_dict=None):
+        MCS_Logging.shutdown()
+
+        if handler_list is None:
+            stream_handler = logging.StreamHandler(sys.stdout)
+            stream_handler.setFormatter(MCS_Log_Formatter(MCS_Logging.FORMAT))
+            handler_list = [stream_handler]
+
+        record_queue = queue.Queue()
+        queue_handler = MCS_Log_Queue_Handler(record_queue)
+        queue_handler.addFilter(MCS_Log_Rate_Filter(rate_limit_dict, sample_rate_dict))
+
+        root_logger = logging.getLogger(MCS_Logging.ROOT)
+        root_logger.setLevel(level)
+        root_logger.addHandler(queue_handler)
+        MCS_Logging.__propagate = root_logger.propagate
+        root_logger.propagate = False
+
+        listener = logging.handlers.QueueListener(record_queue, *handler_list, respect_handler_level=True)
+        listener.start()
+
+        MCS_Logging.__listener = listener
+        MCS_Logging.__queue_handler = queue_handler
+        if not MCS_Logging.__atexit_registered:
+            atexit.register(MCS_Logging.shutdown)
+            MCS_Logging.__atexit_registered = True
+        return listener
+
+    """
+    Returns whether MCS_Logging.init was called (and MCS_Logging.shutdown was not called afterward).
+
+    Returns
+    -------
+    boolean
+    """
+    @staticmethod
+    def is_initialized():
+        return MCS_Logging.__listener is not None
+
+    """
+    Writes all the queued messages, removes the handlers added by MCS_Logging.init, and lets the MCS records propagate
+    to the root logger again.  Called automatically when the program exits.
+    """
+    @staticmethod
+    def shutdown():
+        if MCS_Logging.__listener is not None:
+            MCS_Logging.__listener.stop()
+            root_logger = logging.getLogger(MCS_Logging.ROOT)
+            root_logger.removeHandler(MCS_Logging.__queue_handler)
+            root_logger.propagate = MCS_Logging.__propagate
+        MCS_Logging.__listener = None
+        MCS_Logging.__queue_handler = None
+
+class MCS_Log_Formatter(logging.Formatter):
+    """
+    Formats log records, adding their structured fields to the end of each message as "key=value" pairs.
+    """
+
+    def format(self, record):
+        text = super().format(record)
+        fields = getattr(record, 'fields', None)
+        if fields:
+            text += ' ' + ' '.join(str(key) + '=' + str(value) for key, value in fields.items())
+        return text
+
+class MCS_Log_Queue_Handler(logging.Handler):
+    """
+    Puts log records on a queue without formatting them (unlike logging.handlers.QueueHandler), so the formatting
+    happens on the queue listener's thread.  Only works with an in-process queue, since the records are not made
+    picklable.
+    """
+
+    def __init__(self, record_queue):
+        super().__init__()
+        self.queue = record_queue
+
+    def emit(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except Exception:
+            self.handleError(record)
+
+class MCS_Log_Rate_Filter(logging.Filter):
+    """
+    Limits and samples log records per category (logger name, or the name of any of its parent loggers).  Sampling is
+    deterministic (keeping one of every N records), and the number of records dropped by the rate limit since the last
+    kept record of the category is added to the next kept record as the "suppressed" field.
+
+    Attributes
+    ----------
+    rate_limit_dict : dict
+        The maximum number of records per second for each category.
+    sample_rate_dict : dict
+        The fraction (between 0 and 1) of records kept for each category.
+    """
+
+    def __init__(self, rate_limit_dict=None, sample_rate_dict=None, clock=time.monotonic):
+        super().__init__()
+        self.rate_limit_dict = {} if rate_limit_dict is None else rate_limit_dict
+        self.sample_rate_dict = {} if sample_rate_dict is None else sample_rate_dict
+        self.__clock = clock
+        self.__lock = threading.Lock()
+        self.__sample_counts = {}
+        self.__suppressed_counts = {}
+        self.__tokens = {}
+
+    def filter(self, record):
+        sample_category = self.__find_category(record.name, self.sample_rate_dict)
+        rate_category = self.__find_category(record.name, self.rate_limit_dict)
+        if sample_category is None and rate_category is None:
+            return True
+
+        with self.__lock:
+            if sample_category is not None and not self.__sample(sample_category):
+                return False
+            if rate_category is not None and not self.__take_token(rate_category):
+                self.__suppressed_counts[rate_category] = self.__suppressed_counts.get(rate_category, 0) + 1
+                return False
+            suppressed = self.__suppressed_counts.pop(rate_category, 0)
+
+        if suppressed > 0:
+            record.fields = dict(getattr(record, 'fields', None) or {}, suppressed=suppressed)
+        return True
+
+    def __find_category(self, name, category_dict):
+        while name:
+            if name in category_dict:
+                return name
+            name = name.rpartition('.')[0]
+        return None
+
+    def __sample(self, category):
+        sample_rate = self.sample_rate_dict[category]
+        if sample_rate <= 0:
+            return False
+        count = self.__sample_counts.get(category, 0)
+        self.__sample_counts[category] = count + 1
+        return count % max(1, int(round(1.0 / sample_rate))) == 0
+
+    def __take_token(self, category):
+        # A token bucket holding up to one second of messages, refilled continuously.
+        rate_limit = self.rate_limit_dict[category]
+        now = self.__clock()
+        tokens, last_time = self.__tokens.get(category, (rate_limit, now))
+        tokens = min(rate_limit, tokens + (now - last_time) * rate_limit)
+        if tokens < 1:
+            self.__tokens[category] = (tokens, now)
+            return False
+        self.__tokens[category] = (tokens - 1, now)
+        return True
+
+class MCS_Lazy_Message:
+    """
+    Wraps a function that builds a log message, so the message is only built if (and when) the record is formatted.
+    """
+
+    def __init__(self, function, *args):
+        self.__function = function
+        self.__args = args
+
+    def __str__(self):
+        return str(self.__function(*self.__args))
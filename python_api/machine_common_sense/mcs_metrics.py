@@ -0,0 +1,419 @@
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+import weakref
+
+class MCS_Metrics:
+    """
+    Defines a registry of counters, gauges, and histograms that the controller updates on each step, exposed in the
+    Prometheus text format.
+
+    To watch a single process, call start_http_server and scrape "http://<host>:<port>/metrics".  To watch a fleet of
+    worker processes, give each worker's registry the same snapshot_directory: each worker then writes its own snapshot
+    file there (at most once every snapshot_interval seconds, and once more when it exits), and a registry serving HTTP
+    with that directory adds together the counters and histograms from every snapshot and labels the gauges with each
+    worker's ID.  Snapshots not written for snapshot_ttl seconds (like those of workers that exited long ago) are
+    ignored.
+
+    Attributes
+    ----------
+    snapshot_directory : string or None
+        The directory shared by all the worker processes, or None to keep the metrics in this process only.
+    snapshot_interval : float
+        The minimum number of seconds between two snapshot files written by this process.
+    snapshot_ttl : float or None
+        The number of seconds after which the snapshot files of other processes are ignored, or None to never ignore
+        them.
+    worker_id : string
+        The ID of this process in the snapshot files (default its process ID).
+    """
+
+    DEFAULT_BUCKET_LIST = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+    COUNTER = 'counter'
+    GAUGE = 'gauge'
+    HISTOGRAM = 'histogram'
+
+    DEFAULT_SNAPSHOT_TTL = 300.0
+
+    def __init__(self, snapshot_directory=None, snapshot_interval=5.0, worker_id=None,
+            snapshot_ttl=DEFAULT_SNAPSHOT_TTL):
+        self.snapshot_directory = snapshot_directory
+        self.snapshot_interval = snapshot_interval
+        self.snapshot_ttl = snapshot_ttl
+        self.worker_id = str(os.getpid()) if worker_id is None else str(worker_id)
+        self.__lock = threading.Lock()
+        self.__metric_dict = {}
+        self.__last_snapshot_time = None
+        if snapshot_directory is not None:
+            # Write what happened since the last snapshot when the process exits.  A weak reference, so registries
+            # that are no longer used are not kept alive until then.
+            atexit.register(MCS_Metrics.__write_final_snapshot, weakref.ref(self))
+
+    """
+    Returns the counter with the given name, creating it if needed.
+
+    Parameters
+    ----------
+    name : string
+        The metric name (like "mcs_steps_total").
+    help_text : string, optional
+        The description of the metric.
+
+    Returns
+    -------
+    MCS_Metric
+    """
+    def counter(self, name, help_text=''):
+        return self.__get_or_create(name, self.COUNTER, help_text, None)
+
+    """
+    Returns the gauge with the given name, creating it if needed.
+
+    Parameters
+    ----------
+    name : string
+        The metric name (like "mcs_memory_rss_bytes").
+    help_text : string, optional
+        The description of the metric.
+
+    Returns
+    -------
+    MCS_Metric
+    """
+    def gauge(self, name, help_text=''):
+        return self.__get_or_create(name, self.GAUGE, help_text, None)
+
+    """
+    Returns the histogram with the given name, creating it if needed.
+
+    Parameters
+    ----------
+    name : string
+        The metric name (like "mcs_step_latency_seconds").
+    help_text : string, optional
+        The description of the metric.
+    bucket_list : list of floats, optional
+        The upper bounds of the histogram buckets, in increasing order (default DEFAULT_BUCKET_LIST).
+
+    Returns
+    -------
+    MCS_Metric
+    """
+    def histogram(self, name, help_text='', bucket_list=None):
+        return self.__get_or_create(name, self.HISTOGRAM, help_text, self.DEFAULT_BUCKET_LIST if bucket_list is None \
+                else sorted(bucket_list))
+
+    """
+    Writes this process's snapshot file if it has a snapshot directory and the snapshot interval has passed.
+
+    Parameters
+    ----------
+    force : boolean, optional
+        Whether to ignore the snapshot interval (default False).
+    """
+    def maybe_write_snapshot(self, force=False):
+        if self.snapshot_directory is None:
+            return
+        now = time.monotonic()
+        if not force and self.__last_snapshot_time is not None and \
+                now - self.__last_snapshot_time < self.snapshot_interval:
+            return
+        self.__last_snapshot_time = now
+
+        os.makedirs(self.snapshot_directory, exist_ok=True)
+        file_path = os.path.join(self.snapshot_directory, 'metrics_' + self.worker_id + '.json')
+        temp_file_path = file_path + '.tmp'
+        with open(temp_file_path, 'w') as snapshot_file:
+            json.dump(self.snapshot(), snapshot_file)
+        os.replace(temp_file_path, file_path)
+
+    """
+    Returns the current state of all the metrics as a JSON-serializable dict.
+
+    Returns
+    -------
+    dict
+    """
+    def snapshot(self):
+        with self.__lock:
+            return {
+                'worker_id': self.worker_id,
+                'metrics': {name: metric.to_dict() for name, metric in self.__metric_dict.items()}
+            }
+
+    """
+    Starts a daemon thread serving the metrics in the Prometheus text format over HTTP.
+
+    Parameters
+    ----------
+    port : integer, optional
+        The port (default 0, meaning any free port; see the "server_port" of the returned server).
+    host : string, optional
+        The host address (default "127.0.0.1", only reachable from this machine).
+
+    Returns
+    -------
+    http.server.HTTPServer
+        The running server.  Call its shutdown function to stop it.
+    """
+    def start_http_server(self, port=0, host='127.0.0.1'):
+        import http.server
+        import socketserver
+
+        registry = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = registry.to_prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        # The same as http.server.ThreadingHTTPServer, which is not available before Python 3.7.
+        class Server(socketserver.ThreadingMixIn, http.server.HTTPServer):
+            daemon_threads = True
+
+        server = Server((host, port), Handler)
+        thread = threading.Thread(target=server.serve_forever, name='mcs-metrics-http', daemon=True)
+        thread.start()
+        return server
+
+    """
+    Returns the metrics in the Prometheus text format.  If this registry has a snapshot directory, the metrics from all
+    the snapshot files in it are added together with the current metrics of this process.
+
+    Returns
+    -------
+    string
+    """
+    def to_prometheus_text(self):
+        snapshot_list = [self.snapshot()]
+        if self.snapshot_directory is not None:
+            oldest_time = None if self.snapshot_ttl is None else time.time() - self.snapshot_ttl
+            for file_path in sorted(glob.glob(os.path.join(self.snapshot_directory, 'metrics_*.json'))):
+                try:
+                    if oldest_time is not None and os.path.getmtime(file_path) < oldest_time:
+                        continue
+                    with open(file_path) as snapshot_file:
+                        snapshot = json.load(snapshot_file)
+                except (IOError, OSError, ValueError):
+                    continue
+                if snapshot.get('worker_id') != self.worker_id:
+                    snapshot_list.append(snapshot)
+        return MCS_Metrics.snapshots_to_prometheus_text(snapshot_list, len(snapshot_list) > 1)
+
+    """
+    Adds together the given snapshots and returns them in the Prometheus text format.
+
+    Parameters
+    ----------
+    snapshot_list : list of dicts
+        The snapshots from MCS_Metrics.snapshot.
+    label_gauges : boolean, optional
+        Whether to add a "worker" label with the worker ID to each gauge value (default True).
+
+    Returns
+    -------
+    string
+    """
+    @staticmethod
+    def snapshots_to_prometheus_text(snapshot_list, label_gauges=True):
+        merged = {}
+        for snapshot in snapshot_list:
+            for name, metric_data in snapshot['metrics'].items():
+                metric = merged.get(name)
+                if metric is None:
+                    metric = MCS_Metric(name, metric_data['type'], metric_data['help'], metric_data['bucket_list'])
+                    merged[name] = metric
+                for label_list, value in metric_data['value_list']:
+                    labels = dict(label_list)
+                    if metric.type == MCS_Metrics.GAUGE and label_gauges:
+                        labels['worker'] = snapshot['worker_id']
+                    metric.merge(labels, value)
+
+        return ''.join(merged[name].to_prometheus_text() for name in sorted(merged.keys()))
+
+    @staticmethod
+    def __write_final_snapshot(metrics_reference):
+        metrics = metrics_reference()
+        # Do not create the snapshot directory again if it was removed.
+        if metrics is not None and os.path.isdir(metrics.snapshot_directory):
+            metrics.maybe_write_snapshot(force=True)
+
+    def __get_or_create(self, name, metric_type, help_text, bucket_list):
+        with self.__lock:
+            metric = self.__metric_dict.get(name)
+            if metric is None:
+                metric = MCS_Metric(name, metric_type, help_text, bucket_list, self.__lock)
+                self.__metric_dict[name] = metric
+            elif metric.type != metric_type:
+                raise ValueError('The metric ' + name + ' is already a ' + metric.type + '.')
+            return metric
+
+class MCS_Metric:
+    """
+    Defines a single counter, gauge, or histogram, with one value for each combination of label values.
+
+    Attributes
+    ----------
+    name : string
+        The metric name.
+    type : string
+        Either "counter", "gauge", or "histogram".
+    help_text : string
+        The description of the metric.
+    bucket_list : list of floats, or None
+        The upper bounds of the histogram buckets, or None if this metric is not a histogram.
+    """
+
+    def __init__(self, name, metric_type, help_text, bucket_list=None, lock=None):
+        self.name = name
+        self.type = metric_type
+        self.help_text = help_text
+        self.bucket_list = bucket_list
+        self.__lock = threading.Lock() if lock is None else lock
+        self.__value_dict = {}
+
+    """
+    Returns the value for the given labels (for histograms, a dict with the "bucket_counts", "sum", and "count").
+
+    Parameters
+    ----------
+    **labels
+        The label values.
+
+    Returns
+    -------
+    float or dict
+    """
+    def get(self, **labels):
+        with self.__lock:
+            value = self.__value_dict.get(self.__key(labels))
+            if self.type == MCS_Metrics.HISTOGRAM:
+                return None if value is None else dict(value, bucket_counts=list(value['bucket_counts']))
+            return 0 if value is None else value
+
+    """
+    Increases this counter or gauge by the given amount.
+
+    Parameters
+    ----------
+    amount : float, optional
+        The amount (default 1).
+    **labels
+        The label values.
+    """
+    def inc(self, amount=1, **labels):
+        if self.type == MCS_Metrics.HISTOGRAM:
+            raise TypeError('Cannot increase the histogram ' + self.name + '.')
+        key = self.__key(labels)
+        with self.__lock:
+            self.__value_dict[key] = self.__value_dict.get(key, 0) + amount
+
+    def merge(self, labels, value):
+        key = self.__key(labels)
+        with self.__lock:
+            if self.type == MCS_Metrics.HISTOGRAM:
+                current = self.__value_dict.setdefault(key, self.__empty_histogram())
+                current['bucket_counts'] = [a + b for a, b in zip(current['bucket_counts'], value['bucket_counts'])]
+                current['sum'] += value['sum']
+                current['count'] += value['count']
+            else:
+                self.__value_dict[key] = self.__value_dict.get(key, 0) + value
+
+    """
+    Adds the given value to this histogram.
+
+    Parameters
+    ----------
+    value : float
+        The observed value (like a latency in seconds).
+    **labels
+        The label values.
+    """
+    def observe(self, value, **labels):
+        if self.type != MCS_Metrics.HISTOGRAM:
+            raise TypeError('Cannot observe a value in the ' + self.type + ' ' + self.name + '.')
+        key = self.__key(labels)
+        with self.__lock:
+            current = self.__value_dict.setdefault(key, self.__empty_histogram())
+            for index, upper_bound in enumerate(self.bucket_list):
+                if value <= upper_bound:
+                    current['bucket_counts'][index] += 1
+                    break
+            current['sum'] += value
+            current['count'] += 1
+
+    """
+    Sets this gauge to the given value.
+
+    Parameters
+    ----------
+    value : float
+        The value.
+    **labels
+        The label values.
+    """
+    def set(self, value, **labels):
+        if self.type != MCS_Metrics.GAUGE:
+            raise TypeError('Cannot set the ' + self.type + ' ' + self.name + '.')
+        with self.__lock:
+            self.__value_dict[self.__key(labels)] = value
+
+    def to_dict(self):
+        # Called while the registry holds the shared lock.
+        return {
+            'type': self.type,
+            'help': self.help_text,
+            'bucket_list': self.bucket_list,
+            'value_list': [[list(key), dict(value, bucket_counts=list(value['bucket_counts'])) if \
+                    self.type == MCS_Metrics.HISTOGRAM else value] for key, value in self.__value_dict.items()]
+        }
+
+    def to_prometheus_text(self):
+        line_list = ['# HELP ' + self.name + ' ' + self.help_text.replace('\\', '\\\\').replace('\n', '\\n'),
+                '# TYPE ' + self.name + ' ' + self.type]
+        for key in sorted(self.__value_dict.keys()):
+            value = self.__value_dict[key]
+            if self.type != MCS_Metrics.HISTOGRAM:
+                line_list.append(self.name + self.__label_text(key) + ' ' + self.__number_text(value))
+                continue
+            cumulative_count = 0
+            for upper_bound, bucket_count in zip(self.bucket_list, value['bucket_counts']):
+                cumulative_count += bucket_count
+                line_list.append(self.name + '_bucket' + self.__label_text(key + (('le', \
+                        self.__number_text(upper_bound)),)) + ' ' + self.__number_text(cumulative_count))
+            line_list.append(self.name + '_bucket' + self.__label_text(key + (('le', '+Inf'),)) + ' ' + \
+                    self.__number_text(value['count']))
+            line_list.append(self.name + '_sum' + self.__label_text(key) + ' ' + self.__number_text(value['sum']))
+            line_list.append(self.name + '_count' + self.__label_text(key) + ' ' + self.__number_text(value['count']))
+        return '\n'.join(line_list) + '\n'
+
+    def __empty_histogram(self):
+        return {'bucket_counts': [0] * len(self.bucket_list), 'sum': 0.0, 'count': 0}
+
+    def __key(self, labels):
+        return tuple(sorted((str(key), str(value)) for key, value in labels.items()))
+
+    def __label_text(self, key):
+        if len(key) == 0:
+            return ''
+        return '{' + ','.join(name + '="' + value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + \
+                '"' for name, value in key) + '}'
+
+    def __number_text(self, value):
+        if isinstance(value, float) and value.is_integer():
+            return str(int(value)) if abs(value) < 1e15 else repr(value)
+        return str(value)
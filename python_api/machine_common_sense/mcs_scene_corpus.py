@@ -0,0 +1,261 @@
+import json
+import os
+import threading
+
+class MCS_Scene_Corpus:
+    """
+    Reads single scenes, by name, from a packed scene corpus: a directory of shard files (many compact scenes per file)
+    and an index of each scene's location, written by an MCS_Scene_Corpus_Writer.
+
+    A JSONL shard ("*.jsonl") holds one scene per line, and its index lines give the byte offset and length of each
+    line, so loading a scene reads just those bytes.  A zip shard ("*.zip") holds one compressed member per scene, so
+    loading a scene only decompresses its own member.
+
+    The index ("index.tsv") has one "name<TAB>shard<TAB>location" line per scene, where the location is "offset:length"
+    for JSONL shards and the member name for zip shards.  Writers only ever append to it, so a corpus can grow over
+    multiple runs.  If a name is in the index more than once, its last line is used.  The index is read again whenever
+    its file changes, so a corpus that is still growing can be read while it is written.
+
+    Attributes
+    ----------
+    directory : string
+        The directory of the corpus.
+    """
+
+    INDEX_FILENAME = 'index.tsv'
+    JSONL = 'jsonl'
+    ZIP = 'zip'
+    FORMAT_LIST = [JSONL, ZIP]
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.__index = None
+        self.__index_version = None
+        self.__lock = threading.Lock()
+        self.__zip_files = {}
+
+    def __contains__(self, name):
+        return name in self.__get_index()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return len(self.__get_index())
+
+    """
+    Closes any shard files opened to load scenes.
+    """
+    def close(self):
+        with self.__lock:
+            for zip_file in self.__zip_files.values():
+                zip_file.close()
+            self.__zip_files = {}
+
+    """
+    Returns the names of all the scenes in the corpus, in the order they were written.
+
+    Returns
+    -------
+    list of strings
+    """
+    def get_names(self):
+        return list(self.__get_index().keys())
+
+    """
+    Loads the scene with the given name.
+
+    Parameters
+    ----------
+    name : string
+        The scene's name (like "scene-0001.json").
+
+    Returns
+    -------
+    dict
+        The MCS scene configuration data.
+
+    Raises
+    ------
+    KeyError
+        If the scene is not in the corpus.
+    """
+    def load(self, name):
+        shard, location = self.__get_index()[name]
+        shard_path = os.path.join(self.directory, shard)
+        if shard.endswith('.' + self.ZIP):
+            with self.__lock:
+                zip_file = self.__zip_files.get(shard)
+                if zip_file is None:
+                    import zipfile
+                    zip_file = self.__zip_files[shard] = zipfile.ZipFile(shard_path)
+                data = zip_file.read(location)
+        else:
+            offset, length = location.split(':')
+            with open(shard_path, 'rb') as shard_file:
+                shard_file.seek(int(offset))
+                data = shard_file.read(int(length))
+        return json.loads(data.decode('utf-8'))
+
+    """
+    Appends the given index entries to the index file in the given directory.
+
+    Parameters
+    ----------
+    directory : string
+        The directory of the corpus.
+    entry_list : list of (string, string, string) tuples
+        The name, shard, and location of each scene.
+    """
+    @staticmethod
+    def append_index(directory, entry_list):
+        with open(os.path.join(directory, MCS_Scene_Corpus.INDEX_FILENAME), 'a', encoding='utf-8') as index_file:
+            index_file.writelines(name + '\t' + shard + '\t' + location + '\n' for name, shard, location in entry_list)
+
+    """
+    Reads the names in the index file in the given directory, without building the whole index.
+
+    Parameters
+    ----------
+    directory : string
+        The directory of the corpus.
+
+    Returns
+    -------
+    set of strings
+    """
+    @staticmethod
+    def read_names(directory):
+        try:
+            with open(os.path.join(directory, MCS_Scene_Corpus.INDEX_FILENAME), encoding='utf-8') as index_file:
+                return set(line.split('\t', 1)[0] for line in index_file if line.strip())
+        except FileNotFoundError:
+            return set()
+
+    def __get_index(self):
+        index_path = os.path.join(self.directory, self.INDEX_FILENAME)
+        # Writers only append to the index, so its size changes whenever it does.
+        stat = os.stat(index_path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        if self.__index is None or self.__index_version != version:
+            index = {}
+            with open(index_path, encoding='utf-8') as index_file:
+                for line in index_file:
+                    if line.strip():
+                        name, shard, location = line.rstrip('\n').split('\t')
+                        index[name] = (shard, location)
+            self.__index = index
+            self.__index_version = version
+        return self.__index
+
+class MCS_Scene_Corpus_Writer:
+    """
+    Writes scenes into one shard of a packed scene corpus (see MCS_Scene_Corpus).  Writers running at the same time (like
+    in different processes) should either each append their own index entries on close or return them to one process
+    that appends them all.
+
+    A writer never overwrites an existing file, since the corpus index may still point into it: if a file with the given
+    shard name already exists (like one written by an earlier run), it writes to the first free name with a number
+    added instead (like "scenes-000001-1.jsonl"), which is then its shard attribute and the shard in its index entries.
+    The shard file is only created by the first write, so a writer that writes no scenes leaves no empty shard.
+
+    Attributes
+    ----------
+    directory : string
+        The directory of the corpus.
+    shard : string
+        The shard's filename (like "scenes-000001.jsonl").
+    append_index_on_close : boolean
+        Whether to append the shard's entries to the corpus index on close.
+    """
+
+    def __init__(self, directory, shard, append_index_on_close=True):
+        extension = shard.rpartition('.')[2]
+        if extension not in MCS_Scene_Corpus.FORMAT_LIST:
+            raise ValueError('The shard ' + shard + ' must end with one of: ' + \
+                    ', '.join('.' + item for item in MCS_Scene_Corpus.FORMAT_LIST))
+
+        self.directory = directory
+        self.shard = shard
+        self.append_index_on_close = append_index_on_close
+        self.__entry_list = []
+        self.__shard_file = None
+        self.__zip_file = None
+        self.__closed = False
+
+        os.makedirs(directory, exist_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    """
+    Closes the shard and, if append_index_on_close is True, appends its entries to the corpus index.
+
+    Returns
+    -------
+    list of (string, string, string) tuples
+        The name, shard, and location of each scene written to the shard.
+    """
+    def close(self):
+        # The zip file does not close the shard file it was given, so close it first.
+        if self.__zip_file is not None:
+            self.__zip_file.close()
+            self.__zip_file = None
+        if self.__shard_file is not None:
+            self.__shard_file.close()
+            self.__shard_file = None
+        self.__closed = True
+        # Only append the entries once the shard is complete, so the index never points to missing data.
+        if self.append_index_on_close and len(self.__entry_list) > 0:
+            MCS_Scene_Corpus.append_index(self.directory, self.__entry_list)
+            self.append_index_on_close = False
+        return self.__entry_list
+
+    """
+    Writes the given scene, as compact JSON, to the shard.
+
+    Parameters
+    ----------
+    name : string
+        The scene's name, which must not contain tabs or newlines.
+    scene : dict
+        The MCS scene configuration data.
+    """
+    def write(self, name, scene):
+        if '\t' in name or '\n' in name:
+            raise ValueError('The scene name ' + repr(name) + ' must not contain tabs or newlines.')
+        data = json.dumps(scene, separators=(',', ':')).encode('utf-8')
+        if self.__shard_file is None:
+            if self.__closed:
+                raise ValueError('The shard ' + self.shard + ' is closed.')
+            self.__shard_file = self.__open_new_shard()
+            if self.shard.endswith('.' + MCS_Scene_Corpus.ZIP):
+                import zipfile
+                self.__zip_file = zipfile.ZipFile(self.__shard_file, 'w', compression=zipfile.ZIP_DEFLATED)
+        if self.__zip_file is not None:
+            self.__zip_file.writestr(name, data)
+            self.__entry_list.append((name, self.shard, name))
+        else:
+            offset = self.__shard_file.tell()
+            self.__shard_file.write(data + b'\n')
+            self.__entry_list.append((name, self.shard, str(offset) + ':' + str(len(data))))
+
+    def __open_new_shard(self):
+        stem, _, extension = self.shard.rpartition('.')
+        number = 0
+        while True:
+            shard = self.shard if number == 0 else stem + '-' + str(number) + '.' + extension
+            try:
+                # Exclusive creation, so two writers (or two runs) never share or truncate a shard.
+                shard_file = open(os.path.join(self.directory, shard), 'xb')
+            except FileExistsError:
+                number += 1
+                continue
+            self.shard = shard
+            return shard_file
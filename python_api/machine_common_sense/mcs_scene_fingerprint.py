@@ -0,0 +1,210 @@
+import hashlib
+import json
+import os
+
+class MCS_Scene_Fingerprint:
+    """
+    Defines the fingerprint of an MCS scene: the SHA-256 hash of its canonical JSON form, so scenes that only differ by
+    their names, the order of their keys or objects, or tiny differences in their positions, rotations, and scales
+    have the same fingerprint.
+
+    In the canonical form, the number in each position, rotation, and scale dict is quantized to a whole multiple of
+    its quantum (stored as that integer multiple, so rounding never depends on float formatting); every other number is
+    rounded to 6 digits; the top-level keys in IGNORED_KEY_LIST are removed; and the objects are sorted.
+    """
+
+    IGNORED_KEY_LIST = ['name']
+
+    POSITION_QUANTUM = 0.05
+    ROTATION_QUANTUM = 1.0
+    SCALE_QUANTUM = 0.01
+
+    __KEY_TO_QUANTUM = {
+        'position': POSITION_QUANTUM,
+        'rotation': ROTATION_QUANTUM,
+        'scale': SCALE_QUANTUM
+    }
+
+    """
+    Returns the canonical JSON string of the given scene.
+
+    Parameters
+    ----------
+    scene : dict
+        The MCS scene configuration data.
+
+    Returns
+    -------
+    string
+    """
+    @staticmethod
+    def canonicalize(scene):
+        data = dict((key, MCS_Scene_Fingerprint.__canonical_value(value, \
+                MCS_Scene_Fingerprint.__KEY_TO_QUANTUM.get(key))) for key, value in scene.items() \
+                if key not in MCS_Scene_Fingerprint.IGNORED_KEY_LIST)
+        if isinstance(data.get('objects'), list):
+            data['objects'] = sorted(data['objects'], key=lambda item: json.dumps(item, sort_keys=True))
+        return json.dumps(data, sort_keys=True, separators=(',', ':'))
+
+    """
+    Returns the fingerprint (a hex SHA-256 digest of the canonical JSON string) of the given scene.
+
+    Parameters
+    ----------
+    scene : dict
+        The MCS scene configuration data.
+
+    Returns
+    -------
+    string
+    """
+    @staticmethod
+    def fingerprint(scene):
+        return hashlib.sha256(MCS_Scene_Fingerprint.canonicalize(scene).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def __canonical_value(value, quantum):
+        if isinstance(value, dict):
+            return dict((key, MCS_Scene_Fingerprint.__canonical_value(item, \
+                    MCS_Scene_Fingerprint.__KEY_TO_QUANTUM.get(key, quantum))) for key, item in value.items())
+        if isinstance(value, list):
+            return [MCS_Scene_Fingerprint.__canonical_value(item, quantum) for item in value]
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            if quantum is not None:
+                return int(round(value / quantum))
+            return round(float(value), 6)
+        return value
+
+class MCS_Scene_Fingerprint_Index:
+    """
+    A persistent on-disk (dbm) index of scene fingerprints to the names of the scenes first seen with them, so checking
+    whether a scene is a duplicate takes constant time no matter how many scenes were indexed before.
+
+    Each scene is stored under its normalized absolute path (see scene_name), so a scene keeps the same name whether it
+    is generated or loaded, from any working directory, and adding a scene again under its own name is not a duplicate.
+    The path of a scene in a packed scene corpus is the corpus directory joined with the scene's name in the corpus.
+
+    The index may be read by many processes at once, but must only be changed by one process at a time.
+
+    Attributes
+    ----------
+    path : string
+        The path of the dbm database (without any extension added by the dbm implementation).
+    """
+
+    def __init__(self, path, read_only=False):
+        import dbm
+        self.path = path
+        self.__database = dbm.open(path, 'r' if read_only else 'c')
+
+    def __contains__(self, fingerprint):
+        return fingerprint.encode('utf-8') in self.__database
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return len(self.__database)
+
+    """
+    Adds the given scene to the index, unless a scene with the same fingerprint was already added.
+
+    Parameters
+    ----------
+    scene : dict
+        The MCS scene configuration data.
+    name : string, optional
+        The path of the scene (default the scene's own "name").
+
+    Returns
+    -------
+    None or string
+        None if the scene was added (or was already added under the same name), or the name of the other scene already
+        added with the same fingerprint.
+    """
+    def add(self, scene, name=None):
+        return self.add_fingerprint(MCS_Scene_Fingerprint.fingerprint(scene), name if name is not None else \
+                scene.get('name', ''))
+
+    """
+    Adds the given fingerprint to the index, unless it was already added.
+
+    Parameters
+    ----------
+    fingerprint : string
+        The scene's fingerprint.
+    name : string
+        The path of the scene.
+
+    Returns
+    -------
+    None or string
+        None if the fingerprint was added (or was already added under the same name), or the other name already
+        stored with it.
+    """
+    def add_fingerprint(self, fingerprint, name):
+        name = MCS_Scene_Fingerprint_Index.scene_name(name)
+        existing = self.get(fingerprint)
+        if existing is not None:
+            return existing if existing != name else None
+        self.__database[fingerprint.encode('utf-8')] = name.encode('utf-8')
+        return None
+
+    """
+    Closes the index, saving any changes.
+    """
+    def close(self):
+        if self.__database is not None:
+            self.__database.close()
+            self.__database = None
+
+    """
+    Returns the name stored with the given fingerprint, or None if it is not in the index.
+
+    Parameters
+    ----------
+    fingerprint : string
+        The scene's fingerprint.
+
+    Returns
+    -------
+    None or string
+    """
+    def get(self, fingerprint):
+        value = self.__database.get(fingerprint.encode('utf-8'))
+        return value.decode('utf-8') if value is not None else None
+
+    """
+    Returns the name of the scene already in the index with the same fingerprint as the given scene, or None.
+
+    Parameters
+    ----------
+    scene : dict
+        The MCS scene configuration data.
+
+    Returns
+    -------
+    None or string
+    """
+    def find_duplicate(self, scene):
+        return self.get(MCS_Scene_Fingerprint.fingerprint(scene))
+
+    """
+    Returns the name stored in the index for the scene with the given path: its normalized absolute path.
+
+    Parameters
+    ----------
+    name : string
+        The path of the scene (like "scenes/scene-0001.json", or "corpus/scene-0001.json" for the scene named
+        "scene-0001.json" in the packed scene corpus in the directory "corpus").
+
+    Returns
+    -------
+    string
+    """
+    @staticmethod
+    def scene_name(name):
+        return os.path.abspath(name)
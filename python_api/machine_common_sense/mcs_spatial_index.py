@@ -0,0 +1,309 @@
+import math
+
+import numpy
+
+class MCS_Spatial_Index:
+    """
+    Defines a top-down spatial index over the points of the objects in a scene, used to answer reach and proximity
+    queries without scanning every point of every object.
+
+    The footprint of each object (the bounding box of its points along the 2-dimensional X/Z plane, the same plane as
+    MCS_Object.distance) is hashed into a uniform grid of square cells.  Each cell holds the set of objects whose
+    footprints overlap it, so a query only needs to look at the objects in the cells around its position.  Calling update with the object list
+    from each step only rehashes the objects whose points have changed.
+
+    Attributes
+    ----------
+    cell_size : float
+        The width of each grid cell in global coordinates.
+    """
+
+    DEFAULT_CELL_SIZE = 0.25
+
+    def __init__(self, cell_size=DEFAULT_CELL_SIZE):
+        if cell_size <= 0:
+            raise ValueError('The cell size of the spatial index must be greater than 0.')
+
+        self.cell_size = cell_size
+        self.__cell_to_uuids = {}
+        self.__uuid_to_bounds = {}
+        self.__uuid_to_cells = {}
+        self.__uuid_to_points = {}
+        self.__uuid_to_object = {}
+
+    def __contains__(self, uuid):
+        return uuid in self.__uuid_to_object
+
+    def __len__(self):
+        return len(self.__uuid_to_object)
+
+    """
+    Returns the first object blocking a straight line of approach between the given positions along the X/Z plane.
+
+    Parameters
+    ----------
+    start : dict
+        The "x" and "z" global coordinates of the starting position (like your position).
+    end : dict
+        The "x" and "z" global coordinates of the ending position (like the position of the object you want to reach).
+    clearance : float, optional
+        How close the line can pass next to an object without being blocked (default 0).
+    exclude : list of strings, optional
+        The UUIDs of objects to ignore (like the object you want to reach, or the object you are holding).
+
+    Returns
+    -------
+    MCS_Object or None
+        The blocking object nearest to the start position, or None if the line of approach is clear.
+    """
+    def find_obstruction(self, start, end, clearance=0, exclude=None):
+        exclude = set() if exclude is None else set(exclude)
+        start_xz = numpy.array([start['x'], start['z']], dtype=numpy.float64)
+        end_xz = numpy.array([end['x'], end['z']], dtype=numpy.float64)
+        delta = end_xz - start_xz
+        length = float(numpy.linalg.norm(delta))
+
+        # Sample the line every half cell and gather the objects from the cells within the clearance of each sample.
+        # Add one more cell of reach to cover the cells whose corners the line clips between two samples.
+        sample_count = max(2, int(math.ceil(length / (self.cell_size / 2.0))) + 1)
+        samples = numpy.linspace(start_xz, end_xz, sample_count)
+        reach = int(math.ceil(clearance / self.cell_size)) + 1
+        candidates = set()
+        for cell in set(map(tuple, numpy.floor(samples / self.cell_size).astype(numpy.int64).tolist())):
+            candidates.update(self.__uuids_near_cell(cell, reach))
+        candidates -= exclude
+
+        blocker = None
+        blocker_fraction = math.inf
+        for uuid in candidates:
+            bounds = self.__uuid_to_bounds[uuid]
+            if bounds is None:
+                continue
+            # Clip the line against the footprint, grown by the clearance, one axis at a time (the "slab" test).
+            enter = 0.0
+            leave = 1.0
+            for axis in range(2):
+                low = bounds[axis] - clearance
+                high = bounds[axis + 2] + clearance
+                if delta[axis] == 0:
+                    if start_xz[axis] < low or start_xz[axis] > high:
+                        enter, leave = 1.0, 0.0
+                    continue
+                low_fraction = (low - start_xz[axis]) / delta[axis]
+                high_fraction = (high - start_xz[axis]) / delta[axis]
+                enter = max(enter, min(low_fraction, high_fraction))
+                leave = min(leave, max(low_fraction, high_fraction))
+            if enter <= leave and enter < blocker_fraction:
+                blocker = uuid
+                blocker_fraction = enter
+
+        return None if blocker is None else self.__uuid_to_object[blocker]
+
+    """
+    Returns a top-down 2D occupancy grid of the scene, where each cell is True if any object footprint overlaps it.
+
+    Parameters
+    ----------
+    min_position : float
+        The minimum "x" and "z" global coordinate of the grid.
+    max_position : float
+        The maximum "x" and "z" global coordinate of the grid.
+    exclude : list of strings, optional
+        The UUIDs of objects to leave out of the grid (like the object you are holding).
+
+    Returns
+    -------
+    numpy.ndarray
+        A boolean array indexed by [z cell, x cell], with the cell at [0, 0] starting at min_position.
+    """
+    def get_occupancy_grid(self, min_position, max_position, exclude=None):
+        exclude = set() if exclude is None else set(exclude)
+        size = int(math.ceil((max_position - min_position) / self.cell_size))
+        grid = numpy.zeros((size, size), dtype=bool)
+        offset = int(math.floor(min_position / self.cell_size))
+
+        occupied = [cell for cell, uuids in self.__cell_to_uuids.items() if len(uuids - exclude) > 0]
+        if len(occupied) > 0:
+            cells = numpy.array(occupied, dtype=numpy.int64) - offset
+            inside = ((cells >= 0) & (cells < size)).all(axis=1)
+            grid[cells[inside, 1], cells[inside, 0]] = True
+
+        return grid
+
+    """
+    Returns the K objects nearest to the given position along the X/Z plane, nearest first.
+
+    Parameters
+    ----------
+    position : dict
+        The "x" and "z" global coordinates of the position (like your position).
+    k : integer, optional
+        The number of objects to return (default 1).
+    filter_function : function, optional
+        A function that is given an MCS_Object and returns whether it may be returned (like a check for objects that
+        are not held).
+
+    Returns
+    -------
+    list of (MCS_Object, float) tuples
+        Each object with the distance from the given position to its footprint.
+    """
+    def query_nearest(self, position, k=1, filter_function=None):
+        if len(self.__uuid_to_object) == 0 or k < 1:
+            return []
+
+        center = self.__cell(position['x'], position['z'])
+        max_ring = self.__max_ring(center)
+        found = {}
+        seen = set()
+
+        # Search outward one ring of cells at a time.  Any object not found yet has no points inside the rings that
+        # were already searched, so it must be at least (ring * cell_size) away from the position.
+        for ring in range(0, max_ring + 1):
+            for cell in self.__ring_cells(center, ring):
+                for uuid in self.__cell_to_uuids.get(cell, ()):
+                    if uuid in seen:
+                        continue
+                    seen.add(uuid)
+                    if filter_function is None or filter_function(self.__uuid_to_object[uuid]):
+                        found[uuid] = self.__distance(uuid, position)
+
+            if len(found) >= k and sorted(found.values())[k - 1] <= ring * self.cell_size:
+                break
+
+        nearest = sorted(found.items(), key=lambda item: (item[1], item[0]))[:k]
+        return [(self.__uuid_to_object[uuid], distance) for uuid, distance in nearest]
+
+    """
+    Returns all the objects whose footprints are within the given radius of the given position along the X/Z plane,
+    nearest first.  For example, use the controller's MAX_REACH_DISTANCE as the radius to find all the objects
+    that may be within your reach.
+
+    Parameters
+    ----------
+    position : dict
+        The "x" and "z" global coordinates of the position (like your position).
+    radius : float
+        The radius.
+    filter_function : function, optional
+        A function that is given an MCS_Object and returns whether it may be returned.
+
+    Returns
+    -------
+    list of (MCS_Object, float) tuples
+        Each object with the distance from the given position to its footprint.
+    """
+    def query_radius(self, position, radius, filter_function=None):
+        min_cell = self.__cell(position['x'] - radius, position['z'] - radius)
+        max_cell = self.__cell(position['x'] + radius, position['z'] + radius)
+
+        candidates = set()
+        for cell_x in range(min_cell[0], max_cell[0] + 1):
+            for cell_z in range(min_cell[1], max_cell[1] + 1):
+                candidates.update(self.__cell_to_uuids.get((cell_x, cell_z), ()))
+
+        found = []
+        for uuid in candidates:
+            if filter_function is not None and not filter_function(self.__uuid_to_object[uuid]):
+                continue
+            distance = self.__distance(uuid, position)
+            if distance <= radius:
+                found.append((uuid, distance))
+
+        return [(self.__uuid_to_object[uuid], distance) for uuid, distance in sorted(found, key=lambda item: \
+                (item[1], item[0]))]
+
+    """
+    Updates the index with the given object list, like the object_list from the latest MCS_Step_Output.  Objects that
+    have not moved keep their cells, objects that have moved are rehashed, and objects that are no longer in the list
+    are removed.
+
+    Parameters
+    ----------
+    object_list : list of MCS_Object objects
+        The list of all the objects in the scene.
+    """
+    def update(self, object_list):
+        current_uuids = set()
+        for scene_object in object_list:
+            current_uuids.add(scene_object.uuid)
+            self.__uuid_to_object[scene_object.uuid] = scene_object
+            points = self.__to_array(scene_object.point_list)
+            previous_points = self.__uuid_to_points.get(scene_object.uuid)
+            if previous_points is not None and numpy.array_equal(previous_points, points):
+                continue
+            self.__remove_cells(scene_object.uuid)
+            self.__insert_cells(scene_object.uuid, points)
+
+        for uuid in list(self.__uuid_to_object.keys()):
+            if uuid not in current_uuids:
+                self.__remove_cells(uuid)
+                self.__uuid_to_object.pop(uuid)
+
+    def __cell(self, x, z):
+        return (int(math.floor(x / self.cell_size)), int(math.floor(z / self.cell_size)))
+
+    def __distance(self, uuid, position):
+        bounds = self.__uuid_to_bounds[uuid]
+        if bounds is None:
+            return math.inf
+        dx = max(bounds[0] - position['x'], 0, position['x'] - bounds[2])
+        dz = max(bounds[1] - position['z'], 0, position['z'] - bounds[3])
+        return math.hypot(dx, dz)
+
+    def __insert_cells(self, uuid, points):
+        self.__uuid_to_points[uuid] = points
+        if len(points) == 0:
+            self.__uuid_to_bounds[uuid] = None
+            self.__uuid_to_cells[uuid] = set()
+            return
+
+        bounds = (float(points[:, 0].min()), float(points[:, 2].min()), float(points[:, 0].max()), \
+                float(points[:, 2].max()))
+        self.__uuid_to_bounds[uuid] = bounds
+        min_cell = self.__cell(bounds[0], bounds[1])
+        max_cell = self.__cell(bounds[2], bounds[3])
+        cells = set((cell_x, cell_z) for cell_x in range(min_cell[0], max_cell[0] + 1) for cell_z in \
+                range(min_cell[1], max_cell[1] + 1))
+        self.__uuid_to_cells[uuid] = cells
+        for cell in cells:
+            self.__cell_to_uuids.setdefault(cell, set()).add(uuid)
+
+    def __max_ring(self, center):
+        if len(self.__cell_to_uuids) == 0:
+            return 0
+        cells = numpy.array(list(self.__cell_to_uuids.keys()), dtype=numpy.int64)
+        return int(numpy.abs(cells - numpy.array(center)).max())
+
+    def __remove_cells(self, uuid):
+        for cell in self.__uuid_to_cells.pop(uuid, ()):
+            uuids = self.__cell_to_uuids[cell]
+            uuids.discard(uuid)
+            if len(uuids) == 0:
+                self.__cell_to_uuids.pop(cell)
+        self.__uuid_to_bounds.pop(uuid, None)
+        self.__uuid_to_points.pop(uuid, None)
+
+    def __ring_cells(self, center, ring):
+        if ring == 0:
+            return [center]
+        cells = []
+        for offset in range(-ring, ring + 1):
+            cells.append((center[0] + offset, center[1] - ring))
+            cells.append((center[0] + offset, center[1] + ring))
+        for offset in range(-ring + 1, ring):
+            cells.append((center[0] - ring, center[1] + offset))
+            cells.append((center[0] + ring, center[1] + offset))
+        return cells
+
+    def __to_array(self, point_list):
+        if point_list is None or len(point_list) == 0:
+            return numpy.zeros((0, 3), dtype=numpy.float64)
+        return numpy.array([[point['x'], point['y'], point['z']] for point in point_list], dtype=numpy.float64)
+
+    def __uuids_near_cell(self, cell, reach):
+        uuids = set()
+        for cell_x in range(cell[0] - reach, cell[0] + reach + 1):
+            for cell_z in range(cell[1] - reach, cell[1] + reach + 1):
+                uuids.update(self.__cell_to_uuids.get((cell_x, cell_z), ()))
+        return uuids
@@ -0,0 +1,244 @@
+import numpy
+
+class MCS_Step_History:
+    """
+    Defines a fixed-capacity history of the most recent MCS_Step_Output objects.
+
+    Each image modality is kept in one preallocated array that is written in place, so appending a step never
+    allocates new memory and the memory used by the history stays the same no matter how long the scene runs.  Every
+    frame is written twice (at its ring slot and at its ring slot plus the capacity) so the last K frames are always a
+    single contiguous slice and can be returned as a stacked view instead of a copy.  If a step has no image of a
+    modality, its frame is all zeros and get_valid returns False for it, so the frames always line up with the steps.
+
+    Attributes
+    ----------
+    capacity : integer
+        The maximum number of steps kept in the history.
+    downsample : integer
+        Keep only every Nth pixel along each image axis on insert (1 keeps the full resolution).
+    grayscale : boolean
+        Whether to convert the normal vision images to grayscale on insert.
+    """
+
+    IMAGE = 'image'
+    DEPTH_MASK = 'depth_mask'
+    OBJECT_MASK = 'object_mask'
+
+    MODALITY_LIST = [IMAGE, DEPTH_MASK, OBJECT_MASK]
+
+    def __init__(self, capacity, downsample=1, grayscale=False):
+        if capacity < 1:
+            raise ValueError('The capacity of the step history must be at least 1.')
+        if downsample < 1:
+            raise ValueError('The downsample factor of the step history must be at least 1.')
+
+        self.capacity = capacity
+        self.downsample = downsample
+        self.grayscale = grayscale
+
+        # The image arrays are allocated once, on the first append, when their shapes are known.
+        self.__frames = {modality: None for modality in self.MODALITY_LIST}
+        self.__valid = {modality: numpy.zeros(2 * capacity, dtype=bool) for modality in self.MODALITY_LIST}
+        self.__head_tilts = numpy.zeros(2 * capacity, dtype=numpy.float32)
+        self.__step_numbers = numpy.zeros(2 * capacity, dtype=numpy.int32)
+        self.__object_lists = [None] * capacity
+        self.__return_statuses = [None] * capacity
+        self.__count = 0
+
+    def __len__(self):
+        return min(self.__count, self.capacity)
+
+    """
+    Adds the given step output to the history, overwriting the oldest step if the history is full.
+
+    Parameters
+    ----------
+    step_output : MCS_Step_Output
+        The output data object from a single step.
+    """
+    def append(self, step_output):
+        slot = self.__count % self.capacity
+
+        self.__write_frame(self.IMAGE, slot, step_output.image_list)
+        self.__write_frame(self.DEPTH_MASK, slot, step_output.depth_mask_list)
+        self.__write_frame(self.OBJECT_MASK, slot, step_output.object_mask_list)
+
+        self.__head_tilts[slot] = self.__head_tilts[slot + self.capacity] = step_output.head_tilt
+        self.__step_numbers[slot] = self.__step_numbers[slot + self.capacity] = step_output.step_number
+        self.__object_lists[slot] = step_output.object_list
+        self.__return_statuses[slot] = step_output.return_status
+
+        self.__count += 1
+
+    """
+    Removes all the steps from the history, keeping its preallocated storage for reuse.
+    """
+    def clear(self):
+        self.__object_lists = [None] * self.capacity
+        self.__return_statuses = [None] * self.capacity
+        self.__count = 0
+
+    """
+    Returns the head tilts from the last K steps, oldest first.
+
+    Parameters
+    ----------
+    k : integer, optional
+        The number of steps (default all the steps in the history).
+
+    Returns
+    -------
+    numpy.ndarray
+    """
+    def get_head_tilts(self, k=None):
+        return self.__last(self.__head_tilts, k)
+
+    """
+    Returns the object lists from the last K steps, oldest first.
+
+    Parameters
+    ----------
+    k : integer, optional
+        The number of steps (default all the steps in the history).
+
+    Returns
+    -------
+    list of lists of MCS_Object objects
+    """
+    def get_object_lists(self, k=None):
+        return [self.__object_lists[slot] for slot in self.__last_slots(k)]
+
+    """
+    Returns the return statuses from the last K steps, oldest first.
+
+    Parameters
+    ----------
+    k : integer, optional
+        The number of steps (default all the steps in the history).
+
+    Returns
+    -------
+    list of strings
+    """
+    def get_return_statuses(self, k=None):
+        return [self.__return_statuses[slot] for slot in self.__last_slots(k)]
+
+    """
+    Returns the frames of the given modality from the last K steps, stacked along a new first axis, oldest first.  The
+    returned array is a read-only view into the history, so copy it if you need to keep it after the next append.
+
+    Parameters
+    ----------
+    modality : string
+        One of "image", "depth_mask", or "object_mask".
+    k : integer, optional
+        The number of steps (default all the steps in the history).
+
+    Returns
+    -------
+    numpy.ndarray
+
+    Raises
+    ------
+    KeyError
+        If none of the steps in the history ever had a frame of the modality (so its frame shape is not known), unless K
+        (or the history) is empty.
+    """
+    def get_stacked(self, modality, k=None):
+        if not self.__check_recorded(modality, k):
+            return numpy.zeros((0,), dtype=numpy.uint8)
+        return self.__last(self.__frames[modality], k)
+
+    """
+    Returns whether each of the last K steps had a frame of the given modality, oldest first.  The frames of the steps
+    that did not have one are all zeros in get_stacked.
+
+    Parameters
+    ----------
+    modality : string
+        One of "image", "depth_mask", or "object_mask".
+    k : integer, optional
+        The number of steps (default all the steps in the history).
+
+    Returns
+    -------
+    numpy.ndarray
+
+    Raises
+    ------
+    KeyError
+        Like get_stacked, so the two always return the same number of steps.
+    """
+    def get_valid(self, modality, k=None):
+        if not self.__check_recorded(modality, k):
+            return numpy.zeros((0,), dtype=bool)
+        return self.__last(self.__valid[modality], k)
+
+    """
+    Returns the step numbers from the last K steps, oldest first.
+
+    Parameters
+    ----------
+    k : integer, optional
+        The number of steps (default all the steps in the history).
+
+    Returns
+    -------
+    numpy.ndarray
+    """
+    def get_step_numbers(self, k=None):
+        return self.__last(self.__step_numbers, k)
+
+    def __check_recorded(self, modality, k):
+        # Returns whether the modality has storage, or False if no steps were asked for.
+        if modality not in self.MODALITY_LIST:
+            raise ValueError('Unknown step history modality: ' + str(modality))
+        if self.__frames[modality] is not None:
+            return True
+        if self.__clamp(k) == 0:
+            return False
+        raise KeyError('No ' + modality + ' frames were recorded in the step history.')
+
+    def __clamp(self, k):
+        return len(self) if k is None else max(0, min(k, len(self)))
+
+    def __last(self, array, k):
+        k = self.__clamp(k)
+        end = (self.__count - 1) % self.capacity + self.capacity + 1 if self.__count > 0 else 0
+        view = array[end - k:end]
+        view.flags.writeable = False
+        return view
+
+    def __last_slots(self, k):
+        k = self.__clamp(k)
+        return [(self.__count - k + i) % self.capacity for i in range(k)]
+
+    def __prepare_frame(self, modality, image):
+        if modality == self.IMAGE and self.grayscale:
+            image = image.convert('L')
+        frame = numpy.asarray(image)
+        if self.downsample > 1:
+            frame = frame[::self.downsample, ::self.downsample]
+        return frame
+
+    def __write_frame(self, modality, slot, image_list):
+        valid = image_list is not None and len(image_list) > 0
+        self.__valid[modality][slot] = self.__valid[modality][slot + self.capacity] = valid
+        if not valid:
+            # Do not leave the frame of an older step in the slot.
+            if self.__frames[modality] is not None:
+                self.__frames[modality][slot] = 0
+                self.__frames[modality][slot + self.capacity] = 0
+            return
+
+        # Only the last image is kept if a step output has more than one (like a Pre-Interaction Phase).
+        frame = self.__prepare_frame(modality, image_list[-1])
+        if self.__frames[modality] is None:
+            self.__frames[modality] = numpy.zeros((2 * self.capacity,) + frame.shape, dtype=frame.dtype)
+        elif self.__frames[modality].shape[1:] != frame.shape:
+            raise ValueError('The ' + modality + ' shape changed from ' + str(self.__frames[modality].shape[1:]) + \
+                    ' to ' + str(frame.shape) + ' during the step history.')
+
+        storage = self.__frames[modality]
+        storage[slot] = frame
+        storage[slot + self.capacity] = frame
@@ -1,6 +1,11 @@
+import os
+
 from machine_common_sense.mcs_action import MCS_Action
+from machine_common_sense.mcs_logging import MCS_Logging
 from machine_common_sense.mcs_material import MCS_Material
 
+logger = MCS_Logging.get_logger(MCS_Logging.UTIL)
+
 class MCS_Util:
     """
     Defines utility functions for MCS classes.
@@ -110,7 +115,7 @@ class MCS_Util:
     default_value : number
         The default value.
     label : string
-        A label for the input value.  If given, and if the input value is not within the range, will print an error.
+        A label for the input value.  If given, and if the input value is not within the range, will log a warning.
 
     Returns
     -------
@@ -120,9 +125,8 @@ class MCS_Util:
     def is_in_range(value, min_value, max_value, default_value, label=None):
         if value > max_value or value < min_value:
             if label is not None:
-                print('Value of ' + label + 'needs to be between ' + str(min_value) + \
-                    ' and ' + str(max_value) + '. Current value: ' + str(value) + \
-                    '. Will be reset to ' + str(default_value) + '.')
+                logger.warning('Value of %s needs to be between %s and %s. Current value: %s. Will be reset to %s.', \
+                        label, min_value, max_value, value, default_value, extra={'fields': {'label': label}})
             return default_value
         return value
 
@@ -134,7 +138,7 @@ class MCS_Util:
     value :
         The input value.
     label : string
-        A label for the input value.  If given, and if the input value is not a number, will print an error.
+        A label for the input value.  If given, and if the input value is not a number, will log a warning.
 
     Returns
     -------
@@ -147,9 +151,27 @@ class MCS_Util:
             return True
         except ValueError:
             if label is not None:
-                print('Value of ' + label + 'needs to be a number. Will be set to 0.')
+                logger.warning('Value of %s needs to be a number. Will be set to 0.', label, \
+                        extra={'fields': {'label': label}})
             return False
 
+    """
+    Returns the resident memory used by this process, in bytes.
+
+    Returns
+    -------
+    integer or None
+        The memory, or None if it cannot be read on this platform.
+    """
+    @staticmethod
+    def retrieve_memory_usage():
+        try:
+            with open('/proc/self/statm') as statm_file:
+                return int(statm_file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (IOError, OSError, ValueError, IndexError, AttributeError):
+            # The resource module only reports the peak memory, not the current memory, so do not use it here.
+            return None
+
     """
     Transforms the given value into a string.
 
@@ -0,0 +1,53 @@
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+# Each check runs in a new Python process, since the modules are already imported in this one.  It lists which of the
+# slow-to-import modules are loaded after each step, instead of timing the imports (which is flaky on a busy machine).
+IMPORT_SCRIPT = """
+import json
+import sys
+
+def heavy_module_list():
+    return [name for name in ('ai2thor', 'numpy', 'PIL') if name in sys.modules]
+
+import machine_common_sense
+from machine_common_sense import MCS, MCS_Action, MCS_Goal, MCS_Step_Output, MCS_Util
+MCS.load_config_json_file('test/test_scene.json')
+after_import = heavy_module_list()
+from machine_common_sense import MCS_Step_History
+
+print(json.dumps({
+    'after_import': after_import,
+    'after_lazy_name': heavy_module_list()
+}))
+"""
+
+class Test_Import_Time(unittest.TestCase):
+
+    def run_import_script(self):
+        python_api_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.check_output([sys.executable, '-c', IMPORT_SCRIPT], cwd=python_api_dir)
+        return json.loads(output.decode('utf-8').strip().splitlines()[-1])
+
+    def test_lightweight_imports_do_not_load_heavy_modules(self):
+        result = self.run_import_script()
+        self.assertEqual(result['after_import'], [])
+        self.assertEqual(result['after_lazy_name'], ['numpy'])
+
+    def test_package_names(self):
+        import machine_common_sense
+        self.assertIs(machine_common_sense.MCS_Controller_AI2THOR, \
+                sys.modules['machine_common_sense.mcs_controller_ai2thor'].MCS_Controller_AI2THOR)
+        self.assertIs(machine_common_sense.MCS_Util, sys.modules['machine_common_sense.mcs_util'].MCS_Util)
+
+    def test_lazy_names(self):
+        import machine_common_sense
+        for name in ['MCS_Action_Constraints', 'MCS_Spatial_Index', 'MCS_Step_History']:
+            self.assertIn(name, dir(machine_common_sense))
+        self.assertIs(machine_common_sense.MCS_Step_History, \
+                sys.modules['machine_common_sense.mcs_step_history'].MCS_Step_History)
+        with self.assertRaises(AttributeError):
+            machine_common_sense.Foobar
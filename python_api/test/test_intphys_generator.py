@@ -0,0 +1,89 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from machine_common_sense.mcs_scene_corpus import MCS_Scene_Corpus
+
+# The scene generator scripts are not part of the package.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), \
+        'scene_generator'))
+import intphys_generator
+
+class Test_Intphys_Generator(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def generate(self, subdirectory, file_format, workers):
+        output_dir = os.path.join(self.directory, subdirectory)
+        intphys_generator.generate_families(output_dir, sorted(intphys_generator.TEMPLATES.keys()), 7, 3, \
+                workers=workers, file_format=file_format, chunk_size=3, report=lambda line: None)
+        file_dict = {}
+        for filename in os.listdir(output_dir):
+            with open(os.path.join(output_dir, filename), 'rb') as input_file:
+                file_dict[filename] = input_file.read()
+        return file_dict
+
+    def test_pairs_only_differ_in_objects(self):
+        for concept in intphys_generator.TEMPLATES:
+            for index in range(1, 20):
+                (plausible_name, plausible), (implausible_name, implausible) = \
+                        intphys_generator.generate_pair(concept, 5, index)
+                self.assertEqual(plausible_name, 'intphys_' + concept + '_plausible_' + str(index).zfill(6))
+                self.assertEqual(implausible_name, 'intphys_' + concept + '_implausible_' + str(index).zfill(6))
+                self.assertEqual(plausible['name'], plausible_name)
+                self.assertEqual(implausible['name'], implausible_name)
+                self.assertNotEqual(plausible['objects'], implausible['objects'])
+                for key in set(plausible.keys()) | set(implausible.keys()):
+                    if key not in ('name', 'objects'):
+                        self.assertEqual(plausible.get(key), implausible.get(key), concept + ' ' + key)
+                # Every object of the plausible scene is in the implausible scene with the same ID.
+                self.assertEqual([item['id'] for item in plausible['objects']], \
+                        [item['id'] for item in implausible['objects']][:len(plausible['objects'])])
+
+    def test_only_implausible_scene_has_implausible_event(self):
+        # The implausible scene is a shallow copy of the plausible one, so these catch changes made through shared
+        # dicts.
+        for index in range(1, 20):
+            (_, plausible), (_, implausible) = intphys_generator.generate_pair('gravity', 5, index)
+            self.assertNotIn('forces', plausible['objects'][0])
+            self.assertEqual(len(implausible['objects'][0]['forces']), 1)
+
+            (_, plausible), (_, implausible) = intphys_generator.generate_pair('object_permanence', 5, index)
+            self.assertNotIn('hides', plausible['objects'][0])
+            self.assertIn('hides', implausible['objects'][0])
+
+            (_, plausible), (_, implausible) = intphys_generator.generate_pair('shape_constancy', 5, index)
+            self.assertNotIn('hides', plausible['objects'][0])
+            self.assertEqual(len(plausible['objects']), 2)
+            self.assertIn('hides', implausible['objects'][0])
+            self.assertEqual(implausible['objects'][2]['type'], 'cube')
+
+            (_, plausible), (_, implausible) = intphys_generator.generate_pair('energy_conservation', 5, index)
+            self.assertEqual(len(plausible['objects'][0]['forces']), 1)
+            self.assertEqual(len(implausible['objects'][0]['forces']), 2)
+
+    def test_pairs_are_deterministic(self):
+        for concept in intphys_generator.TEMPLATES:
+            self.assertEqual(intphys_generator.generate_pair(concept, 5, 3), \
+                    intphys_generator.generate_pair(concept, 5, 3))
+            self.assertNotEqual(intphys_generator.generate_pair(concept, 5, 3), \
+                    intphys_generator.generate_pair(concept, 6, 3))
+
+    def test_workers_do_not_change_output(self):
+        for file_format in intphys_generator.FORMAT_LIST:
+            single_dict = self.generate(file_format + '-1', file_format, 1)
+            self.assertEqual(single_dict, self.generate(file_format + '-2', file_format, 2))
+            if file_format == intphys_generator.JSON_FORMAT:
+                self.assertEqual(len(single_dict), 2 * 7 * len(intphys_generator.TEMPLATES))
+            else:
+                corpus = MCS_Scene_Corpus(os.path.join(self.directory, file_format + '-1'))
+                self.assertEqual(len(corpus), 2 * 7 * len(intphys_generator.TEMPLATES))
+                self.assertEqual(corpus.load('intphys_gravity_implausible_000007'), \
+                        intphys_generator.generate_pair('gravity', 3, 7)[1][1])
+                corpus.close()
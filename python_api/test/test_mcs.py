@@ -1,6 +1,9 @@
+import shutil
+import tempfile
 import unittest
 
 from machine_common_sense.mcs import MCS
+from machine_common_sense.mcs_scene_corpus import MCS_Scene_Corpus_Writer
 
 class Test_MCS(unittest.TestCase):
 
@@ -56,3 +59,26 @@ class Test_MCS(unittest.TestCase):
         self.assertEqual(actual, {})
         self.assertEqual(status, "The given file 'test/test_scene_missing.json' cannot be found.")
 
+    def test_load_config_from_corpus(self):
+        directory = tempfile.mkdtemp()
+        try:
+            with MCS_Scene_Corpus_Writer(directory, 'scenes-1.zip') as writer:
+                writer.write('scene-1.json', {'name': 'scene-1.json', 'objects': []})
+            actual, status = MCS.load_config_from_corpus(directory, 'scene-1.json')
+            self.assertEqual(actual, {'name': 'scene-1.json', 'objects': []})
+            self.assertEqual(status, None)
+            actual, status = MCS.load_config_from_corpus(directory, 'scene-2.json')
+            self.assertEqual(actual, {})
+            self.assertEqual(status, "The given corpus '" + directory + "' does not contain the scene 'scene-2.json'.")
+            # Scenes added to the corpus later are found without restarting.
+            with MCS_Scene_Corpus_Writer(directory, 'scenes-2.zip') as writer:
+                writer.write('scene-2.json', {'name': 'scene-2.json', 'objects': []})
+            actual, status = MCS.load_config_from_corpus(directory, 'scene-2.json')
+            self.assertEqual(actual, {'name': 'scene-2.json', 'objects': []})
+            self.assertEqual(status, None)
+        finally:
+            shutil.rmtree(directory)
+
+        actual, status = MCS.load_config_from_corpus(directory + '_missing', 'scene-1.json')
+        self.assertEqual(actual, {})
+        self.assertEqual(status, "The given corpus '" + directory + "_missing' cannot be found.")
@@ -0,0 +1,56 @@
+import unittest
+
+from machine_common_sense.mcs_action import MCS_Action
+from machine_common_sense.mcs_action_constraints import MCS_Action_Constraints
+
+class Test_MCS_Action_Constraints(unittest.TestCase):
+
+    def setUp(self):
+        self.constraints = MCS_Action_Constraints([['MoveAhead', 'RotateLook,rotation=180'], [], \
+                ['RotateLook,rotation=90,horizon=10', 'Foobar']])
+
+    def mask_to_actions(self, mask):
+        return [action for action, allowed in zip(MCS_Action_Constraints.ACTION_LIST, mask) if allowed]
+
+    def test_is_allowed(self):
+        self.assertTrue(self.constraints.is_allowed(0, 'MoveAhead'))
+        self.assertTrue(self.constraints.is_allowed(0, 'MoveAhead', {'amount': 0.5}))
+        self.assertTrue(self.constraints.is_allowed(0, 'RotateLook', {'rotation': 180}))
+        self.assertTrue(self.constraints.is_allowed(0, 'RotateLook', {'rotation': '180.0'}))
+        self.assertFalse(self.constraints.is_allowed(0, 'RotateLook', {'rotation': 90}))
+        self.assertFalse(self.constraints.is_allowed(0, 'RotateLook'))
+        self.assertFalse(self.constraints.is_allowed(0, 'Pass'))
+
+    def test_is_allowed_multiple_params(self):
+        self.assertTrue(self.constraints.is_allowed(2, 'RotateLook', {'horizon': 10, 'rotation': 90}))
+        self.assertFalse(self.constraints.is_allowed(2, 'RotateLook', {'rotation': 90}))
+        self.assertFalse(self.constraints.is_allowed(2, 'Foobar'))
+
+    def test_is_allowed_unrestricted_step(self):
+        for step_number in [1, 3, 100]:
+            self.assertTrue(self.constraints.is_allowed(step_number, 'Pass'))
+            self.assertTrue(self.constraints.is_allowed(step_number, 'RotateLook', {'rotation': 90}))
+            self.assertFalse(self.constraints.is_allowed(step_number, 'Foobar'))
+
+    def test_is_allowed_no_action_list(self):
+        constraints = MCS_Action_Constraints()
+        self.assertTrue(constraints.is_allowed(0, 'ThrowObject', {'force': 1}))
+        self.assertTrue(MCS_Action_Constraints([]).is_allowed(0, 'Pass'))
+
+    def test_get_action_mask(self):
+        self.assertEqual(self.mask_to_actions(self.constraints.get_action_mask(0)), \
+                [MCS_Action.MOVE_AHEAD, MCS_Action.ROTATE_LOOK])
+        self.assertEqual(self.mask_to_actions(self.constraints.get_action_mask(1)), list(MCS_Action))
+        self.assertEqual(self.mask_to_actions(self.constraints.get_action_mask(2)), [MCS_Action.ROTATE_LOOK])
+        self.assertEqual(self.mask_to_actions(self.constraints.get_action_mask(3)), list(MCS_Action))
+        self.assertEqual(self.constraints.get_action_mask(0).dtype, bool)
+        with self.assertRaises(ValueError):
+            self.constraints.get_action_mask(0)[0] = True
+
+    def test_only_invalid_action_strings(self):
+        constraints = MCS_Action_Constraints([['Foobar', 'MoveAhead,amount'], ['Pass']])
+        self.assertTrue(constraints.is_allowed(0, 'MoveAhead'))
+        self.assertTrue(constraints.is_allowed(0, 'RotateLook', {'rotation': 90}))
+        self.assertFalse(constraints.is_allowed(0, 'Foobar'))
+        self.assertEqual(self.mask_to_actions(constraints.get_action_mask(0)), list(MCS_Action))
+        self.assertEqual(self.mask_to_actions(constraints.get_action_mask(1)), [MCS_Action.PASS])
@@ -5,9 +5,11 @@ import unittest
 
 from machine_common_sense.mcs_action import MCS_Action
 from machine_common_sense.mcs_goal import MCS_Goal
+from machine_common_sense.mcs_metrics import MCS_Metrics
 from machine_common_sense.mcs_object import MCS_Object
 from machine_common_sense.mcs_pose import MCS_Pose
 from machine_common_sense.mcs_return_status import MCS_Return_Status
+from machine_common_sense.mcs_step_history import MCS_Step_History
 from machine_common_sense.mcs_step_output import MCS_Step_Output
 from .mock_mcs_controller_ai2thor import Mock_MCS_Controller_AI2THOR
 
@@ -50,6 +52,12 @@ class Test_MCS_Controller_AI2THOR(unittest.TestCase):
         self.assertEqual(self.controller.retrieve_action_list(MCS_Goal(action_list=[[],['MoveAhead',\
                 'RotateLook,rotation=180']]), 1), ['MoveAhead', 'RotateLook,rotation=180'])
 
+    def test_is_action_allowed(self):
+        # All actions are allowed before a scene with an action_list is started.
+        self.assertTrue(self.controller.is_action_allowed('MoveAhead', amount=0.5))
+        self.assertFalse(self.controller.is_action_allowed('Foobar'))
+        self.assertEqual(self.controller.get_action_mask().tolist(), [True] * len(MCS_Action))
+
     def test_retrieve_goal(self):
         goal_1 = self.controller.retrieve_goal({})
         self.assertEqual(goal_1.action_list, None)
@@ -265,8 +273,11 @@ class Test_MCS_Controller_AI2THOR(unittest.TestCase):
             }
         }
 
-        actual = self.controller.retrieve_return_status(self.create_mock_scene_event(mock_scene_event_data))
+        with self.assertLogs('machine_common_sense.controller', level='WARNING') as logs:
+            actual = self.controller.retrieve_return_status(self.create_mock_scene_event(mock_scene_event_data))
         self.assertEqual(actual, MCS_Return_Status.UNDEFINED.name)
+        self.assertEqual(logs.output, ['WARNING:machine_common_sense.controller:Return status INVALID_STATUS is ' + \
+                'not currently supported.'])
 
         mock_scene_event_data = {
             "metadata": {
@@ -397,6 +408,106 @@ class Test_MCS_Controller_AI2THOR(unittest.TestCase):
         self.assertEqual(numpy.array(actual.image_list[0]), image_data)
         self.assertEqual(numpy.array(actual.object_mask_list[0]), object_mask_data)
 
+    def test_wrap_output_with_history(self):
+        history = MCS_Step_History(2)
+        self.controller.on_init(history=history)
+        self.assertIs(self.controller.get_history(), history)
+
+        mock_scene_event_data = {
+            "depth_frame": numpy.array([[128]], dtype=numpy.uint8),
+            "frame": numpy.array([[[1, 2, 3]]], dtype=numpy.uint8),
+            "instance_segmentation_frame": numpy.array([[192]], dtype=numpy.uint8),
+            "metadata": {
+                "agent": {
+                    "cameraHorizon": 12.34
+                },
+                "lastActionStatus": "SUCCESSFUL",
+                "objects": []
+            },
+            "object_id_to_color": {}
+        }
+
+        self.controller.wrap_output(self.create_mock_scene_event(mock_scene_event_data))
+        self.controller.wrap_output(self.create_mock_scene_event(mock_scene_event_data))
+        self.controller.wrap_output(self.create_mock_scene_event(mock_scene_event_data))
+
+        self.assertEqual(len(history), 2)
+        self.assertEqual(history.get_stacked('image').shape, (2, 1, 1, 3))
+        self.assertEqual(list(history.get_head_tilts()), [numpy.float32(12.34), numpy.float32(12.34)])
+
+    def test_get_objects_in_reach(self):
+        self.assertEqual(self.controller.get_objects_in_reach(), [])
+
+        mock_scene_event_data = {
+            "depth_frame": numpy.array([[128]], dtype=numpy.uint8),
+            "frame": numpy.array([[[1, 2, 3]]], dtype=numpy.uint8),
+            "instance_segmentation_frame": numpy.array([[192]], dtype=numpy.uint8),
+            "metadata": {
+                "agent": {
+                    "cameraHorizon": 0,
+                    "position": {
+                        "x": 0,
+                        "y": 0.5,
+                        "z": 0
+                    }
+                },
+                "lastActionStatus": "SUCCESSFUL",
+                "objects": [{
+                    "direction": None,
+                    "distanceXZ": 1,
+                    "isPickedUp": False,
+                    "mass": 1,
+                    "objectId": "testNear",
+                    "points": [{"x": 0, "y": 0, "z": 0.5}, {"x": 0.2, "y": 0.2, "z": 0.7}],
+                    "salientMaterials": None,
+                    "visibleInCamera": True
+                }, {
+                    "direction": None,
+                    "distanceXZ": 6,
+                    "isPickedUp": False,
+                    "mass": 1,
+                    "objectId": "testFar",
+                    "points": [{"x": 3, "y": 0, "z": 3}, {"x": 3.2, "y": 0.2, "z": 3.2}],
+                    "salientMaterials": None,
+                    "visibleInCamera": True
+                }]
+            },
+            "object_id_to_color": {
+                "testNear": (1, 2, 3),
+                "testFar": (4, 5, 6)
+            }
+        }
+
+        self.controller.wrap_output(self.create_mock_scene_event(mock_scene_event_data))
+        actual = self.controller.get_objects_in_reach()
+        self.assertEqual([item[0].uuid for item in actual], ["testNear"])
+        self.assertEqual(actual[0][1], 0.5)
+        self.assertEqual(len(self.controller.get_spatial_index()), 2)
+
+    def test_wrap_output_with_metrics(self):
+        metrics = MCS_Metrics()
+        self.controller.on_init(metrics=metrics)
+
+        mock_scene_event_data = {
+            "depth_frame": numpy.array([[128]], dtype=numpy.uint8),
+            "frame": numpy.array([[[1, 2, 3]]], dtype=numpy.uint8),
+            "instance_segmentation_frame": numpy.array([[192]], dtype=numpy.uint8),
+            "metadata": {
+                "agent": {
+                    "cameraHorizon": 0
+                },
+                "lastActionStatus": "OBSTRUCTED",
+                "objects": []
+            },
+            "object_id_to_color": {}
+        }
+
+        self.controller.wrap_output(self.create_mock_scene_event(mock_scene_event_data))
+        self.controller.wrap_output(self.create_mock_scene_event(mock_scene_event_data))
+
+        self.assertEqual(metrics.counter('mcs_return_status_total').get(status='OBSTRUCTED'), 2)
+        self.assertGreater(metrics.gauge('mcs_memory_rss_bytes').get(), 0)
+
     def test_wrap_step(self):
         actual = self.controller.wrap_step(action="TestAction", numberProperty=1234, stringProperty="test_property")
         expected = {
@@ -0,0 +1,108 @@
+import logging
+import threading
+import unittest
+
+from machine_common_sense.mcs_logging import MCS_Lazy_Message, MCS_Log_Formatter, MCS_Log_Rate_Filter, MCS_Logging
+
+class Mock_Clock():
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class Recording_Handler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.format_thread_list = []
+        self.text_list = []
+
+    def emit(self, record):
+        self.format_thread_list.append(threading.current_thread())
+        self.text_list.append(self.format(record))
+
+class Test_MCS_Logging(unittest.TestCase):
+
+    def create_record(self, name, fields=None):
+        record = logging.LogRecord(name, logging.WARNING, __file__, 0, 'message', None, None)
+        if fields is not None:
+            record.fields = fields
+        return record
+
+    def tearDown(self):
+        MCS_Logging.shutdown()
+        logging.getLogger(MCS_Logging.ROOT).setLevel(logging.NOTSET)
+
+    def test_formatter_fields(self):
+        formatter = MCS_Log_Formatter('%(name)s: %(message)s')
+        self.assertEqual(formatter.format(self.create_record('test')), 'test: message')
+        self.assertEqual(formatter.format(self.create_record('test', {'step': 3, 'label': 'force'})), \
+                'test: message step=3 label=force')
+
+    def test_rate_filter_rate_limit(self):
+        clock = Mock_Clock()
+        rate_filter = MCS_Log_Rate_Filter(rate_limit_dict={MCS_Logging.UTIL: 2}, clock=clock)
+        actual = [rate_filter.filter(self.create_record(MCS_Logging.UTIL)) for _ in range(5)]
+        self.assertEqual(actual, [True, True, False, False, False])
+
+        # Other categories are not limited.
+        self.assertTrue(rate_filter.filter(self.create_record(MCS_Logging.CONTROLLER)))
+
+        clock.now = 0.5
+        record = self.create_record(MCS_Logging.UTIL)
+        self.assertTrue(rate_filter.filter(record))
+        self.assertEqual(record.fields, {'suppressed': 3})
+        self.assertFalse(rate_filter.filter(self.create_record(MCS_Logging.UTIL)))
+
+    def test_rate_filter_parent_category(self):
+        rate_filter = MCS_Log_Rate_Filter(rate_limit_dict={MCS_Logging.ROOT: 1}, clock=Mock_Clock())
+        self.assertTrue(rate_filter.filter(self.create_record(MCS_Logging.UTIL)))
+        self.assertFalse(rate_filter.filter(self.create_record(MCS_Logging.CONTROLLER)))
+
+    def test_rate_filter_sample_rate(self):
+        rate_filter = MCS_Log_Rate_Filter(sample_rate_dict={MCS_Logging.STEP: 0.25, MCS_Logging.UTIL: 0})
+        actual = [rate_filter.filter(self.create_record(MCS_Logging.STEP)) for _ in range(8)]
+        self.assertEqual(actual, [True, False, False, False, True, False, False, False])
+        self.assertFalse(rate_filter.filter(self.create_record(MCS_Logging.UTIL)))
+
+    def test_init_formats_on_listener_thread(self):
+        handler = Recording_Handler()
+        handler.setFormatter(MCS_Log_Formatter('%(levelname)s %(name)s: %(message)s'))
+        MCS_Logging.init(level=logging.DEBUG, handler_list=[handler])
+        self.assertTrue(MCS_Logging.is_initialized())
+
+        build_thread_list = []
+
+        def build_message():
+            build_thread_list.append(threading.current_thread())
+            return 'table'
+
+        logger = MCS_Logging.get_logger(MCS_Logging.STEP)
+        logger.debug('objects: %s', MCS_Lazy_Message(build_message), extra={'fields': {'step': 1}})
+        MCS_Logging.shutdown()
+
+        self.assertFalse(MCS_Logging.is_initialized())
+        self.assertEqual(handler.text_list, ['DEBUG machine_common_sense.step: objects: table step=1'])
+        self.assertEqual(len(build_thread_list), 1)
+        self.assertIsNot(build_thread_list[0], threading.current_thread())
+        self.assertIsNot(handler.format_thread_list[0], threading.current_thread())
+
+    def test_init_stops_propagation(self):
+        root_handler = Recording_Handler()
+        logging.getLogger().addHandler(root_handler)
+        try:
+            handler = Recording_Handler()
+            MCS_Logging.init(level=logging.DEBUG, handler_list=[handler])
+            self.assertFalse(logging.getLogger(MCS_Logging.ROOT).propagate)
+
+            build_count = []
+            logger = MCS_Logging.get_logger(MCS_Logging.STEP)
+            logger.debug('objects: %s', MCS_Lazy_Message(lambda: build_count.append(1) or 'table'))
+            MCS_Logging.shutdown()
+
+            self.assertEqual(len(handler.text_list), 1)
+            self.assertEqual(root_handler.text_list, [])
+            self.assertEqual(len(build_count), 1)
+            self.assertTrue(logging.getLogger(MCS_Logging.ROOT).propagate)
+        finally:
+            logging.getLogger().removeHandler(root_handler)
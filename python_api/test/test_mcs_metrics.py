@@ -0,0 +1,147 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+import urllib.request
+
+from machine_common_sense.mcs_metrics import MCS_Metrics
+
+def scrape(url):
+    # A tiny Prometheus scraper: returns a dict of each sample line's "name{labels}" to its value.
+    with urllib.request.urlopen(url, timeout=5) as response:
+        text = response.read().decode('utf-8')
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            samples[name] = float(value)
+    return samples
+
+class Test_MCS_Metrics(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_counter(self):
+        metrics = MCS_Metrics()
+        counter = metrics.counter('mcs_steps_total', 'Number of steps run.')
+        counter.inc(action='Pass')
+        counter.inc(2, action='Pass')
+        counter.inc(action='MoveAhead')
+        self.assertIs(metrics.counter('mcs_steps_total'), counter)
+        self.assertEqual(counter.get(action='Pass'), 3)
+        self.assertEqual(metrics.to_prometheus_text(), '# HELP mcs_steps_total Number of steps run.\n' + \
+                '# TYPE mcs_steps_total counter\n' + \
+                'mcs_steps_total{action="MoveAhead"} 1\n' + \
+                'mcs_steps_total{action="Pass"} 3\n')
+
+    def test_gauge(self):
+        metrics = MCS_Metrics()
+        gauge = metrics.gauge('mcs_memory_rss_bytes')
+        gauge.set(100)
+        gauge.set(200)
+        self.assertEqual(gauge.get(), 200)
+        self.assertIn('mcs_memory_rss_bytes 200\n', metrics.to_prometheus_text())
+        with self.assertRaises(TypeError):
+            gauge.observe(1)
+        with self.assertRaises(ValueError):
+            metrics.counter('mcs_memory_rss_bytes')
+
+    def test_histogram(self):
+        metrics = MCS_Metrics()
+        histogram = metrics.histogram('mcs_step_latency_seconds', bucket_list=[0.1, 1])
+        histogram.observe(0.05, action='Pass')
+        histogram.observe(0.5, action='Pass')
+        histogram.observe(5, action='Pass')
+        self.assertEqual(histogram.get(action='Pass'), {'bucket_counts': [1, 1], 'sum': 5.55, 'count': 3})
+        text = metrics.to_prometheus_text()
+        self.assertIn('mcs_step_latency_seconds_bucket{action="Pass",le="0.1"} 1\n', text)
+        self.assertIn('mcs_step_latency_seconds_bucket{action="Pass",le="1"} 2\n', text)
+        self.assertIn('mcs_step_latency_seconds_bucket{action="Pass",le="+Inf"} 3\n', text)
+        self.assertIn('mcs_step_latency_seconds_count{action="Pass"} 3\n', text)
+        with self.assertRaises(TypeError):
+            histogram.inc()
+
+    def test_label_escaping(self):
+        metrics = MCS_Metrics()
+        metrics.counter('mcs_test_total').inc(name='a"b\\c')
+        self.assertIn('mcs_test_total{name="a\\"b\\\\c"} 1\n', metrics.to_prometheus_text())
+
+    def test_http_server(self):
+        metrics = MCS_Metrics()
+        metrics.counter('mcs_steps_total').inc(action='Pass')
+        server = metrics.start_http_server()
+        try:
+            url = 'http://127.0.0.1:' + str(server.server_port) + '/metrics'
+            self.assertEqual(scrape(url), {'mcs_steps_total{action="Pass"}': 1})
+            metrics.counter('mcs_steps_total').inc(action='Pass')
+            self.assertEqual(scrape(url), {'mcs_steps_total{action="Pass"}': 2})
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_aggregate_workers(self):
+        worker_1 = MCS_Metrics(snapshot_directory=self.directory, worker_id='1')
+        worker_2 = MCS_Metrics(snapshot_directory=self.directory, worker_id='2')
+        for worker, memory in [(worker_1, 100), (worker_2, 300)]:
+            worker.counter('mcs_steps_total').inc(action='Pass')
+            worker.histogram('mcs_step_latency_seconds', bucket_list=[1]).observe(0.5)
+            worker.gauge('mcs_memory_rss_bytes').set(memory)
+            worker.maybe_write_snapshot()
+
+        # Not written again until the snapshot interval has passed.
+        worker_2.counter('mcs_steps_total').inc(action='Pass')
+        worker_2.maybe_write_snapshot()
+
+        server = MCS_Metrics(snapshot_directory=self.directory, worker_id='server').start_http_server()
+        try:
+            actual = scrape('http://127.0.0.1:' + str(server.server_port) + '/metrics')
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.assertEqual(actual, {
+            'mcs_memory_rss_bytes{worker="1"}': 100,
+            'mcs_memory_rss_bytes{worker="2"}': 300,
+            'mcs_step_latency_seconds_bucket{le="1"}': 2,
+            'mcs_step_latency_seconds_bucket{le="+Inf"}': 2,
+            'mcs_step_latency_seconds_sum': 1,
+            'mcs_step_latency_seconds_count': 2,
+            'mcs_steps_total{action="Pass"}': 2
+        })
+
+        worker_2.maybe_write_snapshot(force=True)
+        self.assertIn('mcs_steps_total{action="Pass"} 3\n', worker_1.to_prometheus_text())
+
+    def test_ignore_old_snapshots(self):
+        worker = MCS_Metrics(snapshot_directory=self.directory, worker_id='1')
+        worker.counter('mcs_steps_total').inc()
+        worker.maybe_write_snapshot()
+        server = MCS_Metrics(snapshot_directory=self.directory, worker_id='server', snapshot_ttl=60)
+        self.assertIn('mcs_steps_total 1\n', server.to_prometheus_text())
+
+        # The worker exited two minutes ago.
+        file_path = os.path.join(self.directory, 'metrics_1.json')
+        os.utime(file_path, (time.time() - 120, time.time() - 120))
+        self.assertNotIn('mcs_steps_total', server.to_prometheus_text())
+        server.snapshot_ttl = None
+        self.assertIn('mcs_steps_total 1\n', server.to_prometheus_text())
+
+    def test_final_snapshot_at_exit(self):
+        script = 'from machine_common_sense.mcs_metrics import MCS_Metrics\n' + \
+                'metrics = MCS_Metrics(snapshot_directory=' + repr(self.directory) + ', worker_id="1")\n' + \
+                'metrics.maybe_write_snapshot()\n' + \
+                'metrics.counter("mcs_steps_total").inc(5)\n' + \
+                'metrics.maybe_write_snapshot()\n'
+        subprocess.check_call([sys.executable, '-c', script], \
+                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        with open(os.path.join(self.directory, 'metrics_1.json')) as snapshot_file:
+            snapshot = json.load(snapshot_file)
+        self.assertEqual(snapshot['metrics']['mcs_steps_total']['value_list'], [[[], 5]])
@@ -0,0 +1,94 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from machine_common_sense.mcs_scene_corpus import MCS_Scene_Corpus, MCS_Scene_Corpus_Writer
+
+class Test_MCS_Scene_Corpus(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def create_scene(self, index):
+        return {
+            'name': 'scene-' + str(index),
+            'performerStart': {'position': {'x': index / 10.0, 'z': -index / 10.0}, 'rotation': {'y': index}},
+            'objects': [],
+            'goal': {'description': 'unicode é ' + str(index)}
+        }
+
+    def write_shard(self, shard, index_list):
+        with MCS_Scene_Corpus_Writer(self.directory, shard) as writer:
+            for index in index_list:
+                writer.write('scene-' + str(index), self.create_scene(index))
+
+    def test_jsonl(self):
+        self.write_shard('scenes-1.jsonl', range(10))
+        with MCS_Scene_Corpus(self.directory) as corpus:
+            self.assertEqual(len(corpus), 10)
+            self.assertEqual(corpus.load('scene-7'), self.create_scene(7))
+            self.assertEqual(corpus.load('scene-0'), self.create_scene(0))
+            self.assertIn('scene-9', corpus)
+            self.assertNotIn('scene-10', corpus)
+            with self.assertRaises(KeyError):
+                corpus.load('scene-10')
+
+    def test_zip(self):
+        self.write_shard('scenes-1.zip', range(10))
+        with MCS_Scene_Corpus(self.directory) as corpus:
+            self.assertEqual(corpus.load('scene-3'), self.create_scene(3))
+            self.assertEqual(corpus.get_names(), ['scene-' + str(index) for index in range(10)])
+
+    def test_multiple_shards(self):
+        self.write_shard('scenes-1.jsonl', range(5))
+        self.write_shard('scenes-2.zip', range(5, 10))
+        self.assertEqual(MCS_Scene_Corpus.read_names(self.directory), set('scene-' + str(index) for index in range(10)))
+        with MCS_Scene_Corpus(self.directory) as corpus:
+            self.assertEqual(corpus.load('scene-4'), self.create_scene(4))
+            self.assertEqual(corpus.load('scene-5'), self.create_scene(5))
+
+    def test_writer_without_index(self):
+        writer = MCS_Scene_Corpus_Writer(self.directory, 'scenes-1.jsonl', append_index_on_close=False)
+        writer.write('scene-1', self.create_scene(1))
+        entry_list = writer.close()
+        self.assertFalse(os.path.exists(os.path.join(self.directory, MCS_Scene_Corpus.INDEX_FILENAME)))
+        MCS_Scene_Corpus.append_index(self.directory, entry_list)
+        self.assertEqual(MCS_Scene_Corpus(self.directory).load('scene-1'), self.create_scene(1))
+
+    def test_invalid_shard(self):
+        with self.assertRaises(ValueError):
+            MCS_Scene_Corpus_Writer(self.directory, 'scenes-1.json')
+        with MCS_Scene_Corpus_Writer(self.directory, 'scenes-1.jsonl') as writer:
+            with self.assertRaises(ValueError):
+                writer.write('scene\t1', {})
+
+    def test_writer_never_overwrites_shard(self):
+        self.write_shard('scenes-1.jsonl', range(3))
+        with MCS_Scene_Corpus_Writer(self.directory, 'scenes-1.jsonl') as writer:
+            writer.write('scene-3', self.create_scene(3))
+        self.assertEqual(writer.shard, 'scenes-1-1.jsonl')
+        with MCS_Scene_Corpus_Writer(self.directory, 'scenes-1.zip') as writer:
+            writer.write('scene-4', self.create_scene(4))
+        self.assertEqual(writer.shard, 'scenes-1.zip')
+        with MCS_Scene_Corpus(self.directory) as corpus:
+            for index in range(5):
+                self.assertEqual(corpus.load('scene-' + str(index)), self.create_scene(index))
+
+    def test_reload_index_after_append(self):
+        self.write_shard('scenes-1.jsonl', range(2))
+        with MCS_Scene_Corpus(self.directory) as corpus:
+            self.assertEqual(len(corpus), 2)
+            self.write_shard('scenes-2.jsonl', range(2, 4))
+            self.assertEqual(len(corpus), 4)
+            self.assertEqual(corpus.load('scene-3'), self.create_scene(3))
+
+    def test_writer_without_scenes_creates_no_shard(self):
+        for shard in ['scenes-1.jsonl', 'scenes-1.zip']:
+            with MCS_Scene_Corpus_Writer(self.directory, shard) as writer:
+                pass
+            self.assertEqual(writer.close(), [])
+        self.assertEqual(os.listdir(self.directory), [])
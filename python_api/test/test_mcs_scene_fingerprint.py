@@ -0,0 +1,74 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from machine_common_sense.mcs import MCS
+from machine_common_sense.mcs_scene_fingerprint import MCS_Scene_Fingerprint, MCS_Scene_Fingerprint_Index
+
+class Test_MCS_Scene_Fingerprint(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def create_scene(self, name='scene-1', x=1.0, mass=0.5):
+        return {
+            'name': name,
+            'performerStart': {'position': {'x': x, 'z': -1}, 'rotation': {'y': 90}},
+            'objects': [{
+                'id': 'ball', 'mass': mass, 'shows': [{'position': {'x': 0, 'y': 0.5, 'z': 2}}]
+            }, {
+                'id': 'wall', 'mass': 100, 'shows': [{'position': {'x': 1, 'y': 1, 'z': 3}}]
+            }]
+        }
+
+    def test_fingerprint_ignores_name_and_order(self):
+        scene = self.create_scene()
+        other = self.create_scene(name='scene-2')
+        other['objects'] = list(reversed(other['objects']))
+        self.assertEqual(MCS_Scene_Fingerprint.fingerprint(scene), MCS_Scene_Fingerprint.fingerprint(other))
+
+    def test_fingerprint_quantizes_positions(self):
+        self.assertEqual(MCS_Scene_Fingerprint.fingerprint(self.create_scene(x=1.0)), \
+                MCS_Scene_Fingerprint.fingerprint(self.create_scene(x=1.01)))
+        self.assertNotEqual(MCS_Scene_Fingerprint.fingerprint(self.create_scene(x=1.0)), \
+                MCS_Scene_Fingerprint.fingerprint(self.create_scene(x=1.1)))
+        # Numbers outside of positions, rotations, and scales are not quantized.
+        self.assertNotEqual(MCS_Scene_Fingerprint.fingerprint(self.create_scene(mass=0.5)), \
+                MCS_Scene_Fingerprint.fingerprint(self.create_scene(mass=0.51)))
+
+    def test_canonicalize(self):
+        self.assertEqual(MCS_Scene_Fingerprint.canonicalize({'name': 'a', 'z': 1, 'position': {'x': 0.1}}), \
+                '{"position":{"x":2},"z":1.0}')
+
+    def test_index(self):
+        path = os.path.join(self.directory, 'index')
+        with MCS_Scene_Fingerprint_Index(path) as index:
+            self.assertEqual(index.add(self.create_scene(name='scene-1')), None)
+            self.assertEqual(index.add(self.create_scene(name='scene-2')), os.path.abspath('scene-1'))
+            self.assertEqual(index.add(self.create_scene(), 'scenes/../scene-1'), None)
+            self.assertEqual(index.add(self.create_scene(), 'scenes/scene-1'), os.path.abspath('scene-1'))
+            self.assertEqual(index.add(self.create_scene(name='scene-3', x=2)), None)
+            self.assertEqual(len(index), 2)
+
+        with MCS_Scene_Fingerprint_Index(path, read_only=True) as index:
+            self.assertEqual(index.find_duplicate(self.create_scene(name='scene-4', x=2)), os.path.abspath('scene-3'))
+            self.assertIn(MCS_Scene_Fingerprint.fingerprint(self.create_scene()), index)
+            self.assertEqual(index.find_duplicate(self.create_scene(x=3)), None)
+
+    def test_load_config_json_file_with_index(self):
+        copy_path = os.path.join(self.directory, 'test_scene_copy.json')
+        shutil.copyfile('test/test_scene.json', copy_path)
+        with MCS_Scene_Fingerprint_Index(os.path.join(self.directory, 'index')) as index:
+            actual, status = MCS.load_config_json_file('test/test_scene.json', index)
+            self.assertEqual(status, None)
+            # Loading the same file again is not a duplicate.
+            actual, status = MCS.load_config_json_file('test/test_scene.json', index)
+            self.assertEqual(status, None)
+            actual, status = MCS.load_config_json_file(copy_path, index)
+            self.assertEqual(actual, {})
+            self.assertEqual(status, "The scene '" + copy_path + "' is a duplicate of the scene '" + \
+                    os.path.abspath('test/test_scene.json') + "'.")
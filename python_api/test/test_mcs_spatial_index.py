@@ -0,0 +1,79 @@
+import unittest
+
+from machine_common_sense.mcs_object import MCS_Object
+from machine_common_sense.mcs_spatial_index import MCS_Spatial_Index
+
+class Test_MCS_Spatial_Index(unittest.TestCase):
+
+    def create_object(self, uuid, x, z, size=0.1, held=False):
+        return MCS_Object(uuid=uuid, held=held, point_list=[
+            {"x": x - size, "y": 0, "z": z - size},
+            {"x": x + size, "y": 0, "z": z - size},
+            {"x": x - size, "y": 1, "z": z + size},
+            {"x": x + size, "y": 1, "z": z + size}
+        ])
+
+    def setUp(self):
+        self.index = MCS_Spatial_Index(cell_size=0.5)
+        self.index.update([
+            self.create_object("near", 0, 1),
+            self.create_object("middle", 2, 0),
+            self.create_object("far", -4, -4),
+            self.create_object("held", 0.5, 0.5, held=True)
+        ])
+
+    def test_query_radius(self):
+        actual = self.index.query_radius({"x": 0, "z": 0}, 1.0)
+        self.assertEqual([item[0].uuid for item in actual], ["held", "near"])
+        self.assertAlmostEqual(actual[1][1], 0.9)
+
+        actual = self.index.query_radius({"x": 0, "z": 0}, 1.0, lambda scene_object: not scene_object.held)
+        self.assertEqual([item[0].uuid for item in actual], ["near"])
+
+        self.assertEqual(self.index.query_radius({"x": 10, "z": 10}, 1.0), [])
+
+    def test_query_nearest(self):
+        actual = self.index.query_nearest({"x": 0, "z": 0}, 3)
+        self.assertEqual([item[0].uuid for item in actual], ["held", "near", "middle"])
+
+        actual = self.index.query_nearest({"x": 0, "z": 0}, 1, lambda scene_object: not scene_object.held)
+        self.assertEqual([item[0].uuid for item in actual], ["near"])
+
+        actual = self.index.query_nearest({"x": 0, "z": 0}, 10)
+        self.assertEqual([item[0].uuid for item in actual], ["held", "near", "middle", "far"])
+
+        self.assertEqual(MCS_Spatial_Index().query_nearest({"x": 0, "z": 0}), [])
+
+    def test_find_obstruction(self):
+        self.assertEqual(self.index.find_obstruction({"x": 0, "z": -1}, {"x": 0, "z": 2}).uuid, "near")
+        self.assertEqual(self.index.find_obstruction({"x": 0, "z": -1}, {"x": 0, "z": 2}, exclude=["near"]), None)
+        self.assertEqual(self.index.find_obstruction({"x": 1, "z": -1}, {"x": 1, "z": 2}), None)
+        self.assertEqual(self.index.find_obstruction({"x": 1, "z": -1}, {"x": 1, "z": 2}, clearance=0.5).uuid, \
+                "held")
+
+    def test_get_occupancy_grid(self):
+        grid = self.index.get_occupancy_grid(-5, 5)
+        self.assertEqual(grid.shape, (20, 20))
+        # The "near" object spans x from -0.1 to 0.1 and z from 0.9 to 1.1.
+        self.assertTrue(grid[11, 9])
+        self.assertTrue(grid[12, 10])
+        self.assertFalse(grid[0, 19])
+        self.assertFalse(self.index.get_occupancy_grid(-5, 5, exclude=["far"])[1, 1])
+        self.assertTrue(grid[1, 1])
+
+    def test_update(self):
+        self.assertEqual(len(self.index), 4)
+        self.index.update([
+            self.create_object("near", 3, 3),
+            self.create_object("middle", 2, 0),
+            self.create_object("new", 0, 0.5)
+        ])
+        self.assertEqual(len(self.index), 3)
+        self.assertFalse("far" in self.index)
+        self.assertTrue("new" in self.index)
+
+        actual = self.index.query_radius({"x": 0, "z": 0}, 1.0)
+        self.assertEqual([item[0].uuid for item in actual], ["new"])
+        actual = self.index.query_nearest({"x": 3, "z": 3})
+        self.assertEqual([item[0].uuid for item in actual], ["near"])
+        self.assertFalse(self.index.get_occupancy_grid(-5, 5)[1, 1])
@@ -0,0 +1,141 @@
+import numpy
+from PIL import Image
+import unittest
+
+from machine_common_sense.mcs_step_history import MCS_Step_History
+from machine_common_sense.mcs_step_output import MCS_Step_Output
+
+class Test_MCS_Step_History(unittest.TestCase):
+
+    def create_step_output(self, value, step_number):
+        image_data = numpy.full((4, 6, 3), value, dtype=numpy.uint8)
+        depth_mask_data = numpy.full((4, 6), value, dtype=numpy.uint8)
+        object_mask_data = numpy.full((4, 6, 3), value + 1, dtype=numpy.uint8)
+        return MCS_Step_Output(
+            depth_mask_list=[Image.fromarray(depth_mask_data)],
+            head_tilt=float(value),
+            image_list=[Image.fromarray(image_data)],
+            object_list=['objects' + str(value)],
+            object_mask_list=[Image.fromarray(object_mask_data)],
+            return_status='SUCCESSFUL',
+            step_number=step_number
+        )
+
+    def test_append(self):
+        history = MCS_Step_History(3)
+        self.assertEqual(len(history), 0)
+        self.assertEqual(history.get_stacked('image').shape, (0,))
+
+        history.append(self.create_step_output(10, 0))
+        history.append(self.create_step_output(20, 1))
+        self.assertEqual(len(history), 2)
+
+        actual = history.get_stacked('image')
+        self.assertEqual(actual.shape, (2, 4, 6, 3))
+        self.assertEqual(actual[0, 0, 0, 0], 10)
+        self.assertEqual(actual[1, 0, 0, 0], 20)
+        self.assertEqual(history.get_stacked('object_mask')[1, 0, 0, 0], 21)
+        self.assertEqual(history.get_stacked('depth_mask').shape, (2, 4, 6))
+        self.assertEqual(list(history.get_step_numbers()), [0, 1])
+        self.assertEqual(list(history.get_head_tilts()), [10.0, 20.0])
+        self.assertEqual(history.get_object_lists(), [['objects10'], ['objects20']])
+        self.assertEqual(history.get_return_statuses(), ['SUCCESSFUL', 'SUCCESSFUL'])
+
+    def test_append_wraps_around(self):
+        history = MCS_Step_History(3)
+        for step_number in range(8):
+            history.append(self.create_step_output(step_number * 10, step_number))
+
+        self.assertEqual(len(history), 3)
+        self.assertEqual(list(history.get_step_numbers()), [5, 6, 7])
+        self.assertEqual(list(history.get_stacked('image')[:, 0, 0, 0]), [50, 60, 70])
+        self.assertEqual(list(history.get_stacked('image', 2)[:, 0, 0, 0]), [60, 70])
+        self.assertEqual(list(history.get_stacked('image', 10)[:, 0, 0, 0]), [50, 60, 70])
+        self.assertEqual(history.get_object_lists(1), [['objects70']])
+
+    def test_append_missing_frame(self):
+        history = MCS_Step_History(2)
+        history.append(self.create_step_output(10, 0))
+        history.append(self.create_step_output(20, 1))
+        step_output = self.create_step_output(30, 2)
+        step_output.depth_mask_list = []
+        step_output.object_mask_list = None
+        history.append(step_output)
+
+        self.assertEqual(list(history.get_step_numbers()), [1, 2])
+        self.assertEqual(list(history.get_stacked('image')[:, 0, 0, 0]), [20, 30])
+        self.assertEqual(list(history.get_stacked('depth_mask')[:, 0, 0]), [20, 0])
+        self.assertEqual(list(history.get_stacked('object_mask')[:, 0, 0, 0]), [21, 0])
+        self.assertEqual(list(history.get_valid('image')), [True, True])
+        self.assertEqual(list(history.get_valid('depth_mask')), [True, False])
+        self.assertEqual(list(history.get_valid('object_mask', 1)), [False])
+
+    def test_append_missing_first_frame(self):
+        history = MCS_Step_History(2)
+        step_output = self.create_step_output(10, 0)
+        step_output.depth_mask_list = []
+        history.append(step_output)
+        history.append(self.create_step_output(20, 1))
+        self.assertEqual(list(history.get_stacked('depth_mask')[:, 0, 0]), [0, 20])
+        self.assertEqual(list(history.get_valid('depth_mask')), [False, True])
+
+    def test_modality_never_recorded(self):
+        history = MCS_Step_History(2)
+        self.assertEqual(history.get_valid('depth_mask').shape, (0,))
+        for _ in range(2):
+            step_output = self.create_step_output(10, 0)
+            step_output.depth_mask_list = []
+            history.append(step_output)
+        with self.assertRaises(KeyError):
+            history.get_stacked('depth_mask')
+        with self.assertRaises(KeyError):
+            history.get_valid('depth_mask', 1)
+        self.assertEqual(history.get_stacked('depth_mask', 0).shape, (0,))
+        self.assertEqual(history.get_valid('depth_mask', 0).shape, (0,))
+
+        # Once a frame was recorded, both return the same number of steps.
+        history.append(self.create_step_output(20, 1))
+        self.assertEqual(history.get_stacked('depth_mask').shape, (2, 4, 6))
+        self.assertEqual(list(history.get_valid('depth_mask')), [False, True])
+
+    def test_clear(self):
+        history = MCS_Step_History(2)
+        history.append(self.create_step_output(10, 0))
+        history.clear()
+        self.assertEqual(len(history), 0)
+        self.assertEqual(history.get_stacked('image').shape, (0, 4, 6, 3))
+
+        history.append(self.create_step_output(30, 0))
+        self.assertEqual(list(history.get_stacked('image')[:, 0, 0, 0]), [30])
+
+    def test_downsample_and_grayscale(self):
+        history = MCS_Step_History(2, downsample=2, grayscale=True)
+        history.append(self.create_step_output(10, 0))
+        self.assertEqual(history.get_stacked('image').shape, (1, 2, 3))
+        self.assertEqual(history.get_stacked('depth_mask').shape, (1, 2, 3))
+        self.assertEqual(history.get_stacked('object_mask').shape, (1, 2, 3, 3))
+
+    def test_get_stacked_is_read_only_view(self):
+        history = MCS_Step_History(2)
+        history.append(self.create_step_output(10, 0))
+        actual = history.get_stacked('image')
+        self.assertFalse(actual.flags.owndata)
+        with self.assertRaises(ValueError):
+            actual[0, 0, 0, 0] = 0
+
+    def test_get_stacked_unknown_modality(self):
+        history = MCS_Step_History(2)
+        with self.assertRaises(ValueError):
+            history.get_stacked('foobar')
+
+    def test_invalid_capacity(self):
+        with self.assertRaises(ValueError):
+            MCS_Step_History(0)
+
+    def test_shape_change(self):
+        history = MCS_Step_History(2)
+        history.append(self.create_step_output(10, 0))
+        step_output = self.create_step_output(20, 1)
+        step_output.image_list = [Image.fromarray(numpy.zeros((2, 2, 3), dtype=numpy.uint8))]
+        with self.assertRaises(ValueError):
+            history.append(step_output)
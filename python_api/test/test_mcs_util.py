@@ -144,6 +144,13 @@ class Test_MCS_Util(unittest.TestCase):
         self.assertEqual(MCS_Util.is_number(''), False)
         self.assertEqual(MCS_Util.is_number('asdf'), False)
 
+    def test_is_number_with_label(self):
+        with self.assertLogs('machine_common_sense.util', level='WARNING') as logs:
+            self.assertEqual(MCS_Util.is_number('asdf', 'force'), False)
+        self.assertEqual(logs.output, ['WARNING:machine_common_sense.util:Value of force needs to be a number. ' + \
+                'Will be set to 0.'])
+        self.assertEqual(logs.records[0].fields, {'label': 'force'})
+
     def test_value_to_str_with_boolean(self):
         self.assertEqual(MCS_Util.value_to_str(True), "True")
         self.assertEqual(MCS_Util.value_to_str(False), "False")
@@ -0,0 +1,144 @@
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+
+import numpy
+
+from machine_common_sense.mcs import MCS
+from machine_common_sense.mcs_scene_corpus import MCS_Scene_Corpus
+from machine_common_sense.mcs_scene_fingerprint import MCS_Scene_Fingerprint_Index
+
+# The scene generator scripts are not part of the package.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), \
+        'scene_generator'))
+import dedup_scenes
+import scene_generator
+
+class Test_Scene_Generator(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.index_path = os.path.join(self.directory, 'index')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def generate(self, subdirectory, count, file_format=scene_generator.JSON_FORMAT, dedup_index=None, workers=1):
+        prefix = os.path.join(self.directory, subdirectory, 'scene')
+        return scene_generator.generate_one_fileset(prefix, count, seed=1, workers=workers, file_format=file_format, \
+                shard_size=50, object_count=3, dedup_index=dedup_index)
+
+    def read_files(self, subdirectory):
+        directory = os.path.join(self.directory, subdirectory)
+        file_dict = {}
+        for filename in os.listdir(directory):
+            with open(os.path.join(directory, filename), 'rb') as input_file:
+                file_dict[filename] = input_file.read()
+        return file_dict
+
+    def footprint(self, show):
+        # The X/Z bounding box of the rotated, scaled object, computed from the scene like the simulation would.
+        radians = math.radians(show['rotation']['y'])
+        cos = abs(math.cos(radians))
+        sin = abs(math.sin(radians))
+        half_x = 0.5 * (cos * show['scale']['x'] + sin * show['scale']['z'])
+        half_z = 0.5 * (sin * show['scale']['x'] + cos * show['scale']['z'])
+        return (show['position']['x'] - half_x, show['position']['z'] - half_z, show['position']['x'] + half_x, \
+                show['position']['z'] + half_z)
+
+    def assert_no_overlap(self, box, other):
+        # Allow for the rounding of the positions and scales written to the scene.
+        epsilon = 1e-9
+        self.assertFalse(box[0] < other[2] - epsilon and other[0] < box[2] - epsilon and \
+                box[1] < other[3] - epsilon and other[1] < box[3] - epsilon, str(box) + ' overlaps ' + str(other))
+
+    def test_workers_do_not_change_output(self):
+        # More scenes than one worker task (or shard) holds, so the work is really split between the workers.
+        count = scene_generator.CHUNK_SIZE * 2 + 5
+        for file_format in scene_generator.FORMAT_LIST:
+            self.assertEqual(self.generate(file_format + '-1', count, file_format, workers=1), count)
+            self.assertEqual(self.generate(file_format + '-2', count, file_format, workers=2), count)
+            single_dict = self.read_files(file_format + '-1')
+            self.assertEqual(single_dict, self.read_files(file_format + '-2'))
+            self.assertEqual(len(single_dict), count if file_format == scene_generator.JSON_FORMAT else \
+                    math.ceil(count / 50.0) + 1)
+
+    def test_place_objects_do_not_overlap(self):
+        for seed in range(20):
+            rng = random.Random(seed)
+            performer_position = {'x': scene_generator.random_position(rng), 'z': scene_generator.random_position(rng)}
+            object_list = scene_generator.place_objects(numpy.random.default_rng(seed), 25, performer_position)
+            self.assertEqual(len(object_list), 25)
+            self.assertEqual(len(set(item['id'] for item in object_list)), 25)
+
+            performer_box = (performer_position['x'] - scene_generator.PERFORMER_HALF_WIDTH, \
+                    performer_position['z'] - scene_generator.PERFORMER_HALF_WIDTH, \
+                    performer_position['x'] + scene_generator.PERFORMER_HALF_WIDTH, \
+                    performer_position['z'] + scene_generator.PERFORMER_HALF_WIDTH)
+            box_list = [self.footprint(item['shows'][0]) for item in object_list]
+            for index, box in enumerate(box_list):
+                self.assertGreaterEqual(min(box[0], box[1]), scene_generator.MIN_POSITION - 1e-9)
+                self.assertLessEqual(max(box[2], box[3]), scene_generator.MAX_POSITION + 1e-9)
+                self.assert_no_overlap(box, performer_box)
+                for other in box_list[index + 1:]:
+                    self.assert_no_overlap(box, other)
+
+    def test_place_objects_crowded_scene(self):
+        # There is no room for this many objects, so fewer are placed, and none of them overlap.
+        object_list = scene_generator.place_objects(numpy.random.default_rng(0), 1000, {'x': 0, 'z': 0})
+        self.assertLess(len(object_list), 1000)
+        box_list = [self.footprint(item['shows'][0]) for item in object_list]
+        for index, box in enumerate(box_list):
+            for other in box_list[index + 1:]:
+                self.assert_no_overlap(box, other)
+
+    def test_generated_files_are_not_duplicates_of_themselves(self):
+        self.assertEqual(self.generate('json', 3, dedup_index=self.index_path), 3)
+        path_list = sorted(os.path.join(self.directory, 'json', name) for name in \
+                os.listdir(os.path.join(self.directory, 'json')))
+        self.assertEqual(len(path_list), 3)
+
+        with MCS_Scene_Fingerprint_Index(self.index_path) as index:
+            for path in path_list:
+                config_data, status = MCS.load_config_json_file(path, index)
+                self.assertEqual(status, None)
+                self.assertNotEqual(config_data, {})
+            self.assertEqual(len(index), 3)
+
+        self.assertEqual(dedup_scenes.dedup(os.path.join(self.directory, 'json'), self.index_path, \
+                report=lambda line: None), [])
+
+        copy_path = os.path.join(self.directory, 'json', 'scene-copy.json')
+        shutil.copyfile(path_list[0], copy_path)
+        self.assertEqual(dedup_scenes.dedup(os.path.join(self.directory, 'json'), self.index_path, \
+                report=lambda line: None), [(copy_path, path_list[0])])
+
+    def test_generated_corpus_scenes_are_not_duplicates_of_themselves(self):
+        corpus_directory = os.path.join(self.directory, 'corpus')
+        self.assertEqual(self.generate('corpus', 3, 'jsonl', dedup_index=self.index_path), 3)
+        name_list = sorted(MCS_Scene_Corpus.read_names(corpus_directory))
+        self.assertEqual(name_list, ['scene-0001.json', 'scene-0002.json', 'scene-0003.json'])
+
+        with MCS_Scene_Fingerprint_Index(self.index_path) as index:
+            for name in name_list:
+                config_data, status = MCS.load_config_from_corpus(corpus_directory, name, index)
+                self.assertEqual(status, None)
+
+        self.assertEqual(dedup_scenes.dedup(corpus_directory, self.index_path, report=lambda line: None), [])
+
+    def test_regenerating_skips_duplicates(self):
+        self.assertEqual(self.generate('first', 2, dedup_index=self.index_path), 2)
+        # The same seed generates the same scenes under new names, which are all duplicates.
+        self.assertEqual(self.generate('second', 2, dedup_index=self.index_path), 0)
+        self.assertEqual(os.listdir(os.path.join(self.directory, 'second')), [])
+
+    def test_regenerating_corpus_skips_duplicates(self):
+        self.assertEqual(self.generate('first', 2, 'zip', dedup_index=self.index_path), 2)
+        # No empty shard is left behind when every scene of a shard is a duplicate.
+        self.assertEqual(self.generate('second', 2, 'zip', dedup_index=self.index_path), 0)
+        self.assertEqual([filename for filename in os.listdir(os.path.join(self.directory, 'second')) if \
+                not filename.endswith('.tsv')], [])
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+#
+# Finds the duplicate scenes in an existing directory of JSON scene files or packed scene corpus, using a persistent
+# scene fingerprint index (see MCS_Scene_Fingerprint_Index) that scene_generator.py and the scene loader can share.
+
+import sys
+import argparse
+import glob
+import multiprocessing
+import os
+
+from machine_common_sense.mcs import MCS
+from machine_common_sense.mcs_scene_corpus import MCS_Scene_Corpus
+from machine_common_sense.mcs_scene_fingerprint import MCS_Scene_Fingerprint, MCS_Scene_Fingerprint_Index
+
+# how many scenes each worker process fingerprints per task
+CHUNK_SIZE = 1000
+
+
+def fingerprint_files(path_list):
+    result = []
+    for path in path_list:
+        config_data, status = MCS.load_config_json_file(path)
+        result.append((path, MCS_Scene_Fingerprint.fingerprint(config_data) if status is None else None))
+    return result
+
+
+def fingerprint_corpus_scenes(directory, name_list):
+    with MCS_Scene_Corpus(directory) as corpus:
+        # the path of a scene in a corpus (as stored in the fingerprint index) is the directory joined with its name
+        return [(os.path.join(directory, name), MCS_Scene_Fingerprint.fingerprint(corpus.load(name)))
+                for name in name_list]
+
+
+def dedup(input_path, index_path, workers=1, delete=False, report=print):
+    """Fingerprint every scene in the given directory in parallel, add the fingerprints to the index in name order
+    (so the first scene of each set of duplicates is kept), and report each duplicate.  Return the list of
+    (duplicate, original) name pairs."""
+    if os.path.exists(os.path.join(input_path, MCS_Scene_Corpus.INDEX_FILENAME)):
+        if delete:
+            raise ValueError('Cannot delete scenes from a packed scene corpus.')
+        name_list = sorted(MCS_Scene_Corpus(input_path).get_names())
+        task_list = [(fingerprint_corpus_scenes, (input_path, name_list[i:i + CHUNK_SIZE]))
+                     for i in range(0, len(name_list), CHUNK_SIZE)]
+    else:
+        path_list = sorted(glob.glob(os.path.join(input_path, '*.json')))
+        task_list = [(fingerprint_files, (path_list[i:i + CHUNK_SIZE],)) for i in range(0, len(path_list), CHUNK_SIZE)]
+
+    duplicate_list = []
+    pool = multiprocessing.Pool(workers) if workers > 1 else None
+    try:
+        results = pool.imap(run_task, task_list) if pool else map(run_task, task_list)
+        with MCS_Scene_Fingerprint_Index(index_path) as index:
+            # the results come back in task order, so the same scenes are kept for any number of workers
+            for result in results:
+                for name, fingerprint in result:
+                    if fingerprint is None:
+                        report(f'{name}\tinvalid')
+                        continue
+                    original = index.add_fingerprint(fingerprint, name)
+                    if original is not None:
+                        duplicate_list.append((name, original))
+                        report(f'{name}\t{original}')
+                        if delete:
+                            os.remove(name)
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+    return duplicate_list
+
+
+def run_task(task):
+    function, args = task
+    return function(*args)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Find (and optionally delete) duplicate scenes, printing one ' +
+                                     '"duplicate<TAB>original" line per duplicate')
+    parser.add_argument('input', help='Directory of JSON scene files, or of a packed scene corpus')
+    parser.add_argument('--index', required=True, help='Path of the scene fingerprint index to use and update')
+    parser.add_argument('--workers', type=int, default=1, help='How many processes fingerprint scenes [default=1]')
+    parser.add_argument('--delete', action='store_true', help='Delete duplicate JSON scene files')
+
+    args = parser.parse_args(argv[1:])
+
+    dedup(args.input, args.index, args.workers, args.delete)
+
+
+if __name__ == '__main__':
+    main(sys.argv)
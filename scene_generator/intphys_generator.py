@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+#
+# Generates matched plausible/implausible intuitive physics ("intphys") scene pairs from parameterized templates, like
+# the hand-written python_api/scenes/intphys_*_sample_1.json files.  Both scenes of a pair come from the same random
+# parameters and only differ in the implausible event.
+
+import sys
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import time
+
+from scene_generator import DEFAULT_SHARD_SIZE, FORMAT_LIST, JSON_FORMAT, scene_seed
+
+# how many pairs each worker process generates per task
+CHUNK_SIZE = 500
+
+CEILING_MATERIALS = ['AI2-THOR/Materials/Walls/Drywall']
+FLOOR_MATERIALS = [
+    'AI2-THOR/Materials/Fabrics/Carpet2',
+    'AI2-THOR/Materials/Fabrics/Carpet4',
+    'AI2-THOR/Materials/Fabrics/CarpetDark',
+    'AI2-THOR/Materials/Fabrics/HotelCarpet3',
+    'AI2-THOR/Materials/Fabrics/RugPattern224'
+]
+WALL_MATERIALS = [
+    'AI2-THOR/Materials/Walls/Drywall4Tiled',
+    'AI2-THOR/Materials/Walls/DrywallOrange',
+    'AI2-THOR/Materials/Walls/EggshellDrywall',
+    'AI2-THOR/Materials/Walls/YellowDrywall'
+]
+# (material, salient material) of each moving object
+OBJECT_MATERIALS = [
+    ('AI2-THOR/Materials/Plastics/BlueRubber', 'rubber'),
+    ('AI2-THOR/Materials/Plastics/GreenPlastic', 'plastic'),
+    ('AI2-THOR/Materials/Plastics/OrangePlastic', 'plastic'),
+    ('AI2-THOR/Materials/Plastics/YellowPlastic2', 'plastic')
+]
+# (material, salient material) of each occluder
+OCCLUDER_MATERIALS = [
+    ('AI2-THOR/Materials/Ceramics/GREYGRANITE', 'ceramic'),
+    ('AI2-THOR/Materials/Ceramics/RedBrick', 'ceramic'),
+    ('AI2-THOR/Materials/Wood/WoodFloorsCross', 'wood')
+]
+
+PLAUSIBLE = 'plausible'
+IMPLAUSIBLE = 'implausible'
+
+
+def vector(x, y, z):
+    return {'x': x, 'y': y, 'z': z}
+
+
+def create_body(rng, last_step, performer_start):
+    return {
+        'ceilingMaterial': rng.choice(CEILING_MATERIALS),
+        'floorMaterial': rng.choice(FLOOR_MATERIALS),
+        'wallMaterial': rng.choice(WALL_MATERIALS),
+        'performerStart': performer_start,
+        'goal': {
+            'type_list': ['observation', 'intuitive_physics', 'objects'],
+            'task_list': ['plausibility'],
+            'info_list': [],
+            'last_step': last_step,
+            'action_list': [['Pass'] for _ in range(last_step)],
+            'metadata': {
+                'choose': [PLAUSIBLE, IMPLAUSIBLE]
+            }
+        },
+        'objects': []
+    }
+
+
+def create_ball(rng, step_begin, position, scale, object_type='sphere'):
+    material, salient_material = rng.choice(OBJECT_MATERIALS)
+    return {
+        'id': 'ball_a',
+        'type': object_type,
+        'mass': round(rng.uniform(0.1, 0.5), 2),
+        'materialFile': material,
+        'pickupable': True,
+        'salientMaterials': [salient_material],
+        'shows': [{
+            'stepBegin': step_begin,
+            'position': position,
+            'scale': vector(scale, scale, scale)
+        }]
+    }
+
+
+def create_occluder(rng, width, height):
+    material, salient_material = rng.choice(OCCLUDER_MATERIALS)
+    return {
+        'id': 'wall_a',
+        'type': 'cube',
+        'kinematic': True,
+        'mass': 100,
+        'materialFile': material,
+        'salientMaterials': [salient_material],
+        'structure': True,
+        'shows': [{
+            'stepBegin': 0,
+            'position': vector(0, round(height / 2, 3), 2.5),
+            'scale': vector(width, height, 0.1)
+        }]
+    }
+
+
+def split_pair(plausible, implausible_function):
+    """Return the plausible body and a copy of it changed by the given function.  Only the changed parts need to be
+    copied, since both bodies are written out before either is changed again."""
+    implausible = dict(plausible, objects=[dict(item) for item in plausible['objects']])
+    implausible_function(implausible)
+    return plausible, implausible
+
+
+def gravity_template(rng):
+    # a ball falls to the floor; the implausible ball is pushed back up partway through its fall
+    last_step = 10
+    body = create_body(rng, last_step, {'position': {'z': -1}})
+    ball = create_ball(rng, 0, vector(round(rng.uniform(-1.5, 1.5), 2), round(rng.uniform(2.0, 2.9), 2),
+                                      round(rng.uniform(2.5, 3.5), 2)), round(rng.uniform(0.1, 0.3), 2))
+    body['objects'].append(ball)
+    force_step = rng.randint(4, 7)
+    force = round(500 * ball['mass'])
+
+    def implausible_function(implausible):
+        implausible['objects'][0]['forces'] = [{'stepBegin': force_step, 'stepEnd': last_step,
+                                                'vector': vector(0, force, 0)}]
+
+    return split_pair(body, implausible_function)
+
+
+def object_permanence_template(rng):
+    # a ball appears behind an occluder; the implausible ball vanishes while still hidden
+    last_step = 30
+    body = create_body(rng, last_step, {'position': {'x': -2, 'z': 3}, 'rotation': {'y': 90}})
+    show_step = rng.randint(18, 22)
+    scale = round(rng.uniform(0.15, 0.35), 2)
+    body['objects'].append(create_ball(rng, show_step, vector(round(rng.uniform(-1, 1), 2), 2, 3), scale))
+    body['objects'].append(create_occluder(rng, 10, round(rng.uniform(0.4, 0.6), 2)))
+    hide_step = rng.randint(show_step + 2, last_step - 2)
+
+    def implausible_function(implausible):
+        implausible['objects'][0]['hides'] = [{'stepBegin': hide_step}]
+
+    return split_pair(body, implausible_function)
+
+
+def shape_constancy_template(rng):
+    # a ball is thrown over an occluder; the implausible ball turns into a cube while behind it
+    last_step = 30
+    body = create_body(rng, last_step, {'position': {'x': -2, 'z': 3}, 'rotation': {'y': 90}})
+    show_step = rng.randint(18, 22)
+    scale = round(rng.uniform(0.15, 0.35), 2)
+    ball = create_ball(rng, show_step, vector(-2.5, scale, 3), scale)
+    throw_force = round(rng.uniform(20, 30))
+    ball['forces'] = [{'stepBegin': show_step, 'stepEnd': show_step + 3, 'vector': vector(throw_force, 50, 0)}]
+    body['objects'].append(ball)
+    body['objects'].append(create_occluder(rng, round(rng.uniform(0.8, 1.2), 2), 2.5))
+    swap_step = show_step + 5
+
+    def implausible_function(implausible):
+        implausible['objects'][0]['hides'] = [{'stepBegin': swap_step}]
+        cube = dict(ball, type='cube', shows=[dict(ball['shows'][0], stepBegin=swap_step,
+                                                   position=vector(0, 2, 3))])
+        cube['forces'] = [{'stepBegin': swap_step, 'stepEnd': last_step, 'vector': vector(throw_force, 0, 0)}]
+        implausible['objects'].append(cube)
+
+    return split_pair(body, implausible_function)
+
+
+def energy_conservation_template(rng):
+    # a ball rolls behind an occluder; the implausible ball bounces back from nothing
+    last_step = 45
+    body = create_body(rng, last_step, {'position': {'x': -2, 'z': 3}, 'rotation': {'y': 90}})
+    show_step = rng.randint(18, 22)
+    scale = round(rng.uniform(0.3, 0.5), 2)
+    ball = create_ball(rng, show_step, vector(-2.5, round(scale / 2, 3), 3), scale)
+    push_force = round(rng.uniform(80, 120))
+    ball['forces'] = [{'stepBegin': show_step, 'stepEnd': show_step, 'vector': vector(push_force, 0, 0)}]
+    body['objects'].append(ball)
+    body['objects'].append(create_occluder(rng, round(rng.uniform(0.5, 0.8), 2), 2.5))
+    bounce_step = show_step + rng.randint(10, 14)
+
+    def implausible_function(implausible):
+        implausible['objects'][0] = dict(ball, forces=ball['forces'] + [{'stepBegin': bounce_step,
+                                                                          'stepEnd': bounce_step,
+                                                                          'vector': vector(-2 * push_force, 0, 0)}])
+
+    return split_pair(body, implausible_function)
+
+
+TEMPLATES = {
+    'gravity': gravity_template,
+    'object_permanence': object_permanence_template,
+    'shape_constancy': shape_constancy_template,
+    'energy_conservation': energy_conservation_template
+}
+
+
+def generate_pair(concept, seed, index):
+    """Return the names and bodies of the plausible and implausible scenes of the given concept and index."""
+    plausible, implausible = TEMPLATES[concept](random.Random(scene_seed(seed, f'{concept}:{index}')))
+    pair = []
+    for label, body in [(PLAUSIBLE, plausible), (IMPLAUSIBLE, implausible)]:
+        name = f'intphys_{concept}_{label}_{index:06}'
+        pair.append((name, dict(body, name=name)))
+    return pair
+
+
+def generate_chunk(output_dir, concept, seed, index_list, file_format):
+    """Generate and write the pairs of the given indexes, one scene at a time.  Return the concept, the number of
+    scenes, the seconds taken, and any corpus index entries."""
+    start = time.perf_counter()
+    entry_list = []
+    if file_format == JSON_FORMAT:
+        for index in index_list:
+            for name, body in generate_pair(concept, seed, index):
+                with open(os.path.join(output_dir, name + '.json'), 'w') as out:
+                    json.dump(body, out, indent=2)
+    else:
+        # imported here so the default JSON format does not need the MCS package installed
+        from machine_common_sense.mcs_scene_corpus import MCS_Scene_Corpus_Writer
+        shard = f'intphys_{concept}-{index_list[0]:06}.{file_format}'
+        with MCS_Scene_Corpus_Writer(output_dir, shard, append_index_on_close=False) as writer:
+            for index in index_list:
+                for name, body in generate_pair(concept, seed, index):
+                    writer.write(name, body)
+        entry_list = writer.close()
+    return concept, 2 * len(index_list), time.perf_counter() - start, entry_list
+
+
+def generate_families(output_dir, concept_list, count, seed, workers=1, file_format=JSON_FORMAT,
+                      chunk_size=CHUNK_SIZE, report=print):
+    """Generate count pairs of each concept, writing each chunk as soon as it is done, and report the throughput of
+    each concept.  Return a dict of each concept to its (scenes, worker seconds)."""
+    os.makedirs(output_dir, exist_ok=True)
+    task_list = [(output_dir, concept, seed, list(range(i + 1, min(i + chunk_size, count) + 1)), file_format)
+                 for concept in concept_list for i in range(0, count, chunk_size)]
+
+    totals = {concept: [0, 0.0] for concept in concept_list}
+    start = time.perf_counter()
+    pool = multiprocessing.Pool(workers) if workers > 1 else None
+    try:
+        results = pool.imap(star_generate_chunk, task_list) if pool else map(star_generate_chunk, task_list)
+        for concept, scenes, seconds, entry_list in results:
+            if entry_list:
+                from machine_common_sense.mcs_scene_corpus import MCS_Scene_Corpus
+                MCS_Scene_Corpus.append_index(output_dir, entry_list)
+            totals[concept][0] += scenes
+            totals[concept][1] += seconds
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+
+    elapsed = time.perf_counter() - start
+    for concept, (scenes, seconds) in totals.items():
+        report(f'{concept}: {scenes} scenes in {seconds:.2f} worker seconds ({scenes / max(seconds, 1e-9):.0f} ' +
+               'scenes/second/worker)')
+    total_scenes = sum(scenes for scenes, _ in totals.values())
+    report(f'total: {total_scenes} scenes in {elapsed:.2f} seconds ({total_scenes / max(elapsed, 1e-9):.0f} ' +
+           f'scenes/second with {max(workers, 1)} workers)')
+    return dict((concept, tuple(total)) for concept, total in totals.items())
+
+
+def star_generate_chunk(task):
+    return generate_chunk(*task)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Create matched plausible/implausible intphys scene pairs')
+    parser.add_argument('--output-dir', required=True, help='Directory for the output scenes')
+    parser.add_argument('-c', '--count', type=int, default=1, help='How many pairs to generate per concept [default=1]')
+    parser.add_argument('--concepts', nargs='+', choices=sorted(TEMPLATES.keys()), default=list(TEMPLATES.keys()),
+                        help='Which concepts to generate [default=all]')
+    parser.add_argument('--seed', type=int, default=None, help='Random number seed [default=None]')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='How many processes generate scenes; the output does not depend on it [default=1]')
+    parser.add_argument('--format', choices=FORMAT_LIST, default=JSON_FORMAT,
+                        help='Write one JSON file per scene, or shards of a packed scene corpus [default=json]')
+    parser.add_argument('--shard-size', type=int, default=DEFAULT_SHARD_SIZE,
+                        help=f'How many pairs to write per shard or worker task [default={DEFAULT_SHARD_SIZE}]')
+
+    args = parser.parse_args(argv[1:])
+
+    seed = args.seed if args.seed is not None else random.getrandbits(64)
+    chunk_size = args.shard_size if args.format != JSON_FORMAT else min(args.shard_size, CHUNK_SIZE)
+    generate_families(args.output_dir, args.concepts, args.count, seed, args.workers, args.format, chunk_size)
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -3,11 +3,15 @@
 
 import sys
 import argparse
+import hashlib
+import multiprocessing
 import os
 import os.path
 import json
-import copy
 import random
+import re
+
+import numpy
 
 OUTPUT_TEMPLATE_JSON = """
 {
@@ -40,47 +44,354 @@ MIN_ROTATION = 0
 MAX_ROTATION = 359
 ROTATION_DIGITS = 0
 
+# how many scenes each worker process generates per task
+CHUNK_SIZE = 64
+
+# object placement: each object's footprint is the X/Z bounding box of its rotated, scaled base size
+MIN_SCALE = 0.1
+MAX_SCALE = 0.6
+SCALE_DIGITS = 2
+OBJECT_POSITION_DIGITS = 2
+OBJECT_DEFINITIONS = [
+    {'type': 'cube', 'size': (1.0, 1.0, 1.0), 'uniform_scale': False},
+    {'type': 'sphere', 'size': (1.0, 1.0, 1.0), 'uniform_scale': True}
+]
+OBJECT_MATERIALS = [
+    'Plastics/BlueRubber',
+    'Plastics/GreenPlastic',
+    'Plastics/OrangePlastic',
+    'Plastics/YellowPlastic2',
+    'Wood/WoodGrain_Brown',
+    'Metals/Brass 1'
+]
+# half the width of the square kept clear around the performer start
+PERFORMER_HALF_WIDTH = 0.5
+# the spatial hash cell size, as big as the biggest footprint so each test only looks at a few cells
+PLACEMENT_CELL_SIZE = MAX_SCALE * 1.5
+# how many candidates are sampled at once, and how many are tried per object before giving up on a crowded scene
+PLACEMENT_BATCH_SIZE = 64
+MAX_ATTEMPTS_PER_OBJECT = 20
+
+# output formats: one pretty-printed file per scene, or shards of a packed scene corpus (see MCS_Scene_Corpus)
+JSON_FORMAT = 'json'
+FORMAT_LIST = [JSON_FORMAT, 'jsonl', 'zip']
+DEFAULT_SHARD_SIZE = 10000
 
-def random_position():
-    return round(random.uniform(MIN_POSITION, MAX_POSITION), POSITION_DIGITS)
 
+def random_position(rng=random):
+    return round(rng.uniform(MIN_POSITION, MAX_POSITION), POSITION_DIGITS)
 
-def random_rotation():
-    rotation = round(random.uniform(MIN_ROTATION, MAX_ROTATION), ROTATION_DIGITS)
+
+def random_rotation(rng=random):
+    rotation = round(rng.uniform(MIN_ROTATION, MAX_ROTATION), ROTATION_DIGITS)
     if ROTATION_DIGITS == 0:
         rotation = int(rotation)
     return rotation
 
 
-def generate_file(name):
-    global OUTPUT_TEMPLATE
-    body = copy.deepcopy(OUTPUT_TEMPLATE)
+def scene_seed(seed, index):
+    """Return the seed of the scene with the given index, so each scene is the same no matter which worker makes it."""
+    digest = hashlib.sha256(f'{seed}:{index}'.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+
+class FootprintHash:
+    """A spatial hash of axis-aligned X/Z footprints (min_x, min_z, max_x, max_z), so testing a new footprint for
+    overlaps only looks at the footprints in the cells it touches, instead of every footprint in the scene."""
+
+    def __init__(self, cell_size=PLACEMENT_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+
+    def cell_range(self, box):
+        return (range(int(numpy.floor(box[0] / self.cell_size)), int(numpy.floor(box[2] / self.cell_size)) + 1),
+                range(int(numpy.floor(box[1] / self.cell_size)), int(numpy.floor(box[3] / self.cell_size)) + 1))
+
+    def overlaps(self, box):
+        x_range, z_range = self.cell_range(box)
+        for cell_x in x_range:
+            for cell_z in z_range:
+                for other in self.cells.get((cell_x, cell_z), ()):
+                    if box[0] < other[2] and other[0] < box[2] and box[1] < other[3] and other[1] < box[3]:
+                        return True
+        return False
+
+    def insert(self, box):
+        x_range, z_range = self.cell_range(box)
+        for cell_x in x_range:
+            for cell_z in z_range:
+                self.cells.setdefault((cell_x, cell_z), []).append(box)
+
+
+def sample_object_batch(np_rng, size):
+    """Return the types, materials, scales, rotations, positions and footprints of the given number of candidate
+    objects, sampled all at once, with each footprint inside MIN_POSITION and MAX_POSITION."""
+    type_indexes = np_rng.integers(len(OBJECT_DEFINITIONS), size=size)
+    material_indexes = np_rng.integers(len(OBJECT_MATERIALS), size=size)
+    scales = numpy.round(np_rng.uniform(MIN_SCALE, MAX_SCALE, (size, 3)), SCALE_DIGITS)
+    uniform = numpy.array([definition['uniform_scale'] for definition in OBJECT_DEFINITIONS])[type_indexes]
+    scales[uniform] = scales[uniform, :1]
+    scales *= numpy.array([definition['size'] for definition in OBJECT_DEFINITIONS])[type_indexes]
+    rotations = np_rng.integers(MIN_ROTATION, MAX_ROTATION + 1, size=size)
+
+    radians = numpy.radians(rotations)
+    cos = numpy.abs(numpy.cos(radians))
+    sin = numpy.abs(numpy.sin(radians))
+    half_x = 0.5 * (cos * scales[:, 0] + sin * scales[:, 2])
+    half_z = 0.5 * (sin * scales[:, 0] + cos * scales[:, 2])
+    # sample each center within the room minus its own half size, so the whole footprint is always inside
+    x = numpy.round(MIN_POSITION + half_x + np_rng.random(size) * (MAX_POSITION - MIN_POSITION - 2 * half_x),
+                    OBJECT_POSITION_DIGITS)
+    z = numpy.round(MIN_POSITION + half_z + np_rng.random(size) * (MAX_POSITION - MIN_POSITION - 2 * half_z),
+                    OBJECT_POSITION_DIGITS)
+    boxes = numpy.stack([x - half_x, z - half_z, x + half_x, z + half_z], axis=1)
+    # rounding may push a footprint slightly outside the room
+    inside = ((boxes[:, 0] >= MIN_POSITION) & (boxes[:, 1] >= MIN_POSITION) & (boxes[:, 2] <= MAX_POSITION) &
+              (boxes[:, 3] <= MAX_POSITION))
+    return type_indexes, material_indexes, scales, rotations, x, z, boxes, inside
+
+
+def place_objects(np_rng, count, performer_position):
+    """Return up to count objects with random types, materials, scales, rotations and positions whose footprints do
+    not overlap each other or the performer start.  Candidates are sampled in batches, and each is tested against
+    nearby footprints only, so the time taken grows linearly with the number of objects.  Crowded scenes may get
+    fewer objects, once MAX_ATTEMPTS_PER_OBJECT * count candidates were tried."""
+    footprints = FootprintHash()
+    footprints.insert((performer_position['x'] - PERFORMER_HALF_WIDTH, performer_position['z'] - PERFORMER_HALF_WIDTH,
+                       performer_position['x'] + PERFORMER_HALF_WIDTH, performer_position['z'] + PERFORMER_HALF_WIDTH))
+
+    objects = []
+    attempts_left = count * MAX_ATTEMPTS_PER_OBJECT
+    while len(objects) < count and attempts_left > 0:
+        size = min(PLACEMENT_BATCH_SIZE, attempts_left)
+        attempts_left -= size
+        type_indexes, material_indexes, scales, rotations, x, z, boxes, inside = sample_object_batch(np_rng, size)
+        for i in numpy.flatnonzero(inside).tolist():
+            box = tuple(boxes[i].tolist())
+            if footprints.overlaps(box):
+                continue
+            footprints.insert(box)
+            scale = scales[i].tolist()
+            objects.append({
+                'id': f'object-{len(objects) + 1:03}',
+                'type': OBJECT_DEFINITIONS[type_indexes[i]]['type'],
+                'materialFile': OBJECT_MATERIALS[material_indexes[i]],
+                'pickupable': True,
+                'shows': [{
+                    'stepBegin': 0,
+                    'position': {'x': x[i].item(), 'y': round(scale[1] / 2, SCALE_DIGITS + 1), 'z': z[i].item()},
+                    'rotation': {'x': 0, 'y': int(rotations[i]), 'z': 0},
+                    'scale': {'x': scale[0], 'y': scale[1], 'z': scale[2]}
+                }]
+            })
+            if len(objects) == count:
+                break
+    return objects
+
+
+def generate_body(name, rng=random, object_count=0):
+    # Build the body directly instead of deep-copying OUTPUT_TEMPLATE: it is much faster, and only the top-level
+    # values and the performerStart dicts need to be new objects.
+    body = dict(OUTPUT_TEMPLATE)
     body['name'] = os.path.basename(name)
-    position = body['performerStart']['position']
-    position['x'] = random_position()
-    position['z'] = random_position()
-    body['performerStart']['rotation']['y'] = random_rotation()
+    body['performerStart'] = {
+        'position': {
+            'x': random_position(rng),
+            'z': random_position(rng)
+        },
+        'rotation': {
+            'y': random_rotation(rng)
+        }
+    }
+    body['objects'] = []
+    if object_count > 0:
+        np_rng = numpy.random.default_rng(rng.getrandbits(64))
+        body['objects'] = place_objects(np_rng, object_count, body['performerStart']['position'])
+    body['goal'] = {}
+    body['answer'] = {}
+    return body
+
 
+def generate_file(name, rng=random, object_count=0):
+    body = generate_body(name, rng, object_count)
     with open(name, 'w') as out:
         json.dump(body, out, indent=2)
 
 
-def generate_one_fileset(prefix, count):
-    # skip existing files
+class DuplicateFilter:
+    """Skips scenes whose fingerprints are already in a scene fingerprint index (see MCS_Scene_Fingerprint_Index),
+    which each worker process only reads.  The parent process adds the fingerprints of the written scenes afterward,
+    which also finds any duplicates within the same run.  The scenes of a shard are named relative to its directory."""
+
+    def __init__(self, dedup_index, directory=None):
+        self.enabled = dedup_index is not None
+        self.directory = directory
+        self.index = None
+        self.fingerprints = {}
+        if self.enabled:
+            from machine_common_sense.mcs_scene_fingerprint import MCS_Scene_Fingerprint, MCS_Scene_Fingerprint_Index
+            self.fingerprint = MCS_Scene_Fingerprint.fingerprint
+            self.scene_name = MCS_Scene_Fingerprint_Index.scene_name
+            try:
+                self.index = MCS_Scene_Fingerprint_Index(dedup_index, read_only=True)
+            except Exception:
+                # the index does not exist yet
+                pass
+
+    def is_duplicate(self, name, body):
+        if not self.enabled:
+            return False
+        fingerprint = self.fingerprint(body)
+        if self.index is not None:
+            # a scene already indexed under its own name (like one written by an earlier run) is not a duplicate
+            original = self.index.get(fingerprint)
+            if original is not None and original != self.scene_name(scene_path(name, self.directory)):
+                return True
+        self.fingerprints[name] = fingerprint
+        return False
+
+    def close(self):
+        if self.index is not None:
+            self.index.close()
+
+
+def generate_indexed_files(prefix, seed, index_list, object_count=0, dedup_index=None):
+    """Write the scenes of the given indexes, except duplicates, and return the fingerprint (or None) of each written
+    scene's file name."""
+    duplicates = DuplicateFilter(dedup_index)
+    written = {}
+    for index in index_list:
+        name = f'{prefix}-{index:04}.json'
+        body = generate_body(name, random.Random(scene_seed(seed, index)), object_count)
+        if duplicates.is_duplicate(name, body):
+            continue
+        with open(name, 'w') as out:
+            json.dump(body, out, indent=2)
+        written[name] = duplicates.fingerprints.get(name)
+    duplicates.close()
+    return written
+
+
+def generate_indexed_shard(prefix, seed, index_list, file_format, object_count=0, dedup_index=None):
+    """Write the scenes of the given indexes, except duplicates, to one shard and return its index entries and the
+    fingerprint (or None) of each written scene's name."""
+    # imported here so the default JSON format does not need the MCS package installed
+    from machine_common_sense.mcs_scene_corpus import MCS_Scene_Corpus_Writer
+
+    dirname = os.path.dirname(prefix) or '.'
+    basename = os.path.basename(prefix)
+    shard = f'{basename}-{index_list[0]:06}.{file_format}'
+    duplicates = DuplicateFilter(dedup_index, dirname)
+    with MCS_Scene_Corpus_Writer(dirname, shard, append_index_on_close=False) as writer:
+        for index in index_list:
+            name = f'{basename}-{index:04}.json'
+            body = generate_body(name, random.Random(scene_seed(seed, index)), object_count)
+            if not duplicates.is_duplicate(name, body):
+                writer.write(name, body)
+    duplicates.close()
+    entry_list = writer.close()
+    return entry_list, dict((entry[0], duplicates.fingerprints.get(entry[0])) for entry in entry_list)
+
+
+def scene_path(name, directory=None):
+    """Return the path of the scene with the given name (relative to the directory of its shard, if given), which is
+    the name of the scene in a scene fingerprint index"""
+    return name if directory is None else os.path.join(directory, name)
+
+
+def add_fingerprints(dedup_index, written, directory=None):
+    """Add the fingerprints of the written scenes, in order, to the index, and return the names of any duplicates
+    within them.  The names of the scenes of shards are relative to the given directory."""
+    if dedup_index is None:
+        return set()
+    from machine_common_sense.mcs_scene_fingerprint import MCS_Scene_Fingerprint_Index
+    duplicate_names = set()
+    with MCS_Scene_Fingerprint_Index(dedup_index) as index:
+        for name, fingerprint in written.items():
+            if index.add_fingerprint(fingerprint, scene_path(name, directory)) is not None:
+                duplicate_names.add(name)
+    return duplicate_names
+
+
+def find_free_indexes(prefix, count, file_format=JSON_FORMAT):
+    """Return the first count indexes whose scenes do not exist yet, using one listing of the prefix's directory (or
+    one read of its corpus index)."""
+    dirname = os.path.dirname(prefix) or '.'
+    pattern = re.compile(re.escape(os.path.basename(prefix)) + r'-(\d{4,})\.json$')
+    if file_format == JSON_FORMAT:
+        try:
+            filename_list = os.listdir(dirname)
+        except FileNotFoundError:
+            filename_list = []
+    else:
+        from machine_common_sense.mcs_scene_corpus import MCS_Scene_Corpus
+        filename_list = MCS_Scene_Corpus.read_names(dirname)
+    used = set()
+    for filename in filename_list:
+        match = pattern.match(filename)
+        if match:
+            used.add(int(match.group(1)))
+
+    index_list = []
     index = 1
+    while len(index_list) < count:
+        if index not in used:
+            index_list.append(index)
+        index += 1
+    return index_list
+
+
+def generate_one_fileset(prefix, count, seed=None, workers=1, file_format=JSON_FORMAT,
+                         shard_size=DEFAULT_SHARD_SIZE, object_count=0, dedup_index=None):
+    """Generate count scenes (or fewer, if a dedup_index is given and some are duplicates) and return how many were
+    written."""
+    # skip existing files
     dirname = os.path.dirname(prefix)
     if dirname != '':
         os.makedirs(dirname, exist_ok=True)
 
-    while count > 0:
-        file_exists = True
-        while file_exists:
-            name = f'{prefix}-{index:04}.json'
-            file_exists = os.path.exists(name)
-            index += 1
+    if seed is None:
+        seed = random.getrandbits(64)
+
+    index_list = find_free_indexes(prefix, count, file_format)
+    if file_format != JSON_FORMAT:
+        return generate_corpus(prefix, seed, index_list, workers, file_format, shard_size, object_count, dedup_index)
+
+    task_list = [(prefix, seed, index_list[i:i + CHUNK_SIZE], object_count, dedup_index)
+                 for i in range(0, len(index_list), CHUNK_SIZE)]
+    if workers <= 1 or len(task_list) <= 1:
+        written_list = [generate_indexed_files(*task) for task in task_list]
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            written_list = pool.starmap(generate_indexed_files, task_list)
+
+    written = dict(item for written in written_list for item in written.items())
+    for name in add_fingerprints(dedup_index, written):
+        os.remove(name)
+        del written[name]
+    return len(written)
 
-        generate_file(name)
-        count -= 1
+
+def generate_corpus(prefix, seed, index_list, workers, file_format, shard_size, object_count=0, dedup_index=None):
+    from machine_common_sense.mcs_scene_corpus import MCS_Scene_Corpus
+
+    # each shard is one task, named after its first index, so the shards do not depend on the number of workers (the
+    # writer adds a number to the name instead of overwriting a shard left by an earlier run)
+    chunk_list = [index_list[i:i + shard_size] for i in range(0, len(index_list), shard_size)]
+    task_list = [(prefix, seed, chunk, file_format, object_count, dedup_index) for chunk in chunk_list]
+    if workers <= 1 or len(chunk_list) <= 1:
+        result_list = [generate_indexed_shard(*task) for task in task_list]
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            result_list = pool.starmap(generate_indexed_shard, task_list)
+
+    # only this process writes the indexes, after all of its shards are complete; duplicates within this run stay in
+    # their shards but are left out of the corpus index
+    duplicate_names = add_fingerprints(dedup_index, dict(item for _, written in result_list for item in
+                                                         written.items()), os.path.dirname(prefix) or '.')
+    entry_list = [entry for entries, _ in result_list for entry in entries if entry[0] not in duplicate_names]
+    MCS_Scene_Corpus.append_index(os.path.dirname(prefix) or '.', entry_list)
+    return len(entry_list)
 
 
 def main(argv):
@@ -88,12 +399,26 @@ def main(argv):
     parser.add_argument('--prefix', required=True, help='Prefix for output filenames')
     parser.add_argument('-c', '--count', type=int, default=1, help='How many scenes to generate [default=1]')
     parser.add_argument('--seed', type=int, default=None, help='Random number seed [default=None]')
-    
+    parser.add_argument('--workers', type=int, default=1,
+                        help='How many processes generate scenes; the output does not depend on it [default=1]')
+    parser.add_argument('--format', choices=FORMAT_LIST, default=JSON_FORMAT,
+                        help='Write one JSON file per scene, or shards of a packed scene corpus with an index ' +
+                        '(index.tsv) in the prefix directory [default=json]')
+    parser.add_argument('--shard-size', type=int, default=DEFAULT_SHARD_SIZE,
+                        help=f'How many scenes to write per shard of a packed scene corpus [default={DEFAULT_SHARD_SIZE}]')
+    parser.add_argument('--objects', type=int, default=0,
+                        help='How many objects to place in each scene, without overlapping each other or the ' +
+                        'performer start (crowded scenes may get fewer) [default=0]')
+    parser.add_argument('--dedup-index', default=None,
+                        help='Path of a scene fingerprint index: skip scenes whose fingerprints are already in it, ' +
+                        'and add the fingerprints of new scenes to it [default=None]')
+
     args = parser.parse_args(argv[1:])
 
     random.seed(args.seed)
-    generate_one_fileset(args.prefix, args.count)
-    
+    generate_one_fileset(args.prefix, args.count, args.seed, args.workers, args.format, args.shard_size,
+                         args.objects, args.dedup_index)
+
 
 if __name__ == '__main__':
     main(sys.argv)
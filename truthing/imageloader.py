@@ -0,0 +1,143 @@
+#
+#  Loads the scene images of tests on background threads for the TruthingViewer
+#
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+NUM_SCENES = 4
+NUM_FRAMES = 100
+
+
+def scene_image_path(data_dir, test_num, scene, frame_num):
+    """The path of a scene image; scene is 0 to 3 and frame_num is 1 to 100"""
+    return data_dir / str(test_num).zfill(4) / str(scene + 1) / "scene" / ("scene_" + str(frame_num).zfill(3) + ".png")
+
+
+def read_frame(path):
+    """Read a scene image as a uint8 array: RGB, or RGBA if the image has transparency.
+    (mpimg.imread would make a float32 RGBA array, 5 times the size.)"""
+    image = Image.open(path)
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "A" in image.mode or "transparency" in image.info else "RGB")
+    return np.asarray(image)
+
+
+class TestImages:
+    """The 400 images (4 scenes x 100 frames) of a test, loading in the background"""
+
+    def __init__(self, loader, test_num):
+        self.loader = loader
+        self.test_num = test_num
+        self.images = {}
+        self.futures = {}
+        self.nbytes = 0
+
+    def is_loaded(self):
+        return len(self.images) == NUM_SCENES * NUM_FRAMES
+
+    def get(self, scene, frame_num):
+        """Get an image, waiting for it if it is being loaded.  An image that has not started
+        loading yet (because the ones before it are still loading) is loaded right away."""
+        key = (scene, frame_num)
+        image = self.images.get(key)
+        if image is not None:
+            return image
+        future = self.futures.get(key)
+        if future is not None and not future.cancel():
+            return future.result()
+        return self.loader.load_image(self, key)
+
+
+class TestImageLoader:
+    """
+    Loads the images of the current test on a pool of threads, frame 1 of each scene first
+    and then the frames in order, so the first frame can be shown at once while the rest
+    stream in.  Then loads the next tests the same way.  Keeps the images of at most
+    max_tests tests, and only as many as fit in max_bytes (but always the current one):
+    the size of a test is only known once its first image is loaded, so the tests that do
+    not fit are dropped then.  The loads of tests that are no longer wanted (after a jump
+    to another test, or once they do not fit) are cancelled.
+    """
+
+    def __init__(self, data_dir, read_image=read_frame, max_tests=3, max_bytes=None, workers=4):
+        self.data_dir = data_dir
+        self.read_image = read_image
+        self.max_tests = max_tests
+        self.max_bytes = max_bytes
+        self.image_bytes = 0
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.lock = threading.Lock()
+        self.tests = OrderedDict()
+        # the tests to keep, current one first
+        self.test_order = []
+
+    def load_tests(self, test_nums):
+        """Make the first test the current one and start loading it, then the other tests.
+        Returns the TestImages of the current test."""
+        with self.lock:
+            test_nums = list(OrderedDict.fromkeys(test_nums))[:self.get_num_tests()]
+            # Cancel the loads that have not started, so the current test goes first
+            for test_images in self.tests.values():
+                for key, future in list(test_images.futures.items()):
+                    if future.cancel():
+                        del test_images.futures[key]
+            for test_num in list(self.tests):
+                if test_num not in test_nums:
+                    del self.tests[test_num]
+            self.test_order = test_nums
+
+            for test_num in test_nums:
+                test_images = self.tests.get(test_num)
+                if test_images is None:
+                    test_images = self.tests[test_num] = TestImages(self, test_num)
+                keys = [(scene, frame_num) for frame_num in range(1, NUM_FRAMES + 1) for scene in range(NUM_SCENES)]
+                for key in keys:
+                    if key not in test_images.images and key not in test_images.futures:
+                        test_images.futures[key] = self.executor.submit(self.load_image, test_images, key)
+            return self.tests[test_nums[0]]
+
+    def get_num_tests(self):
+        """How many tests to keep: max_tests, or fewer if they do not fit in max_bytes"""
+        if self.max_bytes is None or self.image_bytes == 0:
+            return self.max_tests
+        test_bytes = self.image_bytes * NUM_SCENES * NUM_FRAMES
+        return max(1, min(self.max_tests, self.max_bytes // test_bytes))
+
+    def get_nbytes(self):
+        with self.lock:
+            return sum(test_images.nbytes for test_images in self.tests.values())
+
+    def load_image(self, test_images, key):
+        image = self.read_image(str(scene_image_path(self.data_dir, test_images.test_num, *key)))
+        with self.lock:
+            if key not in test_images.images:
+                test_images.nbytes += image.nbytes
+            test_images.images[key] = image
+            test_images.futures.pop(key, None)
+            if image.nbytes > self.image_bytes:
+                self.image_bytes = image.nbytes
+                self.drop_tests(self.get_num_tests())
+        return image
+
+    def drop_tests(self, num_tests):
+        """Drop the tests after the first num_tests, cancelling their loads that have not started.
+        Must be called with the lock held."""
+        for test_num in self.test_order[num_tests:]:
+            test_images = self.tests.pop(test_num, None)
+            if test_images is not None:
+                for future in test_images.futures.values():
+                    future.cancel()
+                test_images.futures.clear()
+        self.test_order = self.test_order[:num_tests]
+
+    def close(self):
+        # Cancel the loads that have not started by hand (shutdown's cancel_futures needs Python 3.9)
+        with self.lock:
+            for test_images in self.tests.values():
+                for future in test_images.futures.values():
+                    future.cancel()
+        self.executor.shutdown(wait=False)
@@ -15,7 +15,6 @@ import time
 from itertools import starmap
 
 from pathlib import Path
-import matplotlib.image as mpimg
 from matplotlib.widgets import Slider
 import sys
 
@@ -27,6 +26,7 @@ from PyQt5.QtWidgets import QApplication, QHBoxLayout, QLabel, QSizePolicy, QSli
     QVBoxLayout, QWidget
 
 from answer import Answer
+from imageloader import TestImageLoader
 
 berkeley = "Berkeley-m2-learned-answer.txt"
 gt = "ground_truth.txt"
@@ -36,6 +36,11 @@ test_data_path = "/mnt/ssd/cdorman/data/mcs/intphys/test/"
 # Set this if you want to jump to a specific test;  otherwise it gets the next -1 in the current block
 starting_test = -1  #  821
 
+# How many tests after the current one to load in the background, and how much memory the loaded
+# tests may use (a test is 400 uint8 RGB frames, about 100 MB for 288x288 frames)
+prefetch_tests = 2
+memory_budget_mb = 512
+
 class KeyPressWindow(QtGui.QMainWindow):
     sigKeyPress = QtCore.pyqtSignal(object)
     sigMouseClick = QtCore.pyqtSignal(object)
@@ -95,8 +100,10 @@ class TruthingViewer:
         # init
         self.dataDir = Path(test_data_path + block)
         self.masks = []
-        self.image_map = {}
+        self.images = None
         self.image_items = [None] * 4
+        self.loader = TestImageLoader(self.dataDir, max_tests=prefetch_tests + 1,
+                                      max_bytes=memory_budget_mb * 1024 * 1024)
 
         self.selected = []
         self.start = time.time()
@@ -139,16 +146,9 @@ class TruthingViewer:
         self.win.setWindowTitle(str('truthing ') + str(block) + " / " + str(self.test_num_string))
 
     def read_images(self):
-        self.image_map.clear()
-        for scene in range(0, 4):
-            frame_map = {}
-            for frame_num in range(1, 101):
-                frame_num_string = str(frame_num).zfill(3)
-                image_name = self.dataDir / self.test_num_string / str(scene + 1) / "scene" / (
-                        "scene_" + frame_num_string + ".png")
-                img_src = mpimg.imread(str(image_name))
-                frame_map[frame_num] = img_src
-            self.image_map[scene] = frame_map
+        """Start loading the images of this test (frame 1 first) and the next tests in the background"""
+        next_tests = [test for test in range(self.test_num + 1, self.test_num + prefetch_tests + 1) if test <= 1080]
+        self.images = self.loader.load_tests([self.test_num] + next_tests)
 
     def update_keypress(self, event):
 
@@ -173,6 +173,7 @@ class TruthingViewer:
             print("4")
             self.selected.append(4)
         elif event.key() == 81:   # this is 'q', for quit
+            self.loader.close()
             exit(0)
         elif event.key() == 84:  # this is 't', for toggle
             current_val = int(self.slider.get_val())
@@ -237,9 +238,10 @@ class TruthingViewer:
         self.set_test_num(test_num)
 
         for scene in range(0, 4):
-            image_name = self.dataDir / self.test_num_string / str(scene + 1) / "scene" / "scene_001.png"
-            img_src = mpimg.imread(str(image_name))
-            self.image_items[scene] = pg.ImageItem(img_src, axisOrder='row-major', border='w')
+            img_src = self.images.get(scene, 1)
+            # The frames are uint8, so they need no levels: without levels or autoLevels, makeARGB
+            # copies them as they are instead of rescaling them (or looking them up) every time
+            self.image_items[scene] = pg.ImageItem(img_src, axisOrder='row-major', border='w', levels=None)
 
             vb = self.view.ci.addViewBox(row=0, col=scene)
             vb.invertY()
@@ -261,13 +263,13 @@ class TruthingViewer:
         answer = self.ground_truth.get_answer()
 
         for scene in range(0, 4):
-            img = self.image_map[scene][frame_num]
+            img = self.images.get(scene, frame_num)
             scene_name = str(scene + 1)
             # If already truthed as implausible, show as red
             if answer[block][self.test_num_string][scene_name] == 0:
-                self.image_items[scene].setImage(img, border=pg.mkPen(color=(255,0,0), width=8))
+                self.image_items[scene].setImage(img, autoLevels=False, border=pg.mkPen(color=(255,0,0), width=8))
             else:
-                self.image_items[scene].setImage(img, border='w')
+                self.image_items[scene].setImage(img, autoLevels=False, border='w')
 
 
 if __name__ == "__main__":